@@ -7,185 +7,268 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import asyncio
-from typing import List
+from typing import Dict, List, Optional
 from datetime import datetime
 
 from src.configs.settings import settings
 from src.database.connection import create_tables, SessionLocal
 from src.database.chatbot_connection import create_chatbot_tables
 from src.api.v1.router import api_router
-from src.models.investment import Asset, CandleInterval
+from src.api.idempotency import IdempotencyMiddleware
+from src.api.broadcaster import Broadcaster
+from src.api.feed_codec import CANDLES, INDICATORS, PRICES
+from src.models.investment import CandleInterval
 from src.services import investment_service
-from src.services.candle_service import generate_candles_for_all_stocks
+from src.services.candle_service import (
+    BASE_INTERVAL, INTERVAL_SECONDS, candle_state, tick_write_stats
+)
+from src.services.candle_archive import candle_archive
+from src.services.candle_indicators import candle_indicators, parse_indicator
+from src.services.candle_partitions import candle_partitions
+from src.services.candle_retention_service import candle_retention
+from src.services.event_loop_monitor import loop_monitor
+from src.services.feed_pubsub import feed_pubsub
+from src.services.latest_candles import latest_candles
+from src.services.market_simulator_service import market_simulator
+from src.services.price_snapshot import price_snapshot
+from src.services.scheduler_service import scheduler
 import random
 
 # Importar TODOS os modelos para SQLAlchemy criar as tabelas
 import src.models  # noqa: F401 - necessário para Base.metadata
 
 
-class ConnectionManager:
-    """Gerenciador de conexões WebSocket"""
-    
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-    
-    async def connect(self, websocket: WebSocket):
-        """Aceita nova conexão"""
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        print(f"📡 Nova conexão WebSocket. Total: {len(self.active_connections)}")
+# Feed de mercado: fan-out com fila por cliente e frames serializados uma vez
+manager = Broadcaster()
+
+# Tarefa do feed de preços (só no worker produtor)
+price_feed_task: Optional[asyncio.Task] = None
+
+
+async def publish_candles(candles: List[dict]):
+    """
+    Publica as velas gravadas em um tick do simulador no pub/sub do feed.
+    O simulador roda numa thread própria (market_simulator_service), só
+    no worker produtor; o broadcast acontece em on_feed_event
+    """
+    # Log resumido quando o tick fecha velas dos intervalos maiores
+    rolled_up = sorted(
+        {candle["interval"] for candle in candles} - {BASE_INTERVAL},
+        key=INTERVAL_SECONDS.get
+    )
+    for interval in rolled_up:
+        print(f"⏰ Vela de {interval.value} fechada (agregada das velas de {BASE_INTERVAL.value})")
+    if rolled_up:
+        print(f"📊 {len(candles)} velas gravadas em "
+              f"{tick_write_stats.last_ms:.1f} ms")
     
-    def disconnect(self, websocket: WebSocket):
-        """Remove conexão"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        print(f"📡 Conexão encerrada. Total: {len(self.active_connections)}")
+    records = []
+    for candle in candles:
+        stock = candle_state.stock(candle["asset_id"])
+        if stock:
+            records.append(dict(candle, symbol=stock.symbol, name=stock.name))
     
-    async def broadcast(self, message: dict):
-        """Envia mensagem para todos os clientes conectados"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                disconnected.append(connection)
+    if records:
+        await feed_pubsub.publish({
+            "type": "candles",
+            "records": records,
+            "timestamp": datetime.utcnow()
+        })
+
+
+def publish_prices(records: List[dict], base: int, version: int, websocket: WebSocket = None):
+    """
+    Envia preços aos clientes. `base` é a versão a partir da qual o frame
+    traz as mudanças (0 = preços completos) e `version` a versão atual
+    """
+    if records:
+        manager.publish_records(
+            PRICES, records,
+            [(record["symbol"], None) for record in records],
+            {"timestamp": datetime.utcnow(), "base": base, "version": version},
+            websocket=websocket
+        )
+
+
+def publish_indicators(records: List[dict], timestamp: datetime, websocket: WebSocket = None):
+    """Envia os pontos dos indicadores aos clientes que os assinaram"""
+    if records:
+        manager.publish_records(
+            INDICATORS, records,
+            [
+                (record["symbol"], record["interval"].value, record["indicator"])
+                for record in records
+            ],
+            {"timestamp": timestamp},
+            websocket=websocket
+        )
+
+
+def load_indicators(subscriptions: Dict[str, List[str]], indicators: List[str]) -> List[dict]:
+    """
+    Último ponto dos indicadores assinados em cada símbolo/intervalo
+    assinado (séries ainda fora do cache são calculadas com uma leitura
+    das velas por par). Assinaturas com "*" recebem só os pontos novos
+    """
+    parsed = [parse_indicator(spec) for spec in indicators]
+    records = []
+    db = SessionLocal()
+    try:
+        for symbol, intervals in subscriptions.items():
+            entry = price_snapshot.get(symbol)
+            if entry is None:
+                continue
+            for interval in intervals:
+                if interval == "*":
+                    continue
+                interval = CandleInterval(interval)
+                for series in candle_indicators.get(db, entry.asset_id, interval, parsed):
+                    if series.last_open_time is None:
+                        continue
+                    records.append({
+                        "asset_id": entry.asset_id,
+                        "symbol": entry.symbol,
+                        "name": entry.name,
+                        "interval": interval,
+                        "indicator": series.indicator.key,
+                        "open_time": series.last_open_time,
+                        "values": series.last()
+                    })
+    finally:
+        db.close()
+    return records
+
+
+async def on_feed_event(event: dict):
+    """
+    Evento do feed recebido pelo pub/sub (em todos os workers): cada worker
+    faz o broadcast para as próprias conexões WebSocket
+    """
+    if event["type"] == "candles":
+        # Todas as velas do tick em um único frame por cliente; cada cliente
+        # recebe só os símbolos/intervalos assinados, na codificação dele
+        records = event["records"]
+        latest_candles.apply(records)
+        manager.publish_records(
+            CANDLES, records,
+            [(record["symbol"], record["interval"].value) for record in records],
+            {"timestamp": event["timestamp"]}
+        )
         
-        # Remove conexões inativas
-        for conn in disconnected:
-            self.active_connections.remove(conn)
+        # As séries de indicadores em cache avançam uma vela (O(1) cada)
+        if len(candle_indicators):
+            updates = await asyncio.to_thread(candle_indicators.apply, records)
+            publish_indicators(updates, event["timestamp"])
     
-    def broadcast_sync(self, message: dict):
-        """Versão síncrona do broadcast (para uso do simulador)"""
-        import asyncio
+    elif event["type"] == "prices":
+        version = event["version"]
+        if not feed_pubsub.producer:
+            # Seguidores espelham o snapshot do produtor
+            version = price_snapshot.apply(version, event["prices"])
+        publish_prices(event["prices"], event["base"], version)
+        
+        # Clientes que perderam frames recebem os preços completos
+        resyncs = manager.take_resyncs()
+        if resyncs:
+            _, entries = price_snapshot.changes_since(0)
+            records = [entry.to_dict() for entry in entries]
+            for websocket in resyncs:
+                publish_prices(records, 0, version, websocket)
+
+
+async def price_feed_background():
+    """
+    Publica os preços alterados a cada WS_PRICE_INTERVAL segundos, lidos do
+    snapshot compartilhado (atualizado pelo simulador). Roda só no worker
+    produtor; nenhuma conexão consulta o banco
+    """
+    version = price_snapshot.version
+    while True:
         try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                asyncio.create_task(self.broadcast(message))
-            else:
-                loop.run_until_complete(self.broadcast(message))
+            # Recarrega a lista de ativos (uma consulta, fora do event loop)
+            if price_snapshot.stale():
+                await asyncio.to_thread(load_price_snapshot)
+            
+            # Publicado mesmo sem mudanças: cada worker trata os resyncs
+            base = version
+            version, changes = price_snapshot.changes_since(base)
+            await feed_pubsub.publish({
+                "type": "prices",
+                "base": base,
+                "version": version,
+                "prices": [entry.to_dict() for entry in changes],
+                "timestamp": datetime.utcnow()
+            })
         except Exception as e:
-            print(f"⚠️  Erro ao enviar broadcast: {e}")
+            print(f"⚠️  Erro no feed de preços: {e}")
+        
+        await asyncio.sleep(settings.WS_PRICE_INTERVAL)
+
+
+async def start_feed_producer():
+    """
+    Este worker virou o produtor do feed: simulador, feed de preços e
+    retenção das velas (um único worker grava e apaga velas)
+    """
+    global price_feed_task
+    start_market_simulator_worker()
+    if price_feed_task is None:
+        price_feed_task = asyncio.create_task(price_feed_background())
+    if settings.CANDLE_RETENTION_ENABLED:
+        candle_retention.start()
+
+
+async def stop_feed_producer():
+    """Para o simulador e o feed de preços deste worker"""
+    global price_feed_task
+    if price_feed_task is not None:
+        price_feed_task.cancel()
+        try:
+            await price_feed_task
+        except asyncio.CancelledError:
+            pass
+        price_feed_task = None
+    await candle_retention.stop()
+    await market_simulator.stop()
 
 
-manager = ConnectionManager()
+async def follow_feed():
+    """
+    Seguidor (re)conectado ao feed: recarrega os preços do banco e descarta
+    as últimas velas e os indicadores em memória (eventos podem ter sido
+    perdidos)
+    """
+    latest_candles.reset()
+    candle_indicators.reset()
+    await asyncio.to_thread(load_price_snapshot)
 
-# Controle do simulador de mercado
-market_simulator_task = None
-market_simulator_running = False
+
+def load_price_snapshot():
+    """Carrega o snapshot de preços do banco (sessão curta)"""
+    db = SessionLocal()
+    try:
+        price_snapshot.load(db)
+    finally:
+        db.close()
 
 
-async def market_simulator_background():
+def start_market_simulator_worker() -> bool:
     """
     Simulador de mercado com sistema de VELAS (Candlesticks)
     Gera dados OHLCV realistas a cada 1 SEGUNDO para análise técnica
     Variação: 0.01% a 1% máximo
     """
-    global market_simulator_running
-    
-    print("📈 Simulador de Velas (Candlesticks) iniciado")
-    print("⏱️  Intervalo: 1 SEGUNDO | Dados: OHLCV (Open/High/Low/Close/Volume)")
-    print("📊 Variação: 0.01% a 1% por movimento")
-    
-    # Contadores para cada intervalo
-    interval_counters = {
-        CandleInterval.ONE_SECOND: 0,
-        CandleInterval.FIVE_SECONDS: 0,
-        CandleInterval.TEN_SECONDS: 0,
-        CandleInterval.THIRTY_SECONDS: 0,
-        CandleInterval.ONE_MINUTE: 0,
-        CandleInterval.FIVE_MINUTES: 0,
-        CandleInterval.FIFTEEN_MINUTES: 0,
-        CandleInterval.ONE_HOUR: 0,
-        CandleInterval.FOUR_HOURS: 0,
-        CandleInterval.ONE_DAY: 0
-    }
-    
-    # Tempo necessário para cada intervalo (em segundos)
-    interval_times = {
-        CandleInterval.ONE_SECOND: 1,
-        CandleInterval.FIVE_SECONDS: 5,
-        CandleInterval.TEN_SECONDS: 10,
-        CandleInterval.THIRTY_SECONDS: 30,
-        CandleInterval.ONE_MINUTE: 60,
-        CandleInterval.FIVE_MINUTES: 300,
-        CandleInterval.FIFTEEN_MINUTES: 900,
-        CandleInterval.ONE_HOUR: 3600,
-        CandleInterval.FOUR_HOURS: 14400,
-        CandleInterval.ONE_DAY: 86400
-    }
-    
-    while market_simulator_running:
-        try:
-            db = SessionLocal()
-            
-            all_candles = []
-            
-            # Para cada intervalo, verifica se chegou a hora de criar vela
-            for interval, required_time in interval_times.items():
-                interval_counters[interval] += 1
-                
-                # Se atingiu o tempo necessário, cria a vela
-                if interval_counters[interval] >= required_time:
-                    print(f"⏰ Criando vela de {interval.value} após {interval_counters[interval]} segundos")
-                    candles = generate_candles_for_all_stocks(
-                        db, 
-                        interval=interval,
-                        time_elapsed=required_time
-                    )
-                    all_candles.extend(candles)
-                    interval_counters[interval] = 0  # Reset contador
-            
-            # Envia atualizações via WebSocket
-            for candle in all_candles:
-                asset = db.query(Asset).filter(Asset.id == candle.asset_id).first()
-                
-                if asset:
-                    # Calcula variação percentual
-                    change_percent = ((candle.close_price - candle.open_price) / 
-                                     candle.open_price) * 100
-                    
-                    await manager.broadcast({
-                        "type": "candle_update",
-                        "symbol": asset.symbol,
-                        "name": asset.name,
-                        "candle": {
-                            "interval": candle.interval.value,
-                            "open": candle.open_price,
-                            "high": candle.high_price,
-                            "low": candle.low_price,
-                            "close": candle.close_price,
-                            "volume": candle.volume,
-                            "trades": candle.trades_count,
-                            "change_percent": round(change_percent, 2),
-                            "open_time": candle.open_time.isoformat(),
-                            "close_time": candle.close_time.isoformat()
-                        },
-                        "timestamp": datetime.utcnow().isoformat()
-                    })
-            
-            db.close()
-            
-            # Log resumido a cada 10 velas
-            if candles and len(candles) % 10 == 0:
-                print(f"📊 {len(candles)} velas geradas | "
-                      f"Última: {candles[-1].close_price:.2f}")
-            
-        except Exception as e:
-            print(f"⚠️  Erro no simulador: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        # Aguarda 1 SEGUNDO (velas em tempo real)
-        await asyncio.sleep(1)
-    
-    print("📉 Simulador de Velas parado")
+    started = market_simulator.start(publish_candles)
+    if started:
+        print("📈 Simulador de Velas (Candlesticks) iniciado (thread própria)")
+        print("⏱️  Intervalo: 1 SEGUNDO | Dados: OHLCV (Open/High/Low/Close/Volume)")
+        print("📊 Variação: 0.01% a 1% por movimento")
+    return started
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Eventos de inicialização e finalização"""
-    global market_simulator_task, market_simulator_running
-    
     # Startup
     print("🚀 Iniciando Digital Superbank API...")
     create_tables()
@@ -193,21 +276,32 @@ async def lifespan(app: FastAPI):
     create_chatbot_tables()
     print("✅ Banco de dados do chatbot inicializado")
     
-    # Inicia simulador de mercado em background
-    market_simulator_running = True
-    market_simulator_task = asyncio.create_task(market_simulator_background())
+    # Mede o atraso do event loop (trabalho síncrono bloqueando a API)
+    loop_monitor.start()
+    
+    # Feed de mercado: o worker produtor roda o simulador (thread própria)
+    # e o feed de preços; todos recebem os eventos pelo pub/sub e fazem o
+    # broadcast para as próprias conexões
+    await asyncio.to_thread(load_price_snapshot)
+    await feed_pubsub.start(
+        on_feed_event,
+        on_promote=start_feed_producer,
+        on_demote=stop_feed_producer,
+        on_follow=follow_feed
+    )
+    
+    # Inicia scheduler de transações agendadas
+    if settings.SCHEDULER_ENABLED:
+        scheduler.start()
     
     yield
     
     # Shutdown
     print("👋 Encerrando Digital Superbank API...")
-    market_simulator_running = False
-    if market_simulator_task:
-        market_simulator_task.cancel()
-        try:
-            await market_simulator_task
-        except asyncio.CancelledError:
-            pass
+    await scheduler.stop()
+    await feed_pubsub.stop()
+    await stop_feed_producer()
+    await loop_monitor.stop()
 
 
 # Criar aplicação FastAPI
@@ -218,6 +312,10 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Idempotency-Key nos POSTs que movimentam dinheiro
+# (registrado antes do CORS para ficar por dentro dele)
+app.add_middleware(IdempotencyMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -225,6 +323,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],
 )
 
 
@@ -248,18 +347,18 @@ app.include_router(api_router, prefix="/api/v1")
 # Endpoints de controle do simulador de mercado
 @app.post("/api/v1/market/simulator/start")
 async def start_market_simulator():
-    """Inicia o simulador de mercado"""
-    global market_simulator_task, market_simulator_running
-    
-    if market_simulator_running:
+    """Inicia o simulador de mercado (no worker produtor do feed)"""
+    if not feed_pubsub.producer:
+        return {
+            "status": "not_producer",
+            "message": "O simulador roda no worker produtor do feed"
+        }
+    if not start_market_simulator_worker():
         return {
             "status": "already_running",
             "message": "Simulador já está em execução"
         }
     
-    market_simulator_running = True
-    market_simulator_task = asyncio.create_task(market_simulator_background())
-    
     return {
         "status": "started",
         "message": "Simulador de mercado iniciado com sucesso"
@@ -269,21 +368,12 @@ async def start_market_simulator():
 @app.post("/api/v1/market/simulator/stop")
 async def stop_market_simulator():
     """Para o simulador de mercado"""
-    global market_simulator_task, market_simulator_running
-    
-    if not market_simulator_running:
+    if not await market_simulator.stop():
         return {
             "status": "not_running",
             "message": "Simulador não está em execução"
         }
-    
-    market_simulator_running = False
-    if market_simulator_task:
-        market_simulator_task.cancel()
-        try:
-            await market_simulator_task
-        except asyncio.CancelledError:
-            pass
+    print("📉 Simulador de Velas parado")
     
     return {
         "status": "stopped",
@@ -295,12 +385,40 @@ async def stop_market_simulator():
 async def get_simulator_status():
     """Obtém status do simulador de mercado"""
     return {
-        "running": market_simulator_running,
+        "running": market_simulator.running,
         "websocket_connections": len(manager.active_connections),
-        "update_interval": 10  # segundos
+        # Fan-out do feed: frames descartados e latência de envio
+        "broadcast": manager.metrics(),
+        # Snapshot de preços compartilhado pelas conexões
+        "price_snapshot": price_snapshot.metrics(),
+        "update_interval": market_simulator.tick_seconds,  # segundos
+        # Thread do simulador: duração dos ticks e fila até o broadcast
+        "worker": market_simulator.metrics(),
+        # Latência de escrita por tick (INSERT em lote + UPDATE + commit)
+        "tick_writes": tick_write_stats.metrics(),
+        # Retenção das velas (apagadas/agregadas por execução)
+        "retention": candle_retention.metrics(),
+        # Partições das velas por intervalo (CANDLE_PARTITIONED)
+        "candle_partitions": candle_partitions.metrics(),
+        # Arquivo colunar das velas fechadas (CANDLE_ARCHIVE_ENABLED)
+        "candle_archive": candle_archive.metrics(),
+        # Última vela de cada ação por intervalo (GET /candles/latest)
+        "latest_candles": latest_candles.metrics(),
+        # Cache dos indicadores técnicos (GET /candles/{asset_id}/indicators)
+        "indicators": candle_indicators.metrics(),
+        # Atraso do event loop da API (deve ficar perto de zero)
+        "event_loop_lag": loop_monitor.metrics(),
+        # Pub/sub do feed entre workers (este worker é o produtor?)
+        "pubsub": feed_pubsub.metrics()
     }
 
 
+@app.get("/api/v1/scheduler/status")
+async def get_scheduler_status():
+    """Métricas do scheduler de transações agendadas (atraso e vazão)"""
+    return scheduler.metrics()
+
+
 # Rota de health check
 @app.get("/")
 async def root():
@@ -329,56 +447,104 @@ async def websocket_market_feed(websocket: WebSocket):
     """
     WebSocket para streaming de preços em tempo real
     
-    Conecta e recebe atualizações de preços automaticamente:
+    Após conectar, o cliente assina os símbolos e os intervalos de vela que
+    quer receber ("*" = todos):
+    {"action": "subscribe", "symbols": ["NEXG"], "intervals": ["1m"]}
+    {"action": "unsubscribe", "symbols": ["NEXG"], "intervals": ["1m"]}
+    Sem "intervals", subscribe assina só os preços do símbolo e unsubscribe
+    remove o símbolo inteiro. A resposta traz as assinaturas atuais:
+    {"type": "subscriptions", "subscriptions": {"NEXG": ["1m"]}, "indicators": []}
+    
+    Indicadores técnicos ("indicators": ["rsi:14", "macd:12,26,9",
+    "bollinger:20,2", ...] no subscribe/unsubscribe) valem para todas as
+    velas assinadas. Ao assinar, o cliente recebe o último ponto de cada
+    um e, a cada vela nova, o ponto seguinte:
+    {
+        "type": "indicator_batch",
+        "indicators": [
+            {"symbol": "NEXG", "name": "NexGen Innovations",
+             "indicator": {"interval": "1m", "name": "rsi:14",
+                           "open_time": "...", "values": {"rsi": 55.2}}}
+        ],
+        "timestamp": "2025-11-20T21:00:00"
+    }
+    
+    Todas as velas assinadas de um tick do simulador chegam em um único frame:
     {
-        "type": "price_update",
-        "symbol": "NEXG",
-        "name": "NexGen Innovations",
-        "price": 45.75,
-        "change_percent": 0.5,
-        "volume": 85000,
+        "type": "candle_batch",
+        "candles": [
+            {"symbol": "NEXG", "name": "NexGen Innovations",
+             "candle": {"interval": "1s", "open": 45.7, "close": 45.75, ...}}
+        ],
         "timestamp": "2025-11-20T21:00:00"
     }
+    
+    Ao assinar, o cliente recebe os preços atuais dos símbolos assinados e,
+    a cada 2 segundos, só os preços que mudaram (versão do snapshot):
+    {
+        "type": "price_batch",
+        "prices": [{"symbol": "NEXG", "name": "NexGen Innovations", "price": 45.75}],
+        "version": 42,
+        "timestamp": "2025-11-20T21:00:00"
+    }
+    
+    Codificações (?encoding= na URL ou {"action": "encoding", "mode": ...}):
+    json (padrão, formato acima), compact (JSON com arrays posicionais),
+    msgpack e binary (struct). Nos modos compactos, os símbolos viram ids
+    numéricos definidos num frame de dicionário enviado antes, só com as
+    entradas novas; os preços trazem "b" (versão base; 0 = completos) e
+    "v". Layout dos frames em src/api/feed_codec.py. Um cliente que
+    perdeu frames recebe os preços completos no ciclo seguinte do feed
+    ou pode pedir {"action": "resync"}
+    
+    Os envios passam pela fila do cliente: um cliente lento perde os
+    frames mais antigos (ou é desconectado, conforme WS_SLOW_CLIENT_POLICY)
+    sem atrasar os demais
     """
     await manager.connect(websocket)
     
     try:
-        # Envia dados iniciais
-        db = SessionLocal()
-        assets = db.query(Asset).filter(Asset.is_active == True).all()
+        # Codificação pedida na URL (?encoding=compact); padrão json
+        encoding = websocket.query_params.get("encoding")
+        if encoding:
+            try:
+                manager.set_encoding(websocket, encoding)
+            except ValueError as e:
+                manager.send(websocket, {"type": "error", "message": str(e)})
         
-        await websocket.send_json({
+        # Envia dados iniciais (do snapshot; a conexão não usa o banco)
+        manager.send(websocket, {
             "type": "connected",
             "message": "Conectado ao feed de mercado",
-            "assets_count": len(assets)
+            "assets_count": len(price_snapshot)
         })
         
-        # Mantém conexão e aguarda mensagens (opcional)
         while True:
-            try:
-                # Cliente pode enviar mensagens (ex: subscribir símbolos específicos)
-                data = await asyncio.wait_for(websocket.receive_text(), timeout=1.0)
-                # Aqui você pode processar comandos do cliente
-            except asyncio.TimeoutError:
-                # Envia update periódico
-                assets = db.query(Asset).filter(Asset.is_active == True).all()
-                for asset in assets:
-                    await websocket.send_json({
-                        "type": "price_update",
-                        "symbol": asset.symbol,
-                        "name": asset.name,
-                        "price": asset.current_price,
-                        "timestamp": datetime.utcnow().isoformat()
-                    })
-                await asyncio.sleep(2)  # Atualiza a cada 2 segundos
+            # Comandos do cliente: subscribe/unsubscribe
+            data = await websocket.receive_text()
+            reply = manager.handle_command(websocket, data)
+            manager.send(websocket, reply)
+            
+            # Ao assinar (ou trocar de codificação/pedir resync), envia os
+            # preços atuais dos símbolos assinados; as mudanças seguintes
+            # chegam pelo feed de preços
+            if reply["type"] in ("subscriptions", "encoding", "resync"):
+                version, entries = price_snapshot.changes_since(0)
+                publish_prices([entry.to_dict() for entry in entries], 0, version, websocket)
+            
+            # Último ponto dos indicadores assinados (calculado fora do
+            # event loop); os seguintes chegam a cada vela
+            if reply["type"] == "subscriptions" and reply["indicators"]:
+                records = await asyncio.to_thread(
+                    load_indicators, reply["subscriptions"], reply["indicators"]
+                )
+                publish_indicators(records, datetime.utcnow(), websocket)
                 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
         print(f"❌ Erro no WebSocket: {e}")
         manager.disconnect(websocket)
-    finally:
-        db.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+"""
+Script para criar os índices compostos em bancos já existentes
+(transactions, candles, assets, portfolio_items, contadores de saque e
+agendamentos).
+
+O create_all só cria índices junto com tabelas novas; este script cria
+os que faltam em tabelas antigas, sem recriar os que já existem.
+"""
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import inspect, text
+
+import src.models  # noqa: F401 - registra todas as tabelas
+from src.database.connection import Base, engine
+
+
+TABLES = [
+    "transactions",
+    "candles",
+    "assets",
+    "portfolio_items",
+    "daily_withdrawal_counters",
+    "scheduled_transactions",
+]
+
+
+def add_composite_indexes(analyze: bool = True):
+    """Cria os índices declarados nos models que ainda não existem"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = 0
+
+    for table_name in TABLES:
+        if table_name not in existing_tables:
+            print(f"ℹ️  Tabela {table_name} não existe (será criada pelo create_all)")
+            continue
+
+        existing = {ix["name"] for ix in inspector.get_indexes(table_name)}
+        table = Base.metadata.tables[table_name]
+
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name in existing:
+                print(f"   ✓ {index.name} já existe")
+                continue
+
+            columns = ", ".join(column.name for column in index.columns)
+            print(f"   ➕ {index.name} ({columns})")
+            index.create(bind=engine)
+            created += 1
+
+    if analyze and created:
+        # Atualiza as estatísticas usadas pelo planejador de consultas
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        print("📊 Estatísticas atualizadas (ANALYZE)")
+
+    print(f"✅ Índices criados: {created}")
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Cria os índices compostos de transações e velas",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  python scripts/add_composite_indexes.py                # Cria índices e roda ANALYZE
+  python scripts/add_composite_indexes.py --no-analyze   # Apenas cria os índices
+        """
+    )
+
+    parser.add_argument(
+        '--no-analyze',
+        action='store_true',
+        help='Não executa ANALYZE após criar os índices'
+    )
+
+    args = parser.parse_args()
+
+    print("🔄 Iniciando migração de índices...")
+    add_composite_indexes(analyze=not args.no_analyze)
+    print("✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    main()
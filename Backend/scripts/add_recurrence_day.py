@@ -0,0 +1,57 @@
+"""
+Script para adicionar a coluna recurrence_day aos agendamentos existentes
+
+Agendamentos mensais e anuais guardam o dia âncora (dia da data original)
+e cada ocorrência usa esse dia ajustado ao fim do mês, sem acumular o
+ajuste (31/01 -> 28/02 -> 31/03). Os agendamentos recorrentes pendentes
+recebem como âncora o dia da sua data atual.
+"""
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import inspect, text
+
+import src.models  # noqa: F401 - registra todas as tabelas
+from src.database.connection import engine, SessionLocal
+from src.models.transaction import ScheduledTransaction, TransactionStatus
+
+
+def add_recurrence_day_column() -> int:
+    """Cria a coluna se não existir e preenche os recorrentes pendentes"""
+    columns = {
+        column["name"]
+        for column in inspect(engine).get_columns("scheduled_transactions")
+    }
+    if "recurrence_day" not in columns:
+        print("Adicionando coluna recurrence_day...")
+        with engine.begin() as conn:
+            conn.execute(text(
+                "ALTER TABLE scheduled_transactions ADD COLUMN recurrence_day INTEGER"
+            ))
+        print("✅ Coluna recurrence_day adicionada")
+    else:
+        print("ℹ️  Coluna recurrence_day já existe")
+
+    db = SessionLocal()
+    try:
+        pending = db.query(ScheduledTransaction).filter(
+            ScheduledTransaction.is_recurring == True,
+            ScheduledTransaction.status == TransactionStatus.PENDING.value,
+            ScheduledTransaction.recurrence_day.is_(None)
+        ).all()
+        for scheduled in pending:
+            scheduled.recurrence_day = scheduled.schedule_date.day
+        db.commit()
+        print(f"✅ {len(pending)} agendamentos recorrentes atualizados")
+        return len(pending)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("🔄 Iniciando migração...")
+    add_recurrence_day_column()
+    print("✅ Migração concluída!")
@@ -0,0 +1,94 @@
+"""
+Script para copiar as velas do banco para o arquivo colunar
+Preenche o arquivo de cada (ativo, intervalo) de CANDLE_ARCHIVE_INTERVALS
+com as velas do banco posteriores à última já arquivada, em blocos por
+open_time. Útil ao ligar CANDLE_ARCHIVE_ENABLED num banco com histórico;
+depois disso o simulador da API mantém o arquivo. Pode ser executado de
+novo a qualquer momento (velas já arquivadas são ignoradas)
+"""
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import select
+
+from src.database.connection import SessionLocal
+from src.models.investment import Asset
+from src.services.candle_archive import CandleArchive
+from src.services.candle_partitions import candle_partitions
+
+
+def archive_candles(chunk: int = 10_000):
+    """Copia para o arquivo colunar as velas ainda não arquivadas"""
+    archive = CandleArchive(enabled=True)
+    db = SessionLocal()
+
+    try:
+        assets = db.query(Asset.id, Asset.symbol).order_by(Asset.symbol).all()
+        intervals = sorted(archive.intervals, key=lambda interval: interval.value)
+        print(f"📁 Arquivo: {archive.root}")
+        print(f"📊 {len(assets)} ativos x {len(intervals)} intervalos")
+
+        total = 0
+        started = time.perf_counter()
+        for asset_id, symbol in assets:
+            written = 0
+            for interval in intervals:
+                after = archive.last_open_time(asset_id, interval)
+                # Tabelas da mais antiga para a mais recente
+                for table in reversed(candle_partitions.tables(interval, start=after)):
+                    while True:
+                        query = select(table).where(
+                            table.c.asset_id == asset_id,
+                            table.c.interval == interval
+                        )
+                        if after is not None:
+                            query = query.where(table.c.open_time > after)
+                        rows = db.execute(
+                            query.order_by(table.c.open_time).limit(chunk)
+                        ).all()
+                        if not rows:
+                            break
+                        written += archive.append([dict(row._mapping) for row in rows])
+                        after = rows[-1].open_time
+            if written:
+                print(f"  ✅ {symbol}: {written:,} velas arquivadas")
+            total += written
+
+        elapsed = time.perf_counter() - started
+        print(f"\n🎯 {total:,} velas arquivadas em {elapsed:.1f}s")
+
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+    finally:
+        db.close()
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Copia as velas do banco para o arquivo colunar",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  python scripts/archive_candles.py
+  python scripts/archive_candles.py --chunk 50000
+        """
+    )
+
+    parser.add_argument('--chunk', type=int, default=10_000,
+                        help='Velas lidas por consulta (padrão: 10000)')
+
+    args = parser.parse_args()
+
+    print("🗄️  Arquivando velas...")
+    archive_candles(args.chunk)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Script para reconstruir os snapshots diários de saldo
+Recalcula abertura, fechamento e fluxos de cada dia a partir do histórico
+de transações, ancorando no saldo atual da conta
+"""
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database.connection import SessionLocal, create_tables
+from src.services.balance_history_service import (
+    backfill_balance_snapshots, backfill_all_balance_snapshots
+)
+
+
+def backfill(account_id: int = None):
+    """Reconstrói os snapshots de uma conta ou de todas"""
+    db = SessionLocal()
+
+    try:
+        if account_id:
+            days = backfill_balance_snapshots(db, account_id)
+            print(f"✅ Conta {account_id}: {days} dias com movimentação")
+        else:
+            results = backfill_all_balance_snapshots(db)
+            for acc_id, days in results.items():
+                print(f"   Conta {acc_id}: {days} dias")
+            print(f"✅ {len(results)} contas processadas, "
+                  f"{sum(results.values())} snapshots gravados")
+
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Reconstrói os snapshots diários de saldo",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  python scripts/backfill_balance_snapshots.py                 # Todas as contas
+  python scripts/backfill_balance_snapshots.py --account 12    # Apenas uma conta
+        """
+    )
+
+    parser.add_argument(
+        '--account',
+        type=int,
+        default=None,
+        help='ID da conta (padrão: todas)'
+    )
+
+    args = parser.parse_args()
+
+    print("🔄 Reconstruindo snapshots de saldo...")
+    create_tables()
+    backfill(args.account)
+
+
+if __name__ == "__main__":
+    main()
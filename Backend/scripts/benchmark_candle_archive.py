@@ -0,0 +1,193 @@
+"""
+Benchmark das leituras de velas para gráficos: banco x arquivo colunar
+
+Grava N velas de 1m de uma ação num SQLite temporário e no arquivo colunar
+(src/services/candle_archive.py) e mede a leitura das últimas 500, 5.000 e
+50.000 velas até o JSON da resposta de /investments/candles/{asset_id}:
+- orm: db.query(Candle) (objetos ORM) e dicts montados campo a campo
+- banco: get_recent_candles (linhas do Core) e dicts campo a campo
+- arquivo: read_candles (np.memmap do trecho + velas não arquivadas do
+  banco) e o JSON escrito direto das colunas
+- binário: read_candles e a resposta binária (colunas inteiras)
+Mostra a mediana do tempo (com o GC desligado, como no timeit), o pico de
+memória e os blocos alocados (tracemalloc), comparados com o caminho ORM.
+Não usa o banco configurado.
+"""
+import gc
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import src.models  # noqa: F401 - registra todas as tabelas
+from src.database.connection import Base
+from src.models.investment import Asset, AssetCategory, AssetType, Candle, CandleInterval
+from src.services.candle_archive import CandleArchive, read_candles
+from src.services.candle_service import get_recent_candles
+
+INTERVAL = CandleInterval.ONE_MINUTE
+
+
+def _seed(db, archive: CandleArchive, count: int) -> int:
+    """Grava `count` velas de 1m de uma ação no banco e no arquivo"""
+    asset = Asset(
+        symbol="BENCH3", name="Benchmark SA", asset_type=AssetType.STOCK,
+        category=AssetCategory.TECHNOLOGY, current_price=10.0
+    )
+    db.add(asset)
+    db.commit()
+
+    rng = np.random.default_rng(42)
+    closes = np.round(10 * np.cumprod(1 + rng.normal(0, 0.002, count)), 2).tolist()
+    start = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(minutes=count)
+    rows = [
+        {
+            "asset_id": asset.id, "interval": INTERVAL,
+            "open_price": close, "high_price": close + 0.05,
+            "low_price": close - 0.05, "close_price": close,
+            "volume": 1000.0 + i % 500, "trades_count": 10 + i % 50,
+            "quote_volume": close * 1000,
+            "open_time": start + timedelta(minutes=i),
+            "close_time": start + timedelta(minutes=i + 1)
+        }
+        for i, close in enumerate(closes)
+    ]
+    for offset in range(0, count, 10_000):
+        db.execute(insert(Candle), rows[offset:offset + 10_000])
+    db.commit()
+    archive.append(rows)
+    return asset.id
+
+
+def _items(candles) -> list:
+    """Dicts da resposta montados campo a campo (como o endpoint antigo)"""
+    return [
+        {
+            "open": c.open_price,
+            "high": c.high_price,
+            "low": c.low_price,
+            "close": c.close_price,
+            "volume": c.volume,
+            "trades": c.trades_count,
+            "open_time": c.open_time.isoformat(),
+            "close_time": c.close_time.isoformat()
+        }
+        for c in candles
+    ]
+
+
+def _paths(db, archive: CandleArchive, asset_id: int):
+    """Cada caminho devolve tudo o que criou (para medir as alocações)"""
+    def orm(limit):
+        candles = db.query(Candle).filter(
+            Candle.asset_id == asset_id, Candle.interval == INTERVAL
+        ).order_by(Candle.open_time.desc()).limit(limit).all()
+        candles.reverse()
+        items = _items(candles)
+        return candles, items, json.dumps({"candles": items})
+
+    def core(limit):
+        candles = get_recent_candles(db, asset_id, INTERVAL, limit)
+        items = _items(candles)
+        return candles, items, json.dumps({"candles": items})
+
+    def columns(limit):
+        candles = read_candles(db, asset_id, INTERVAL, limit, archive)
+        return candles, f'{{"candles":{candles.to_json()}}}'
+
+    def binary(limit):
+        candles = read_candles(db, asset_id, INTERVAL, limit, archive)
+        return candles, candles.to_bytes()
+
+    return {"orm": orm, "banco": core, "arquivo": columns, "binário": binary}
+
+
+def _measure(path, limit: int, repeat: int):
+    """Mediana do tempo (ms), pico de memória (KB) e blocos alocados"""
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            path(limit)
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    result = path(limit)
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return statistics.median(timings), peak / 1024, blocks
+
+
+def run_benchmark(limits: list, repeat: int):
+    """Compara os caminhos de leitura para cada quantidade de velas"""
+    total = max(limits)
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_engine(f"sqlite:///{workdir}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        archive = CandleArchive(root=f"{workdir}/archive", intervals=["1m"], enabled=True)
+
+        print(f"💾 Gravando {total:,} velas de 1m (banco e arquivo)...")
+        asset_id = _seed(db, archive, total)
+
+        print(f"\n{'velas':>7} {'caminho':>8} {'tempo (ms)':>11} {'x orm':>7} "
+              f"{'pico (KB)':>10} {'blocos':>10}")
+        for limit in limits:
+            baseline = None
+            for name, path in _paths(db, archive, asset_id).items():
+                elapsed, peak, blocks = _measure(path, limit, repeat)
+                baseline = baseline or elapsed
+                print(f"{limit:>7,} {name:>8} {elapsed:>11.2f} {baseline / elapsed:>6.1f}x "
+                      f"{peak:>10,.0f} {blocks:>10,}")
+            print()
+
+        db.close()
+        engine.dispose()
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark das leituras de velas: banco x arquivo colunar",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  python scripts/benchmark_candle_archive.py                      # 500, 5000 e 50000 velas
+  python scripts/benchmark_candle_archive.py --limits 100 1000 --repeat 20
+        """
+    )
+
+    parser.add_argument('--limits', type=int, nargs='+', default=[500, 5_000, 50_000],
+                        help='Quantidades de velas lidas (padrão: 500 5000 50000)')
+    parser.add_argument('--repeat', type=int, default=7,
+                        help='Repetições por medida (padrão: 7)')
+
+    args = parser.parse_args()
+
+    print("📈 BENCHMARK: LEITURA DE VELAS (BANCO X ARQUIVO COLUNAR)")
+    print("=" * 60)
+    run_benchmark(args.limits, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
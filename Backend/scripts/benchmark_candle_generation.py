@@ -0,0 +1,114 @@
+"""
+Benchmark da geração de velas: laço escalar x simulação vetorizada (NumPy)
+
+Compara, para N ativos simulados, o tempo de gerar um intervalo inteiro com
+generate_realistic_price_movement (um random.gauss por tick, ativo a ativo)
+e com generate_price_movements (uma matriz ativos x ticks para todos).
+A coluna "numpy+linhas" inclui a montagem dos dicts prontos para inserção
+em lote (generate_candle_rows). Não acessa o banco.
+"""
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.models.investment import Asset, AssetType, CandleInterval
+from src.services.candle_service import CandleSimulator, INTERVAL_SECONDS
+
+
+def _assets(count: int) -> list:
+    """Ativos em memória (não persistidos) com preços variados"""
+    return [
+        Asset(
+            id=i + 1,
+            symbol=f"SIM{i}",
+            asset_type=AssetType.STOCK,
+            current_price=10.0 + (i % 500)
+        )
+        for i in range(count)
+    ]
+
+
+def _best_of(repeat: int, action) -> float:
+    """Menor tempo (segundos) entre `repeat` execuções"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run_benchmark(symbols: list, intervals: list, repeat: int):
+    """Executa o benchmark para cada combinação de ativos x intervalo"""
+    simulator = CandleSimulator()
+
+    print(f"{'ativos':>8} {'intervalo':>10} {'escalar (ms)':>14} "
+          f"{'numpy (ms)':>12} {'numpy+linhas (ms)':>18} "
+          f"{'speedup':>9} {'c/ linhas':>10}")
+
+    for count in symbols:
+        assets = _assets(count)
+        prices = [asset.current_price for asset in assets]
+        types = [asset.asset_type for asset in assets]
+        open_times = [datetime.utcnow()] * count
+
+        for interval in intervals:
+            seconds = INTERVAL_SECONDS[interval]
+
+            scalar = _best_of(repeat, lambda: [
+                simulator.generate_realistic_price_movement(
+                    asset.current_price, asset.asset_type, seconds
+                )
+                for asset in assets
+            ])
+            vectorized = _best_of(repeat, lambda: simulator.generate_price_movements(
+                prices, types, seconds
+            ))
+            with_rows = _best_of(repeat, lambda: simulator.generate_candle_rows(
+                assets, interval, open_times, seconds
+            ))
+
+            print(f"{count:>8} {interval.value:>10} {scalar * 1000:>14.2f} "
+                  f"{vectorized * 1000:>12.2f} {with_rows * 1000:>18.2f} "
+                  f"{scalar / vectorized:>8.1f}x {scalar / with_rows:>9.1f}x")
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark da geração de velas (escalar x NumPy)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  python scripts/benchmark_candle_generation.py                          # 100, 1000 e 5000 ativos
+  python scripts/benchmark_candle_generation.py --symbols 1000 10000
+  python scripts/benchmark_candle_generation.py --intervals 1s 1m 1h --repeat 5
+        """
+    )
+
+    parser.add_argument('--symbols', type=int, nargs='+', default=[100, 1000, 5000],
+                        help='Quantidades de ativos simulados (padrão: 100 1000 5000)')
+    parser.add_argument('--intervals', nargs='+', default=['1s', '1m', '5m'],
+                        choices=[interval.value for interval in CandleInterval],
+                        help='Intervalos gerados (padrão: 1s 1m 5m)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Execuções por medição; vale a melhor (padrão: 3)')
+
+    args = parser.parse_args()
+
+    print("📈 Benchmark de geração de velas")
+    run_benchmark(
+        args.symbols,
+        [CandleInterval(value) for value in args.intervals],
+        args.repeat
+    )
+
+
+if __name__ == "__main__":
+    main()
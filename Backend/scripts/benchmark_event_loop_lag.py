@@ -0,0 +1,192 @@
+"""
+Benchmark do atraso do event loop: simulador no event loop x thread própria
+
+Roda o simulador de velas por alguns segundos sobre um banco SQLite
+temporário com N ações, de duas formas:
+
+- inline: o tick (geração, INSERT/UPDATE em lote e commit) roda dentro do
+  event loop, como fazia o antigo market_simulator_background
+- thread: o tick roda no MarketSimulatorWorker e o event loop só recebe as
+  velas pela fila
+
+Em paralelo, clientes simulados fazem "requisições" curtas (serialização
+JSON + espera de 10 ms) e medem a latência de cada uma. O atraso do event
+loop é medido com o mesmo EventLoopLagMonitor exposto em
+/api/v1/market/simulator/status. Não acessa o banco da aplicação.
+"""
+import sys
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import src.models  # noqa: F401 - registra todas as tabelas
+from src.database.connection import Base
+from src.models.investment import Asset, AssetCategory, AssetType
+from src.services.candle_service import (
+    CandleRollup, CandleStateCache, simulate_base_tick
+)
+from src.services.event_loop_monitor import EventLoopLagMonitor
+from src.services.market_simulator_service import MarketSimulatorWorker
+
+
+REQUEST_PAYLOAD = {"items": [{"id": i, "value": i * 1.5} for i in range(50)]}
+
+
+def _session_factory(path: str, symbols: int):
+    """Banco SQLite temporário com `symbols` ações ativas"""
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = factory()
+    db.add_all([
+        Asset(
+            symbol=f"SIM{i}",
+            name=f"Simulada {i}",
+            asset_type=AssetType.STOCK,
+            category=AssetCategory.TECHNOLOGY,
+            current_price=10.0 + (i % 500)
+        )
+        for i in range(symbols)
+    ])
+    db.commit()
+    db.close()
+    return engine, factory
+
+
+def _percentile(samples: list, p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+async def _client(latencies: list, stop: asyncio.Event):
+    """Requisição simulada: trabalho curto + espera de I/O de 10 ms"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        json.dumps(REQUEST_PAYLOAD)
+        await asyncio.sleep(0.01)
+        latencies.append(time.perf_counter() - started)
+
+
+async def _run_mode(mode: str, factory, seconds: float, clients: int) -> dict:
+    """Executa o simulador num modo e devolve as métricas medidas"""
+    state = CandleStateCache()
+    rollup = CandleRollup()
+    monitor = EventLoopLagMonitor(interval=0.01, window=100_000)
+    latencies = []
+    stop = asyncio.Event()
+    ticks = 0
+
+    async def publish(rows):
+        nonlocal ticks
+        ticks += 1
+
+    monitor.start()
+    tasks = [asyncio.create_task(_client(latencies, stop)) for _ in range(clients)]
+
+    if mode == "inline":
+        db = factory()
+        state.warm(db)
+        db.close()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            db = factory()
+            try:
+                await publish(simulate_base_tick(db, state, rollup))
+            finally:
+                db.close()
+            await asyncio.sleep(1)
+    else:
+        worker = MarketSimulatorWorker(
+            tick_seconds=1.0,
+            session_factory=factory,
+            state=state,
+            rollup=rollup
+        )
+        worker.start(publish)
+        await asyncio.sleep(seconds)
+        await worker.stop()
+
+    stop.set()
+    await asyncio.gather(*tasks)
+    await monitor.stop()
+
+    lag = monitor.metrics()["lag_ms"]
+    return {
+        "ticks": ticks,
+        "lag_p50": lag["p50"],
+        "lag_p99": lag["p99"],
+        "lag_max": lag["max"],
+        "req_p50": (_percentile(latencies, 0.50) - 0.01) * 1000,
+        "req_p99": (_percentile(latencies, 0.99) - 0.01) * 1000,
+    }
+
+
+def run_benchmark(symbols: list, seconds: float, clients: int):
+    """Executa os dois modos para cada quantidade de ações"""
+    print(f"{'ações':>7} {'modo':>7} {'ticks':>6} {'atraso p50':>11} "
+          f"{'atraso p99':>11} {'atraso máx':>11} {'req p50':>9} {'req p99':>9}")
+    print(f"{'':>7} {'':>7} {'':>6} {'(ms)':>11} {'(ms)':>11} {'(ms)':>11} "
+          f"{'(ms)':>9} {'(ms)':>9}")
+
+    for count in symbols:
+        for mode in ("inline", "thread"):
+            fd, path = tempfile.mkstemp(suffix=".db")
+            os.close(fd)
+            engine, factory = _session_factory(path, count)
+            try:
+                result = asyncio.run(_run_mode(mode, factory, seconds, clients))
+            finally:
+                engine.dispose()
+                os.remove(path)
+
+            print(f"{count:>7} {mode:>7} {result['ticks']:>6} "
+                  f"{result['lag_p50']:>11.2f} {result['lag_p99']:>11.2f} "
+                  f"{result['lag_max']:>11.2f} {result['req_p50']:>9.2f} "
+                  f"{result['req_p99']:>9.2f}")
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark do atraso do event loop (simulador inline x thread)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  python scripts/benchmark_event_loop_lag.py                       # 1000 ações, 10s por modo
+  python scripts/benchmark_event_loop_lag.py --symbols 500 5000
+  python scripts/benchmark_event_loop_lag.py --seconds 30 --clients 100
+        """
+    )
+
+    parser.add_argument('--symbols', type=int, nargs='+', default=[1000],
+                        help='Quantidades de ações simuladas (padrão: 1000)')
+    parser.add_argument('--seconds', type=float, default=10.0,
+                        help='Duração de cada modo em segundos (padrão: 10)')
+    parser.add_argument('--clients', type=int, default=50,
+                        help='Clientes simulados concorrentes (padrão: 50)')
+
+    args = parser.parse_args()
+
+    print("⏱️  Benchmark do atraso do event loop")
+    run_benchmark(args.symbols, args.seconds, args.clients)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark das codificações do feed de mercado (bytes por frame)
+
+Monta um tick de velas de 1s e um frame de preços para N ações com cada
+codificação do feed (src/api/feed_codec.py) e compara o tamanho dos frames
+e o tempo de codificação com o JSON verboso padrão. Nos modos compactos, o
+frame de dicionário (enviado uma vez por conexão) é mostrado à parte.
+Não acessa o banco.
+"""
+import sys
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.api.feed_codec import (
+    CANDLES, CODECS, PRICES, dictionary_frame, msgpack
+)
+from src.models.investment import CandleInterval
+
+
+def _records(symbols: int):
+    """Velas de 1s e preços sintéticos para `symbols` ações"""
+    now = datetime.utcnow().replace(microsecond=0)
+    candles, prices = [], []
+    for i in range(symbols):
+        open_price = round(random.uniform(5, 500), 2)
+        close_price = round(open_price * random.uniform(0.99, 1.01), 2)
+        record = {
+            "asset_id": i + 1,
+            "symbol": f"SIM{i}",
+            "name": f"Simulada {i} S.A.",
+        }
+        candles.append(dict(
+            record,
+            interval=CandleInterval.ONE_SECOND,
+            open_price=open_price,
+            high_price=max(open_price, close_price) + 0.01,
+            low_price=min(open_price, close_price) - 0.01,
+            close_price=close_price,
+            volume=round(random.uniform(1_000, 100_000), 2),
+            trades_count=random.randint(1, 2_000),
+            open_time=now,
+            close_time=now + timedelta(seconds=1),
+        ))
+        prices.append(dict(record, price=close_price))
+    return candles, prices
+
+
+def _encode(codec, kind: str, records: list, meta: dict):
+    """Codifica um frame completo e devolve (frame, tempo em ms)"""
+    started = time.perf_counter()
+    frame = codec.frame(kind, [codec.item(kind, record) for record in records], meta)
+    return frame, (time.perf_counter() - started) * 1000
+
+
+def run_benchmark(symbols: list):
+    """Compara as codificações para cada quantidade de ações"""
+    codecs = [codec for codec in CODECS.values()
+              if codec.name != "msgpack" or msgpack is not None]
+    if msgpack is None:
+        print("⚠️  msgpack não instalado: modo msgpack ignorado")
+
+    print(f"{'ações':>7} {'modo':>8} {'velas (B)':>10} {'B/vela':>7} "
+          f"{'redução':>8} {'preços (B)':>11} {'redução':>8} {'codif. (ms)':>12}")
+
+    for count in symbols:
+        candles, prices = _records(count)
+        meta = {"seq": 1, "timestamp": datetime.utcnow(), "base": 41, "version": 42}
+        baseline = None
+        for codec in codecs:
+            candle_frame, elapsed = _encode(codec, CANDLES, candles, meta)
+            price_frame, _ = _encode(codec, PRICES, prices, meta)
+            sizes = (len(candle_frame.encode() if isinstance(candle_frame, str) else candle_frame),
+                     len(price_frame.encode() if isinstance(price_frame, str) else price_frame))
+            if baseline is None:
+                baseline = sizes
+            print(f"{count:>7} {codec.name:>8} {sizes[0]:>10} {sizes[0] / count:>7.1f} "
+                  f"{baseline[0] / sizes[0]:>7.1f}x {sizes[1]:>11} "
+                  f"{baseline[1] / sizes[1]:>7.1f}x {elapsed:>12.2f}")
+
+        entries = [(r["asset_id"], r["symbol"], r["name"]) for r in prices]
+        print(f"{'':>7} dicionário (uma vez por conexão): "
+              f"{len(dictionary_frame(entries, reset=True).encode())} B")
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark das codificações do feed de mercado",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  python scripts/benchmark_feed_encoding.py                 # 1000 ações
+  python scripts/benchmark_feed_encoding.py --symbols 100 1000 5000
+        """
+    )
+
+    parser.add_argument('--symbols', type=int, nargs='+', default=[1000],
+                        help='Quantidades de ações simuladas (padrão: 1000)')
+
+    args = parser.parse_args()
+
+    print("📦 Benchmark das codificações do feed de mercado")
+    run_benchmark(args.symbols)
+
+
+if __name__ == "__main__":
+    main()
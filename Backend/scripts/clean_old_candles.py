@@ -1,6 +1,11 @@
 """
 Script para limpar velas antigas do banco de dados
-Mantém apenas as velas mais recentes de cada intervalo
+Executa a retenção de velas (candle_retention_service) manualmente: cada
+ativo mantém, em cada intervalo, as velas da janela de CANDLE_RETENTION
+contada a partir da sua última vela. As velas vencidas são agregadas no
+intervalo maior (CANDLE_ROLLUP_TARGETS) e apagadas em faixas de open_time.
+Com CANDLE_PARTITIONED, descarta as partições vencidas inteiras.
+A API executa a mesma retenção periodicamente (CANDLE_RETENTION_ENABLED)
 """
 import sys
 from pathlib import Path
@@ -8,63 +13,62 @@ from pathlib import Path
 # Adiciona o diretório raiz ao path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from datetime import datetime, timedelta
-from src.database.connection import SessionLocal
-from src.models.investment import Candle, CandleInterval
+from src.services.candle_retention_service import CandleRetentionService
+
+
+def clean_old_candles(max_rows: int = None, rollup: bool = True, until_done: bool = True):
+    """Remove velas vencidas (por ativo e intervalo)"""
+    service = CandleRetentionService(max_rows=max_rows, rollup=rollup)
+
+    unit = "partições" if service.partitions.enabled else "velas"
 
-def clean_old_candles():
-    """Remove velas antigas, mantendo apenas as mais recentes"""
-    db = SessionLocal()
-    
     try:
-        # Define quantas velas manter para cada intervalo
-        keep_limits = {
-            CandleInterval.ONE_SECOND: 120,      # 2 minutos
-            CandleInterval.FIVE_SECONDS: 120,    # 10 minutos
-            CandleInterval.TEN_SECONDS: 120,     # 20 minutos
-            CandleInterval.THIRTY_SECONDS: 120,  # 1 hora
-            CandleInterval.ONE_MINUTE: 120,      # 2 horas
-            CandleInterval.FIVE_MINUTES: 120,    # 10 horas
-            CandleInterval.FIFTEEN_MINUTES: 96,  # 1 dia
-            CandleInterval.ONE_HOUR: 48,         # 2 dias
-            CandleInterval.FOUR_HOURS: 48,       # 8 dias
-            CandleInterval.ONE_DAY: 60           # 2 meses
-        }
-        
-        total_deleted = 0
-        
-        for interval, keep_limit in keep_limits.items():
-            # Conta quantas velas existem
-            total = db.query(Candle).filter(
-                Candle.interval == interval
-            ).count()
-            
-            if total > keep_limit:
-                # Busca as velas mais antigas para deletar
-                candles_to_delete = db.query(Candle).filter(
-                    Candle.interval == interval
-                ).order_by(Candle.open_time.asc()).limit(total - keep_limit).all()
-                
-                for candle in candles_to_delete:
-                    db.delete(candle)
-                
-                deleted = len(candles_to_delete)
-                total_deleted += deleted
-                
-                print(f"✅ {interval.value}: Removidas {deleted} velas antigas (mantidas {keep_limit})")
-            else:
-                print(f"✓  {interval.value}: {total} velas (dentro do limite)")
-        
-        db.commit()
-        print(f"\n🎯 Total de velas removidas: {total_deleted}")
+        while True:
+            removed = service.run_once()
+            print(f"✅ Removidas {removed} {unit} "
+                  f"({service.last_run_seconds * 1000:.0f} ms)")
+            if not until_done or not service.backlog:
+                break
+
+        metrics = service.metrics()
+        if service.partitions.enabled:
+            print(f"\n🎯 Total de partições descartadas: {metrics['dropped_partitions']}")
+        else:
+            print(f"\n🎯 Total de velas removidas: {metrics['deleted']}")
+        print(f"📊 Velas agregadas em intervalos maiores: {metrics['rolled_up']}")
         print("✅ Limpeza concluída!")
-        
+
     except Exception as e:
         print(f"❌ Erro: {e}")
-        db.rollback()
-    finally:
-        db.close()
 
-if __name__ == "__main__":
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Remove velas antigas (retenção por ativo e intervalo)",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  python scripts/clean_old_candles.py                    # até não restar vela vencida
+  python scripts/clean_old_candles.py --once             # uma execução (CANDLE_RETENTION_MAX_ROWS)
+  python scripts/clean_old_candles.py --max-rows 20000 --no-rollup
+        """
+    )
+
+    parser.add_argument('--max-rows', type=int, default=None,
+                        help='Velas apagadas por execução (padrão: CANDLE_RETENTION_MAX_ROWS)')
+    parser.add_argument('--no-rollup', action='store_true',
+                        help='Apaga sem agregar as velas vencidas nos intervalos maiores')
+    parser.add_argument('--once', action='store_true',
+                        help='Faz uma única execução limitada')
+
+    args = parser.parse_args()
+
     print("🧹 Iniciando limpeza de velas antigas...")
-    clean_old_candles()
+    clean_old_candles(args.max_rows, not args.no_rollup, not args.once)
+
+
+if __name__ == "__main__":
+    main()
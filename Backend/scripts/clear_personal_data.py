@@ -12,10 +12,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.database.connection import SessionLocal
 from src.models.user import User
-from src.models.account import Account
+from src.models.account import Account, BalanceSnapshot
+from src.models.ledger import LedgerEntry
 from src.models.transaction import Transaction
 from src.models.credit_card import CreditCard
 from src.models.investment import Asset, PortfolioItem, Candle
+from src.services.candle_partitions import candle_partitions
 
 
 def clear_personal_data():
@@ -37,19 +39,30 @@ def clear_personal_data():
             db.query(CreditCard).delete()
             print(f"✅ Removidos {credit_cards} cartões de crédito")
         
-        # 3. Limpar transações
+        # 3. Limpar lançamentos do razão e snapshots de saldo
+        entries = db.query(LedgerEntry).count()
+        if entries > 0:
+            db.query(LedgerEntry).delete()
+            print(f"✅ Removidos {entries} lançamentos do razão")
+        
+        snapshots = db.query(BalanceSnapshot).count()
+        if snapshots > 0:
+            db.query(BalanceSnapshot).delete()
+            print(f"✅ Removidos {snapshots} snapshots de saldo")
+        
+        # 4. Limpar transações
         transactions = db.query(Transaction).count()
         if transactions > 0:
             db.query(Transaction).delete()
             print(f"✅ Removidas {transactions} transações")
         
-        # 4. Limpar contas bancárias
+        # 5. Limpar contas bancárias
         accounts = db.query(Account).count()
         if accounts > 0:
             db.query(Account).delete()
             print(f"✅ Removidas {accounts} contas bancárias")
         
-        # 5. Limpar usuários
+        # 6. Limpar usuários
         users = db.query(User).count()
         if users > 0:
             db.query(User).delete()
@@ -95,6 +108,8 @@ def clear_all_data():
         tables_to_clear = [
             (PortfolioItem, "itens de portfólio"),
             (CreditCard, "cartões de crédito"),
+            (LedgerEntry, "lançamentos do razão"),
+            (BalanceSnapshot, "snapshots de saldo"),
             (Transaction, "transações"),
             (Account, "contas bancárias"),
             (User, "usuários"),
@@ -110,6 +125,13 @@ def clear_all_data():
         
         db.commit()
         
+        # Velas particionadas (CANDLE_PARTITIONED): descarta as partições
+        partitions = candle_partitions.partitions()
+        for partition in partitions:
+            candle_partitions.drop(partition)
+        if partitions:
+            print(f"✅ Removidas {len(partitions)} partições de velas")
+        
         print("\n" + "="*60)
         print("✅ Limpeza TOTAL concluída!")
         print("="*60)
@@ -8,7 +8,8 @@ sys.path.append('.')
 from datetime import datetime, timedelta
 from src.database.connection import SessionLocal
 from src.models.investment import Asset, AssetType, CandleInterval
-from src.services.candle_service import candle_simulator, Candle
+from src.services.candle_partitions import candle_partitions
+from src.services.candle_service import candle_simulator
 
 
 def generate_historical_candles(days=7):
@@ -46,6 +47,7 @@ def generate_historical_candles(days=7):
             now = datetime.utcnow()
             current_price = stock.current_price
             candles_created = 0
+            rows = []
             
             # Gera velas retroativas
             for i in range(total_minutes):
@@ -71,32 +73,34 @@ def generate_historical_candles(days=7):
                 open_time = candle_time.replace(second=0, microsecond=0)
                 close_time = open_time + timedelta(minutes=1)
                 
-                candle = Candle(
-                    asset_id=stock.id,
-                    interval=CandleInterval.ONE_MINUTE,
-                    open_price=candle_data['open'],
-                    high_price=candle_data['high'],
-                    low_price=candle_data['low'],
-                    close_price=candle_data['close'],
-                    volume=candle_data['volume'],
-                    trades_count=candle_data['trades_count'],
-                    quote_volume=candle_data['quote_volume'],
-                    open_time=open_time,
-                    close_time=close_time
-                )
-                
-                db.add(candle)
+                rows.append({
+                    'asset_id': stock.id,
+                    'interval': CandleInterval.ONE_MINUTE,
+                    'open_price': candle_data['open'],
+                    'high_price': candle_data['high'],
+                    'low_price': candle_data['low'],
+                    'close_price': candle_data['close'],
+                    'volume': candle_data['volume'],
+                    'trades_count': candle_data['trades_count'],
+                    'quote_volume': candle_data['quote_volume'],
+                    'open_time': open_time,
+                    'close_time': close_time
+                })
                 
                 # Atualiza preço para próxima vela
                 current_price = candle_data['close']
                 candles_created += 1
                 
-                # Commit a cada 100 velas para não sobrecarregar
+                # Grava a cada 100 velas para não sobrecarregar (na tabela
+                # candles ou nas partições, com CANDLE_PARTITIONED)
                 if candles_created % 100 == 0:
+                    candle_partitions.insert(db, rows)
                     db.commit()
+                    rows = []
                     print(f"  ✅ {candles_created} velas criadas...")
             
             # Commit final
+            candle_partitions.insert(db, rows)
             db.commit()
             
             # Atualiza preço atual do ativo
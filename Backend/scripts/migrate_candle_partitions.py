@@ -0,0 +1,93 @@
+"""
+Script para mover as velas da tabela candles para as partições
+Usado ao ligar CANDLE_PARTITIONED num banco que já tem velas: copia as
+velas em blocos (por id) para a partição de cada intervalo/período e
+apaga da tabela candles o bloco copiado, um commit por bloco. Pode ser
+interrompido e executado de novo: continua do menor id restante
+"""
+import sys
+import time
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import delete, func, select
+
+from src.database.connection import SessionLocal
+from src.models.investment import Candle
+from src.services.candle_partitions import CandlePartitions
+
+
+def migrate_candle_partitions(chunk: int = 10_000):
+    """Move as velas da tabela candles para as partições"""
+    partitions = CandlePartitions(enabled=True)
+    table = Candle.__table__
+    columns = [column for column in table.c if column.name != "id"]
+    db = SessionLocal()
+
+    try:
+        total = db.execute(select(func.count()).select_from(table)).scalar()
+        print(f"📊 {total:,} velas na tabela candles")
+
+        moved = 0
+        started = time.perf_counter()
+        while True:
+            ids = db.execute(
+                select(table.c.id).order_by(table.c.id).limit(chunk)
+            ).scalars().all()
+            if not ids:
+                break
+
+            rows = [
+                dict(row._mapping) for row in db.execute(
+                    select(*columns).where(table.c.id.between(ids[0], ids[-1]))
+                )
+            ]
+            # Partições criadas antes de escrever na sessão
+            for row in rows:
+                partitions.ensure(row['interval'], row['open_time'])
+            partitions.insert(db, rows)
+            db.execute(delete(table).where(table.c.id.between(ids[0], ids[-1])))
+            db.commit()
+
+            moved += len(rows)
+            print(f"  ✅ {moved:,}/{total:,} velas movidas")
+
+        elapsed = time.perf_counter() - started
+        print(f"\n🎯 {moved:,} velas movidas em {elapsed:.1f}s")
+        for interval, count in partitions.metrics()["partitions"].items():
+            print(f"   • {interval}: {count} partições")
+
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Erro: {e}")
+    finally:
+        db.close()
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Move as velas da tabela candles para as partições",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  python scripts/migrate_candle_partitions.py
+  python scripts/migrate_candle_partitions.py --chunk 50000
+        """
+    )
+
+    parser.add_argument('--chunk', type=int, default=10_000,
+                        help='Velas por bloco (um commit cada, padrão: 10000)')
+
+    args = parser.parse_args()
+
+    print("🗂️  Migrando velas para as partições...")
+    migrate_candle_partitions(args.chunk)
+
+
+if __name__ == "__main__":
+    main()
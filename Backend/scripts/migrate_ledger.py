@@ -0,0 +1,81 @@
+"""
+Script para migrar o histórico de transações para o razão (ledger_entries)
+
+Gera os lançamentos com sinal das transações antigas (incluindo as duas
+linhas das transferências anteriores ao razão) e, em seguida, o lançamento
+de abertura de cada conta: a diferença entre o saldo atual e a soma dos
+lançamentos. Pode ser executado de novo sem duplicar lançamentos.
+
+Execute com a API parada para que nenhum saldo mude durante a migração.
+"""
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database.connection import SessionLocal, create_tables
+from src.services import ledger_service
+
+
+def migrate(batch_size: int = 1000, reconcile: bool = True):
+    """Migra transações e saldos iniciais para o razão"""
+    db = SessionLocal()
+
+    try:
+        entries = ledger_service.migrate_transactions(db, batch_size)
+        print(f"   📒 Lançamentos de transações criados: {entries}")
+
+        openings = ledger_service.migrate_opening_balances(db, batch_size)
+        print(f"   📒 Lançamentos de abertura criados: {openings}")
+
+        if reconcile:
+            result = ledger_service.reconcile(db, batch_size)
+            print(f"   🔎 Contas conferidas: {result['accounts_checked']}, "
+                  f"divergências: {result['mismatch_count']}")
+
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Migra o histórico de transações para o razão",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  python scripts/migrate_ledger.py                      # Migra e concilia
+  python scripts/migrate_ledger.py --batch-size 5000    # Lotes maiores
+  python scripts/migrate_ledger.py --no-reconcile       # Apenas migra
+        """
+    )
+
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=1000,
+        help='Transações/contas por lote (padrão: 1000)'
+    )
+
+    parser.add_argument(
+        '--no-reconcile',
+        action='store_true',
+        help='Não executa a conciliação ao final'
+    )
+
+    args = parser.parse_args()
+
+    print("🔄 Migrando transações para o razão...")
+    create_tables()
+    migrate(args.batch_size, reconcile=not args.no_reconcile)
+    print("✅ Migração concluída!")
+
+
+if __name__ == "__main__":
+    main()
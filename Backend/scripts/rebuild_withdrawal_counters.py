@@ -0,0 +1,89 @@
+"""
+Script para reconstruir os contadores diários de saque
+Recalcula quantidade e total de saques por conta a partir do histórico
+"""
+import sys
+from pathlib import Path
+from datetime import date, datetime, timedelta
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database.connection import SessionLocal, create_tables
+from src.services.transaction_service import (
+    rebuild_daily_withdrawal_counters, prune_daily_withdrawal_counters
+)
+
+
+def rebuild_counters(start_day: date, days: int, keep_days: int):
+    """Reconstrói os contadores de `days` dias a partir de `start_day`"""
+    db = SessionLocal()
+
+    try:
+        for offset in range(days):
+            business_day = start_day + timedelta(days=offset)
+            accounts = rebuild_daily_withdrawal_counters(db, business_day)
+            print(f"✅ {business_day}: {accounts} contas com saques")
+
+        if keep_days > 0:
+            pruned = prune_daily_withdrawal_counters(db, keep_days)
+            print(f"🧹 Contadores antigos removidos: {pruned}")
+
+        print("✅ Reconstrução concluída!")
+
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Reconstrói os contadores diários de saque",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  python scripts/rebuild_withdrawal_counters.py                     # Apenas hoje (UTC)
+  python scripts/rebuild_withdrawal_counters.py --date 2025-11-20   # Dia específico
+  python scripts/rebuild_withdrawal_counters.py --days 7            # Últimos 7 dias
+        """
+    )
+
+    parser.add_argument(
+        '--date',
+        type=str,
+        default=None,
+        help='Dia final no formato AAAA-MM-DD (padrão: hoje em UTC)'
+    )
+    parser.add_argument(
+        '--days',
+        type=int,
+        default=1,
+        help='Quantidade de dias a reconstruir, terminando em --date (padrão: 1)'
+    )
+    parser.add_argument(
+        '--keep-days',
+        type=int,
+        default=7,
+        help='Remove contadores mais antigos que N dias (0 = não remove)'
+    )
+
+    args = parser.parse_args()
+
+    end_day = (
+        datetime.strptime(args.date, "%Y-%m-%d").date()
+        if args.date else datetime.utcnow().date()
+    )
+    start_day = end_day - timedelta(days=max(args.days, 1) - 1)
+
+    print("🔄 Reconstruindo contadores diários de saque...")
+    create_tables()
+    rebuild_counters(start_day, max(args.days, 1), args.keep_days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Script de conciliação do razão
+
+Confere o saldo de cada conta contra a soma dos seus lançamentos em
+ledger_entries e verifica se as pernas das transferências se anulam.
+As contas são lidas em lotes e as somas são agregadas no banco, então o
+uso de memória não depende do tamanho do histórico.
+
+Sai com código 1 se houver divergência (útil em cron/CI).
+"""
+import sys
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database.connection import SessionLocal
+from src.services import ledger_service
+
+
+def reconcile(batch_size: int = 1000, max_reported: int = 100) -> bool:
+    """Executa a conciliação e imprime as divergências encontradas"""
+    db = SessionLocal()
+
+    try:
+        result = ledger_service.reconcile(db, batch_size, max_reported)
+    finally:
+        db.close()
+
+    print(f"   🔎 Contas conferidas: {result['accounts_checked']}")
+    print(f"   ⚖️  Soma das transferências: R$ {result['transfer_imbalance']:.2f}")
+
+    for mismatch in result["mismatches"]:
+        print(
+            f"   ❌ Conta {mismatch['account_id']}: "
+            f"saldo R$ {mismatch['balance']:.2f}, "
+            f"razão R$ {mismatch['ledger_balance']:.2f} "
+            f"(diferença R$ {mismatch['difference']:.2f})"
+        )
+    if result["mismatch_count"] > len(result["mismatches"]):
+        print(f"   ... e mais "
+              f"{result['mismatch_count'] - len(result['mismatches'])} contas")
+
+    if result["balanced"]:
+        print("✅ Razão conciliado: saldos conferem com os lançamentos")
+    else:
+        print(f"❌ {result['mismatch_count']} contas com divergência")
+
+    return result["balanced"]
+
+
+def main():
+    """Função principal"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Concilia os saldos das contas com o razão",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos:
+  python scripts/reconcile_ledger.py                     # Concilia todas as contas
+  python scripts/reconcile_ledger.py --batch-size 5000   # Lotes maiores
+  python scripts/reconcile_ledger.py --max-reported 10   # Lista até 10 divergências
+        """
+    )
+
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=1000,
+        help='Contas por lote (padrão: 1000)'
+    )
+
+    parser.add_argument(
+        '--max-reported',
+        type=int,
+        default=100,
+        help='Máximo de divergências listadas (padrão: 100)'
+    )
+
+    args = parser.parse_args()
+
+    print("🔄 Conciliando razão...")
+    if not reconcile(args.batch_size, args.max_reported):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
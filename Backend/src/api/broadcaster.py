@@ -0,0 +1,584 @@
+"""
+Broadcaster do feed de mercado via WebSocket
+
+Cada mensagem é serializada uma única vez e o mesmo frame é colocado na
+fila de cada cliente. Cada conexão tem sua própria fila limitada e uma
+tarefa de envio, então um cliente lento não atrasa os demais. Com a fila
+cheia, a política configurada descarta o frame mais antigo (drop_oldest)
+ou desconecta o cliente (disconnect).
+
+Assinaturas: cada cliente assina símbolos (preços) e, por símbolo, os
+intervalos de vela que quer receber. O índice símbolo -> clientes evita
+percorrer todas as conexões, e cada vela é serializada uma vez e reaproveitada
+em todos os frames que a contêm. "*" assina todos os símbolos/intervalos.
+Indicadores técnicos assinados ("rsi:14", "macd"...) chegam para todos os
+símbolos/intervalos de vela assinados pelo cliente.
+
+Codificação: cada cliente escolhe json (padrão), compact, msgpack ou binary
+(ver feed_codec). Cada item é codificado uma vez por codificação em uso.
+Nos modos compactos, o cliente recebe o dicionário id -> símbolo antes das
+linhas que usam ids novos.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import WebSocket
+
+from src.api.feed_codec import (
+    CODECS, FeedCodec, dictionary_frame, get_codec, serialize
+)
+from src.configs.settings import settings
+from src.models.investment import CandleInterval
+from src.services.candle_indicators import parse_indicator
+from src.utils.metrics import percentile_ms
+
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+SLOW_CLIENT_POLICIES = {DROP_OLDEST, DISCONNECT}
+
+# Código de fechamento para clientes que não acompanham o feed
+# (1013: "try again later")
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+# Assina todos os símbolos ou todos os intervalos
+WILDCARD = "*"
+
+VALID_INTERVALS = {interval.value for interval in CandleInterval} | {WILDCARD}
+
+
+class ClientConnection:
+    """Conexão de um cliente: fila limitada de frames e tarefa de envio"""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+        self.dropped = 0
+        self.closed = False
+        # Símbolo -> intervalos de vela assinados (vazio = só preços)
+        self.subscriptions: Dict[str, Set[str]] = {}
+        # Indicadores assinados (nome canônico, ex.: "macd:12,26,9")
+        self.indicators: Set[str] = set()
+        self.codec: FeedCodec = CODECS["json"]
+        # Entradas do dicionário de símbolos já enviadas (modos compactos)
+        self.dictionary_sent = 0
+        # Perdeu frames: precisa dos preços completos de novo
+        self.needs_resync = False
+        self._signature: Optional[tuple] = None
+
+    def wants(
+        self,
+        symbol: str,
+        interval: Optional[str] = None,
+        indicator: Optional[str] = None
+    ) -> bool:
+        # Se o cliente recebe o preço (interval=None), a vela do símbolo ou,
+        # com `indicator`, o indicador calculado sobre essa vela
+        if indicator is not None and indicator not in self.indicators:
+            return False
+        exact = self.subscriptions.get(symbol)
+        wildcard = self.subscriptions.get(WILDCARD)
+        if interval is None:
+            return exact is not None or wildcard is not None
+        return any(
+            intervals is not None and (interval in intervals or WILDCARD in intervals)
+            for intervals in (exact, wildcard)
+        )
+
+    def signature(self) -> tuple:
+        # Clientes com a mesma assinatura e codificação recebem o mesmo frame
+        # (calculada uma vez; invalidate() quando assinaturas/codec mudam)
+        if self._signature is None:
+            self._signature = (
+                self.codec.name, tuple(sorted(self.indicators))
+            ) + tuple(sorted(
+                (symbol, tuple(sorted(intervals)))
+                for symbol, intervals in self.subscriptions.items()
+            ))
+        return self._signature
+
+    def invalidate(self):
+        self._signature = None
+
+
+class Broadcaster:
+    """Fan-out dos frames do feed para todos os clientes conectados"""
+
+    def __init__(
+        self,
+        queue_size: int = None,
+        policy: str = None,
+        latency_window: int = None
+    ):
+        self.queue_size = queue_size or settings.WS_CLIENT_QUEUE_SIZE
+        self.policy = policy or settings.WS_SLOW_CLIENT_POLICY
+        if self.policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"WS_SLOW_CLIENT_POLICY inválida: {self.policy}")
+
+        self._clients: Dict[WebSocket, ClientConnection] = {}
+        # Índice de assinaturas: símbolo -> clientes que o assinam
+        self._subscribers: Dict[str, Set[ClientConnection]] = {}
+        self._latencies: deque = deque(
+            maxlen=latency_window or settings.WS_LATENCY_WINDOW
+        )
+        self._lock = threading.Lock()
+
+        # Dicionário id -> (id, símbolo, nome) dos modos compactos (só cresce)
+        self._dictionary: List[tuple] = []
+        self._dictionary_ids: Set[int] = set()
+        self._dictionary_frames: Dict[tuple, str] = {}
+        self._seq = 0
+
+        # Métricas
+        self.published = 0
+        self.bytes_published = 0
+        self.bytes_by_encoding: Dict[str, int] = {}
+        self.frames_built = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.slow_disconnects = 0
+        self.send_errors = 0
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self._clients)
+
+    async def connect(self, websocket: WebSocket):
+        """Aceita nova conexão e inicia a tarefa de envio dela"""
+        await websocket.accept()
+        client = ClientConnection(websocket, self.queue_size)
+        client.sender = asyncio.create_task(self._send_loop(client))
+        self._clients[websocket] = client
+        print(f"📡 Nova conexão WebSocket. Total: {len(self._clients)}")
+
+    def disconnect(self, websocket: WebSocket):
+        """Remove conexão (a fila pendente é descartada)"""
+        client = self._clients.pop(websocket, None)
+        if client is None:
+            return
+        client.closed = True
+        self._unindex(client, list(client.subscriptions))
+        client.subscriptions.clear()
+        client.indicators.clear()
+        client.invalidate()
+        if client.sender and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+        print(f"📡 Conexão encerrada. Total: {len(self._clients)}")
+
+    def _unindex(self, client: ClientConnection, symbols: Iterable[str]):
+        for symbol in symbols:
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._subscribers[symbol]
+
+    def subscribe(
+        self,
+        websocket: WebSocket,
+        symbols: Iterable[str],
+        intervals: Iterable[str] = (),
+        indicators: Iterable[str] = ()
+    ) -> Dict[str, List[str]]:
+        """
+        Assina os símbolos (preços) e, para eles, os intervalos de vela.
+        Sem intervalos, o símbolo fica assinado só para preços. Os
+        indicadores (nomes canônicos) valem para todas as velas assinadas.
+        Retorna as assinaturas atuais do cliente
+        """
+        client = self._clients.get(websocket)
+        if client is None:
+            return {}
+        intervals = set(intervals)
+        for symbol in symbols:
+            client.subscriptions.setdefault(symbol, set()).update(intervals)
+            self._subscribers.setdefault(symbol, set()).add(client)
+        client.indicators.update(indicators)
+        client.invalidate()
+        return self.subscriptions(websocket)
+
+    def unsubscribe(
+        self,
+        websocket: WebSocket,
+        symbols: Iterable[str],
+        intervals: Optional[Iterable[str]] = None,
+        indicators: Iterable[str] = ()
+    ) -> Dict[str, List[str]]:
+        """
+        Remove intervalos dos símbolos ou, sem intervalos, os símbolos
+        inteiros, e os indicadores dados. Retorna as assinaturas atuais do
+        cliente
+        """
+        client = self._clients.get(websocket)
+        if client is None:
+            return {}
+        client.indicators.difference_update(indicators)
+        removed = []
+        for symbol in symbols:
+            if symbol not in client.subscriptions:
+                continue
+            if intervals is None:
+                del client.subscriptions[symbol]
+                removed.append(symbol)
+            else:
+                client.subscriptions[symbol].difference_update(intervals)
+        self._unindex(client, removed)
+        client.invalidate()
+        return self.subscriptions(websocket)
+
+    def subscriptions(self, websocket: WebSocket) -> Dict[str, List[str]]:
+        client = self._clients.get(websocket)
+        if client is None:
+            return {}
+        return {
+            symbol: sorted(intervals)
+            for symbol, intervals in sorted(client.subscriptions.items())
+        }
+
+    def indicators(self, websocket: WebSocket) -> List[str]:
+        client = self._clients.get(websocket)
+        return sorted(client.indicators) if client is not None else []
+
+    def set_encoding(self, websocket: WebSocket, name: str) -> str:
+        """
+        Troca a codificação do cliente (ValueError se inválida). O
+        dicionário de símbolos é reenviado por completo no próximo frame
+        """
+        codec = get_codec(name)
+        client = self._clients.get(websocket)
+        if client is not None:
+            client.codec = codec
+            client.invalidate()
+            client.dictionary_sent = 0
+        return codec.name
+
+    def resync(self, websocket: WebSocket):
+        # Cliente pediu resync: reenvia o dicionário completo (os preços
+        # completos são enviados pelo endpoint)
+        client = self._clients.get(websocket)
+        if client is not None:
+            client.dictionary_sent = 0
+            client.needs_resync = False
+            if client.codec.uses_dictionary:
+                self._send_dictionary(client)
+
+    def take_resyncs(self) -> List[WebSocket]:
+        # Clientes que perderam frames desde a última chamada
+        stale = [
+            client.websocket for client in self._clients.values()
+            if client.needs_resync and not client.closed
+        ]
+        for websocket in stale:
+            self._clients[websocket].needs_resync = False
+        return stale
+
+    def handle_command(self, websocket: WebSocket, text: str) -> dict:
+        """
+        Processa um comando do cliente e retorna a resposta:
+        {"action": "subscribe" | "unsubscribe", "symbols": [...], "intervals": [...],
+         "indicators": ["rsi:14", "macd", ...]}
+        {"action": "encoding", "mode": "json" | "compact" | "msgpack" | "binary"}
+        {"action": "resync"}
+        """
+        try:
+            try:
+                command = json.loads(text)
+            except json.JSONDecodeError:
+                raise ValueError("Comando inválido: JSON malformado")
+            if not isinstance(command, dict):
+                raise ValueError("Comando deve ser um objeto JSON")
+
+            action = command.get("action")
+            if action == "encoding":
+                mode = self.set_encoding(websocket, command.get("mode"))
+                return {"type": "encoding", "mode": mode}
+            if action == "resync":
+                self.resync(websocket)
+                return {"type": "resync"}
+            if action not in ("subscribe", "unsubscribe"):
+                raise ValueError(
+                    "action deve ser subscribe, unsubscribe, encoding ou resync"
+                )
+
+            symbols = command.get("symbols") or []
+            intervals = command.get("intervals")
+            if not isinstance(symbols, list) or not all(isinstance(s, str) for s in symbols):
+                raise ValueError("symbols deve ser uma lista de símbolos")
+            if intervals is not None and (
+                not isinstance(intervals, list) or
+                not all(interval in VALID_INTERVALS for interval in intervals)
+            ):
+                raise ValueError(
+                    f"intervals deve conter apenas: {', '.join(sorted(VALID_INTERVALS))}"
+                )
+            symbols = [symbol.strip().upper() for symbol in symbols if symbol.strip()]
+            indicators = command.get("indicators") or []
+            if not isinstance(indicators, list) or not all(isinstance(i, str) for i in indicators):
+                raise ValueError("indicators deve ser uma lista de indicadores")
+            indicators = [parse_indicator(spec).key for spec in indicators]
+
+            if action == "subscribe":
+                current = self.subscriptions(websocket)
+                total = len(set(current) | set(symbols))
+                if total > settings.WS_MAX_SUBSCRIPTIONS:
+                    raise ValueError(
+                        f"Máximo de {settings.WS_MAX_SUBSCRIPTIONS} símbolos assinados"
+                    )
+                subscriptions = self.subscribe(
+                    websocket, symbols, intervals or (), indicators
+                )
+            else:
+                subscriptions = self.unsubscribe(
+                    websocket, symbols, intervals, indicators
+                )
+        except ValueError as e:
+            return {"type": "error", "message": str(e)}
+
+        return {
+            "type": "subscriptions",
+            "subscriptions": subscriptions,
+            "indicators": self.indicators(websocket)
+        }
+
+    def wants(
+        self,
+        websocket: WebSocket,
+        symbol: str,
+        interval: str = None,
+        indicator: str = None
+    ) -> bool:
+        client = self._clients.get(websocket)
+        return client is not None and client.wants(symbol, interval, indicator)
+
+    def _audience(self, symbols: Iterable[str]) -> Set[ClientConnection]:
+        # Clientes que assinam algum dos símbolos (ou todos, com "*")
+        audience = set(self._subscribers.get(WILDCARD, ()))
+        for symbol in symbols:
+            audience.update(self._subscribers.get(symbol, ()))
+        return audience
+
+    def _register(self, records: List[dict]):
+        # Acrescenta ao dicionário os ativos que ainda não têm entrada
+        size = len(self._dictionary)
+        for record in records:
+            if record["asset_id"] not in self._dictionary_ids:
+                self._dictionary_ids.add(record["asset_id"])
+                self._dictionary.append(
+                    (record["asset_id"], record["symbol"], record["name"])
+                )
+        if len(self._dictionary) != size:
+            self._dictionary_frames.clear()
+
+    def _send_dictionary(self, client: ClientConnection):
+        # Entradas do dicionário que o cliente ainda não recebeu
+        if client.dictionary_sent >= len(self._dictionary):
+            return
+        # Clientes na mesma posição compartilham o frame (ex.: recém-conectados)
+        key = (client.dictionary_sent, len(self._dictionary))
+        frame = self._dictionary_frames.get(key)
+        if frame is None:
+            frame = self._dictionary_frames[key] = dictionary_frame(
+                self._dictionary[client.dictionary_sent:],
+                reset=client.dictionary_sent == 0
+            )
+        client.dictionary_sent = len(self._dictionary)
+        self._enqueue(client, (time.perf_counter(), frame))
+
+    def publish_records(
+        self,
+        kind: str,
+        records: List[dict],
+        keys: List[tuple],
+        meta: dict,
+        websocket: Optional[WebSocket] = None
+    ) -> int:
+        """
+        Envia a cada cliente só os registros que ele assinou, em um frame
+        do tipo `kind` (feed_codec.CANDLES, PRICES ou INDICATORS) na
+        codificação dele. `keys` traz (símbolo, intervalo ou None[,
+        indicador]) de cada registro e `meta`
+        o timestamp (e versões, nos preços). Só os registros assinados por
+        alguém são codificados, uma vez por codificação; clientes com a
+        mesma assinatura compartilham o frame. Com `websocket`, envia só
+        para esse cliente. Retorna os frames montados
+        """
+        if websocket is not None:
+            client = self._clients.get(websocket)
+            audience = {client} if client is not None else set()
+        else:
+            audience = self._audience({key[0] for key in keys})
+        if not audience:
+            return 0
+
+        self._register(records)
+        self._seq += 1
+        meta = dict(meta, seq=self._seq)
+
+        # Cada registro é codificado uma vez por codificação, sob demanda
+        fragments: Dict[tuple, object] = {}
+
+        def fragment(codec: FeedCodec, index: int):
+            key = (codec.name, index)
+            encoded = fragments.get(key)
+            if encoded is None:
+                encoded = fragments[key] = codec.item(kind, records[index])
+            return encoded
+
+        by_symbol: Dict[str, List[int]] = {}
+        for index, key in enumerate(keys):
+            by_symbol.setdefault(key[0], []).append(index)
+
+        frames: Dict[tuple, Optional[tuple]] = {}
+        built = 0
+        for client in audience:
+            signature = client.signature()
+            if signature not in frames:
+                # Só percorre os registros dos símbolos assinados
+                if WILDCARD in client.subscriptions:
+                    candidates = range(len(keys))
+                else:
+                    candidates = (
+                        index
+                        for symbol in client.subscriptions
+                        for index in by_symbol.get(symbol, ())
+                    )
+                selected = sorted(
+                    index for index in candidates if client.wants(*keys[index])
+                )
+                frames[signature] = None
+                if selected:
+                    codec = client.codec
+                    frame = codec.frame(
+                        kind, [fragment(codec, i) for i in selected], meta
+                    )
+                    frames[signature] = (time.perf_counter(), frame)
+                    built += 1
+                    with self._lock:
+                        self.bytes_published += len(frame)
+                        self.bytes_by_encoding[codec.name] = (
+                            self.bytes_by_encoding.get(codec.name, 0) + len(frame)
+                        )
+            item = frames[signature]
+            if item is not None:
+                if client.codec.uses_dictionary:
+                    self._send_dictionary(client)
+                self._enqueue(client, item)
+
+        with self._lock:
+            self.published += 1
+            self.frames_built += built
+        return built
+
+    async def _send_loop(self, client: ClientConnection):
+        while True:
+            enqueued_at, frame = await client.queue.get()
+            try:
+                if isinstance(frame, bytes):
+                    await client.websocket.send_bytes(frame)
+                else:
+                    await client.websocket.send_text(frame)
+            except Exception:
+                with self._lock:
+                    self.send_errors += 1
+                self.disconnect(client.websocket)
+                return
+
+            elapsed = time.perf_counter() - enqueued_at
+            with self._lock:
+                self.frames_sent += 1
+                self._latencies.append(elapsed)
+
+    async def _close_slow(self, client: ClientConnection):
+        try:
+            await client.websocket.close(code=SLOW_CLIENT_CLOSE_CODE)
+        except Exception:
+            pass
+
+    def _enqueue(self, client: ClientConnection, item: tuple):
+        if client.closed:
+            return
+        if client.queue.full():
+            if self.policy == DISCONNECT:
+                with self._lock:
+                    self.slow_disconnects += 1
+                self.disconnect(client.websocket)
+                asyncio.create_task(self._close_slow(client))
+                return
+            client.queue.get_nowait()
+            client.dropped += 1
+            # O frame perdido pode ser o dicionário ou um delta de preços:
+            # o dicionário volta inteiro no próximo frame e os preços
+            # completos no próximo ciclo do feed (take_resyncs)
+            client.dictionary_sent = 0
+            client.needs_resync = True
+            with self._lock:
+                self.frames_dropped += 1
+        client.queue.put_nowait(item)
+
+    def publish(self, message: dict) -> int:
+        """
+        Serializa a mensagem uma vez e coloca o frame na fila de cada
+        cliente, sem esperar pelos envios. Retorna o tamanho do frame
+        """
+        frame = serialize(message)
+        item = (time.perf_counter(), frame)
+        for client in list(self._clients.values()):
+            self._enqueue(client, item)
+
+        with self._lock:
+            self.published += 1
+            self.bytes_published += len(frame)
+        return len(frame)
+
+    def send(self, websocket: WebSocket, message: dict):
+        """Envia uma mensagem a um único cliente (pela fila dele)"""
+        client = self._clients.get(websocket)
+        if client is not None:
+            self._enqueue(client, (time.perf_counter(), serialize(message)))
+
+    async def broadcast(self, message: dict):
+        """Envia mensagem para todos os clientes conectados"""
+        self.publish(message)
+
+    def broadcast_sync(self, message: dict):
+        """Versão síncrona do broadcast (para uso do simulador)"""
+        try:
+            self.publish(message)
+        except Exception as e:
+            print(f"⚠️  Erro ao enviar broadcast: {e}")
+
+    def metrics(self) -> dict:
+        # Latência de envio = tempo entre a publicação e o fim do send_text
+        # de cada cliente (percentis sobre os últimos envios)
+        with self._lock:
+            recent = sorted(self._latencies)
+
+            return {
+                "connections": len(self._clients),
+                "queue_size": self.queue_size,
+                "slow_client_policy": self.policy,
+                "subscribed_symbols": len(self._subscribers),
+                "published": self.published,
+                "frames_built": self.frames_built,
+                "bytes_published": self.bytes_published,
+                "bytes_by_encoding": dict(self.bytes_by_encoding),
+                "dictionary_size": len(self._dictionary),
+                "frames_sent": self.frames_sent,
+                "frames_dropped": self.frames_dropped,
+                "slow_disconnects": self.slow_disconnects,
+                "send_errors": self.send_errors,
+                "queued": sum(
+                    client.queue.qsize() for client in self._clients.values()
+                ),
+                "send_latency_ms": {
+                    "p50": percentile_ms(recent, 0.50),
+                    "p95": percentile_ms(recent, 0.95),
+                    "p99": percentile_ms(recent, 0.99),
+                    "max": round(recent[-1] * 1000, 2) if recent else 0.0,
+                },
+            }
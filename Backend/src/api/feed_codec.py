@@ -0,0 +1,298 @@
+"""
+Codificações do feed de mercado (negociadas por cliente)
+
+- json: frames JSON verbosos (padrão, compatível com os clientes antigos)
+- compact: JSON com ids numéricos e linhas em arrays posicionais
+- msgpack: as mesmas linhas do compact em MessagePack (requer `msgpack`)
+- binary: linhas empacotadas com struct (little-endian)
+
+Nos modos compactos, símbolo e nome não viajam nas linhas: o cliente
+recebe antes um frame de dicionário (JSON) com id -> símbolo/nome e a
+tabela de códigos dos intervalos, e depois só as entradas novas.
+
+Linhas (compact/msgpack):
+  vela:       [id, intervalo, open_time (epoch s), open, high, low, close, volume, trades]
+  preço:      [id, preço]
+  indicador:  [id, intervalo, open_time (epoch s), "rsi:14", [saídas]]
+  (saídas na ordem do indicador, null enquanto não há velas suficientes:
+  sma, ema, rsi: [valor]; macd: [macd, sinal, histograma];
+  bollinger: [média, banda superior, banda inferior])
+
+Frames compact/msgpack:
+  {"t": "c" | "p" | "i", "seq": n, "ts": epoch ms, "b": versão base, "v": versão, "d": [linhas]}
+  ("b"/"v" só nos preços: o cliente cuja última versão != "b" perdeu um
+  frame e deve pedir {"action": "resync"})
+
+Frames binary:
+  cabeçalho <BIdIII: tipo (1 = velas, 2 = preços, 3 = indicadores), seq,
+  ts (epoch s), versão base, versão, quantidade de linhas
+  vela  <IBIiiiidI: id, intervalo, open_time, open/high/low/close em
+  centavos, volume, trades
+  preço <Ii: id, preço em centavos
+  indicador <IBIBB: id, intervalo, open_time, tamanho do nome, quantidade
+  de saídas; depois o nome ("rsi:14", ASCII) e as saídas <d (NaN = sem valor)
+"""
+import json
+import struct
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Union
+
+from src.models.investment import CandleInterval
+
+try:
+    import msgpack
+except ImportError:  # dependência opcional (modo msgpack)
+    msgpack = None
+
+
+CANDLES = "candle_batch"
+PRICES = "price_batch"
+INDICATORS = "indicator_batch"
+
+# Campo da lista de itens em cada tipo de frame JSON
+FRAME_FIELDS = {CANDLES: "candles", PRICES: "prices", INDICATORS: "indicators"}
+
+# Tipo de cada frame nos modos compact/msgpack
+FRAME_TAGS = {CANDLES: "c", PRICES: "p", INDICATORS: "i"}
+
+# Código numérico de cada intervalo (posição na enumeração)
+INTERVAL_CODES = {interval: code for code, interval in enumerate(CandleInterval)}
+INTERVAL_NAMES = [interval.value for interval in CandleInterval]
+
+EPOCH = datetime(1970, 1, 1)
+
+NAN = float("nan")
+
+BINARY_HEADER = struct.Struct("<BIdIII")
+BINARY_CANDLE = struct.Struct("<IBIiiiidI")
+BINARY_PRICE = struct.Struct("<Ii")
+BINARY_INDICATOR = struct.Struct("<IBIBB")
+BINARY_KINDS = {CANDLES: 1, PRICES: 2, INDICATORS: 3}
+
+Fragment = Union[str, bytes]
+
+
+def serialize(message) -> str:
+    # Serialização compacta usada em todos os frames JSON do feed
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def _epoch_seconds(value: datetime) -> int:
+    return int((value - EPOCH).total_seconds())
+
+
+def _cents(value: float) -> int:
+    return int(round(value * 100))
+
+
+def verbose_item(kind: str, record: dict) -> dict:
+    # Item do frame JSON padrão
+    if kind == PRICES:
+        return {
+            "symbol": record["symbol"],
+            "name": record["name"],
+            "price": record["price"]
+        }
+    if kind == INDICATORS:
+        return {
+            "symbol": record["symbol"],
+            "name": record["name"],
+            "indicator": {
+                "interval": record["interval"].value,
+                "name": record["indicator"],
+                "open_time": record["open_time"].isoformat(),
+                "values": record["values"]
+            }
+        }
+
+    # Calcula variação percentual
+    change_percent = (
+        (record["close_price"] - record["open_price"]) / record["open_price"]
+    ) * 100
+    return {
+        "symbol": record["symbol"],
+        "name": record["name"],
+        "candle": {
+            "interval": record["interval"].value,
+            "open": record["open_price"],
+            "high": record["high_price"],
+            "low": record["low_price"],
+            "close": record["close_price"],
+            "volume": record["volume"],
+            "trades": record["trades_count"],
+            "change_percent": round(change_percent, 2),
+            "open_time": record["open_time"].isoformat(),
+            "close_time": record["close_time"].isoformat()
+        }
+    }
+
+
+def compact_row(kind: str, record: dict) -> list:
+    # Linha posicional dos modos compact/msgpack (close_time e variação
+    # são deriváveis do intervalo e dos preços)
+    if kind == PRICES:
+        return [record["asset_id"], record["price"]]
+    if kind == INDICATORS:
+        return [
+            record["asset_id"],
+            INTERVAL_CODES[record["interval"]],
+            _epoch_seconds(record["open_time"]),
+            record["indicator"],
+            list(record["values"].values())
+        ]
+    return [
+        record["asset_id"],
+        INTERVAL_CODES[record["interval"]],
+        _epoch_seconds(record["open_time"]),
+        record["open_price"],
+        record["high_price"],
+        record["low_price"],
+        record["close_price"],
+        record["volume"],
+        record["trades_count"]
+    ]
+
+
+class FeedCodec(ABC):
+    # Codifica itens (uma vez por item) e monta frames a partir deles
+    name = ""
+    binary = False
+    uses_dictionary = True
+
+    @abstractmethod
+    def item(self, kind: str, record: dict) -> Fragment:
+        # Um item codificado (reaproveitado por todos os frames)
+        ...
+
+    @abstractmethod
+    def frame(self, kind: str, fragments: List[Fragment], meta: dict) -> Fragment:
+        # Frame pronto para envio a partir dos itens codificados
+        ...
+
+
+class JsonCodec(FeedCodec):
+    name = "json"
+    uses_dictionary = False
+
+    def item(self, kind, record):
+        return serialize(verbose_item(kind, record))
+
+    def frame(self, kind, fragments, meta):
+        extra = "".join(
+            f",{serialize(key)}:{serialize(meta[key])}"
+            for key in ("base", "version") if key in meta
+        )
+        return (
+            f'{{"type":{serialize(kind)},"{FRAME_FIELDS[kind]}":['
+            + ",".join(fragments)
+            + f']{extra},"timestamp":{serialize(meta["timestamp"].isoformat())}}}'
+        )
+
+
+class CompactCodec(FeedCodec):
+    name = "compact"
+
+    def item(self, kind, record):
+        return serialize(compact_row(kind, record))
+
+    def frame(self, kind, fragments, meta):
+        head = {"t": FRAME_TAGS[kind], "seq": meta["seq"],
+                "ts": int((meta["timestamp"] - EPOCH).total_seconds() * 1000)}
+        if kind == PRICES:
+            head["b"] = meta.get("base", 0)
+            head["v"] = meta.get("version", 0)
+        return serialize(head)[:-1] + ',"d":[' + ",".join(fragments) + "]}"
+
+
+class MsgpackCodec(FeedCodec):
+    name = "msgpack"
+    binary = True
+
+    def item(self, kind, record):
+        return msgpack.packb(compact_row(kind, record))
+
+    def frame(self, kind, fragments, meta):
+        # Os itens já empacotados são concatenados após o cabeçalho do array
+        head = {"t": FRAME_TAGS[kind], "seq": meta["seq"],
+                "ts": int((meta["timestamp"] - EPOCH).total_seconds() * 1000)}
+        if kind == PRICES:
+            head["b"] = meta.get("base", 0)
+            head["v"] = meta.get("version", 0)
+        packer = msgpack.Packer()
+        parts = [packer.pack_map_header(len(head) + 1)]
+        for key, value in head.items():
+            parts.append(packer.pack(key))
+            parts.append(packer.pack(value))
+        parts.append(packer.pack("d"))
+        parts.append(packer.pack_array_header(len(fragments)))
+        parts.extend(fragments)
+        return b"".join(parts)
+
+
+class BinaryCodec(FeedCodec):
+    name = "binary"
+    binary = True
+
+    def item(self, kind, record):
+        if kind == PRICES:
+            return BINARY_PRICE.pack(record["asset_id"], _cents(record["price"]))
+        if kind == INDICATORS:
+            name = record["indicator"].encode("ascii")
+            values = [NAN if value is None else value for value in record["values"].values()]
+            return BINARY_INDICATOR.pack(
+                record["asset_id"],
+                INTERVAL_CODES[record["interval"]],
+                _epoch_seconds(record["open_time"]),
+                len(name),
+                len(values)
+            ) + name + struct.pack(f"<{len(values)}d", *values)
+        return BINARY_CANDLE.pack(
+            record["asset_id"],
+            INTERVAL_CODES[record["interval"]],
+            _epoch_seconds(record["open_time"]),
+            _cents(record["open_price"]),
+            _cents(record["high_price"]),
+            _cents(record["low_price"]),
+            _cents(record["close_price"]),
+            record["volume"],
+            record["trades_count"]
+        )
+
+    def frame(self, kind, fragments, meta):
+        header = BINARY_HEADER.pack(
+            BINARY_KINDS[kind],
+            meta["seq"],
+            (meta["timestamp"] - EPOCH).total_seconds(),
+            meta.get("base", 0),
+            meta.get("version", 0),
+            len(fragments)
+        )
+        return header + b"".join(fragments)
+
+
+CODECS: Dict[str, FeedCodec] = {
+    codec.name: codec
+    for codec in (JsonCodec(), CompactCodec(), MsgpackCodec(), BinaryCodec())
+}
+
+
+def get_codec(name: str) -> FeedCodec:
+    # Codec pelo nome; ValueError se desconhecido ou indisponível
+    codec = CODECS.get(name)
+    if codec is None:
+        raise ValueError(f"Codificação inválida: use {', '.join(CODECS)}")
+    if codec.name == "msgpack" and msgpack is None:
+        raise ValueError("Codificação msgpack indisponível (pacote msgpack não instalado)")
+    return codec
+
+
+def dictionary_frame(entries: List[tuple], reset: bool = False) -> str:
+    # Frame de dicionário: [id, símbolo, nome] e os códigos dos intervalos.
+    # `reset` indica que o cliente deve descartar o dicionário anterior
+    return serialize({
+        "t": "dict",
+        "reset": reset,
+        "symbols": [list(entry) for entry in entries],
+        "intervals": INTERVAL_NAMES
+    })
@@ -0,0 +1,198 @@
+"""
+Middleware de Idempotency-Key para os POSTs que movimentam dinheiro
+
+Uma requisição repetida com a mesma chave (do mesmo usuário) recebe a
+resposta original, sem executar o endpoint de novo. Duplicatas que chegam
+enquanto a primeira ainda está em andamento esperam pelo resultado dela.
+"""
+import hashlib
+import json
+import re
+from typing import Optional
+
+from src.configs.settings import settings
+from src.services.idempotency_service import (
+    COMPLETED, IdempotencyStore, create_idempotency_store
+)
+from src.utils.security import decode_access_token
+
+
+IDEMPOTENT_PATHS = [
+    re.compile(r"^/api/v1/transactions/(deposit|withdraw|transfer|pix/send|pay-bill|batch)$"),
+    re.compile(r"^/api/v1/investments/(buy|sell)$"),
+    re.compile(r"^/api/v1/credit-cards/\d+/(purchase|pay-bill)$"),
+    re.compile(r"^/api/v1/bills/pay$"),
+]
+
+MAX_KEY_LENGTH = 255
+
+# Respostas que não são guardadas: a mesma chave pode ser tentada de novo
+NOT_CACHEABLE_STATUS = {401, 403, 408, 409, 422, 425, 429}
+
+# Headers da resposta original reenviados na repetição
+REPLAYED_HEADERS = {"content-type"}
+
+
+def _subject(authorization: Optional[str]) -> Optional[str]:
+    # Usuário do token JWT (as chaves são isoladas por usuário)
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    payload = decode_access_token(authorization[7:].strip())
+    return payload.get("sub") if payload else None
+
+
+def _cacheable(status: int) -> bool:
+    return status < 500 and status not in NOT_CACHEABLE_STATUS
+
+
+async def _send_json(send, status: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """Middleware ASGI que aplica o Idempotency-Key nas rotas de pagamento"""
+
+    def __init__(self, app, store: IdempotencyStore = None):
+        self.app = app
+        self.store = store or create_idempotency_store()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http" or
+            scope["method"] != "POST" or
+            not any(p.match(scope["path"]) for p in IDEMPOTENT_PATHS)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope["headers"]
+        }
+        idempotency_key = headers.get("idempotency-key")
+        subject = _subject(headers.get("authorization"))
+
+        # Sem chave (ou sem usuário válido, que vai dar 401): fluxo normal
+        if not idempotency_key or subject is None:
+            await self.app(scope, receive, send)
+            return
+
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            await _send_json(
+                send, 400,
+                f"Idempotency-Key deve ter no máximo {MAX_KEY_LENGTH} caracteres"
+            )
+            return
+
+        # Lê o corpo inteiro para calcular a impressão digital da requisição
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        key = hashlib.sha256(f"{subject}\n{idempotency_key}".encode()).hexdigest()
+        fingerprint = hashlib.sha256(
+            b"\n".join([
+                scope["path"].encode(),
+                scope.get("query_string", b""),
+                body
+            ])
+        ).hexdigest()
+
+        while True:
+            record = await self.store.reserve(key, fingerprint)
+            if record is None:
+                break
+
+            if record["fingerprint"] != fingerprint:
+                await _send_json(
+                    send, 422,
+                    "Idempotency-Key já usada com outra requisição"
+                )
+                return
+
+            if record["state"] == COMPLETED:
+                await self._replay(send, record)
+                return
+
+            # Mesma requisição ainda em andamento: espera o resultado
+            finished = await self.store.wait(key, settings.IDEMPOTENCY_WAIT_TIMEOUT)
+            if not finished:
+                await _send_json(
+                    send, 409,
+                    "Requisição com esta Idempotency-Key ainda em processamento"
+                )
+                return
+
+        await self._execute(scope, body, send, key)
+
+    async def _execute(self, scope, body: bytes, send, key: str) -> None:
+        # Executa o endpoint repassando o corpo já lido e guarda a resposta
+        body_sent = False
+
+        async def receive():
+            nonlocal body_sent
+            if body_sent:
+                return {"type": "http.disconnect"}
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        response = {"status": 500, "headers": [], "body": []}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    [name.decode("latin-1"), value.decode("latin-1")]
+                    for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            await self.store.release(key)
+            raise
+
+        if _cacheable(response["status"]):
+            await self.store.complete(
+                key,
+                response["status"],
+                [
+                    [name, value] for name, value in response["headers"]
+                    if name.lower() in REPLAYED_HEADERS
+                ],
+                b"".join(response["body"])
+            )
+        else:
+            await self.store.release(key)
+
+    async def _replay(self, send, record: dict) -> None:
+        body = record["body"] or b""
+        headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in (record["headers"] or [])
+        ]
+        headers.append((b"content-length", str(len(body)).encode()))
+        headers.append((b"idempotent-replayed", b"true"))
+
+        await send({
+            "type": "http.response.start",
+            "status": record["status"],
+            "headers": headers,
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,18 +1,27 @@
 """
 Rotas de contas bancárias
 """
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 
-from src.database.connection import get_db
-from src.schemas.account import AccountCreate, AccountResponse, BalanceResponse
+from src.database.connection import get_db, SessionLocal
+from src.schemas.account import (
+    AccountCreate, AccountResponse, BalanceResponse, BalanceHistoryResponse
+)
+from src.schemas.transaction import TransactionResponse
 from src.services.account_service import (
     create_account, get_account_by_id, get_user_accounts
 )
+from src.services.transaction_service import get_statement, iter_statement
+from src.services.balance_history_service import get_balance_history
+from src.utils.statement_export import EXPORT_FORMATS, export_statement
 from src.api.dependencies import get_current_user
 from src.models.user import User
 from src.models.account import AccountType
+from src.models.transaction import TransactionType
 
 router = APIRouter(prefix="/accounts", tags=["Contas"])
 
@@ -62,28 +71,147 @@ def get_balance(
     }
 
 
-@router.get("/{account_id}/statement")
+@router.get("/{account_id}/balance-history", response_model=BalanceHistoryResponse)
+def get_account_balance_history(
+    account_id: int,
+    start: Optional[datetime] = Query(default=None, alias="from"),
+    end: Optional[datetime] = Query(default=None, alias="to"),
+    granularity: Literal["day", "week", "month"] = "day",
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Histórico de saldo (abertura, fechamento, entradas e saídas) por dia,
+    semana ou mês. Padrão: últimos 30 dias.
+    """
+    account = get_account_by_id(db, account_id)
+    if not account:
+        raise HTTPException(status_code=404, detail="Conta não encontrada")
+    
+    # Verifica se a conta pertence ao usuário
+    if account.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=30)
+    
+    try:
+        points = get_balance_history(db, account_id, start, end, granularity)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return BalanceHistoryResponse(
+        account_id=account_id,
+        start=start,
+        end=end,
+        granularity=granularity,
+        points=points
+    )
+
+
+@router.get("/{account_id}/statement", response_model=List[TransactionResponse])
 def get_account_statement(
     account_id: int,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtém extrato da conta
+    
+    Paginação por cursor: quando houver mais itens, o header
+    X-Next-Cursor traz o valor a ser enviado em `cursor`. Com
+    include_total=true, o header X-Total-Count traz o total de itens.
+    """
+    account = get_account_by_id(db, account_id)
+    if not account:
+        raise HTTPException(status_code=404, detail="Conta não encontrada")
+    
+    # Verifica se a conta pertence ao usuário
+    if account.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    try:
+        transactions, total_count, next_cursor = get_statement(
+            db, account_id, limit=limit, cursor=cursor,
+            include_total=include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if total_count is not None:
+        response.headers["X-Total-Count"] = str(total_count)
+    
+    return [
+        TransactionResponse(
+            id=t.id,
+            from_account_id=t.from_account_id,
+            to_account_id=t.to_account_id,
+            transaction_type=t.transaction_type,
+            amount=t.amount,
+            signed_amount=signed_amount,
+            description=t.description or "",
+            created_at=t.created_at,
+            status=t.status
+        ) for t, signed_amount in transactions
+    ]
+
+
+@router.get("/{account_id}/statement/export")
+def export_account_statement(
+    account_id: int,
+    format: Literal["csv", "ndjson", "ofx"] = "csv",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    transaction_type: Optional[TransactionType] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Obtém extrato da conta"""
-    from src.models.transaction import Transaction
+    """
+    Exporta o extrato completo em CSV, NDJSON ou OFX via streaming.
     
+    As transações são lidas em lotes e enviadas à medida que são
+    formatadas, então o uso de memória não cresce com o histórico.
+    """
     account = get_account_by_id(db, account_id)
+    if not account:
+        raise HTTPException(status_code=404, detail="Conta não encontrada")
     
     # Verifica se a conta pertence ao usuário
     if account.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Acesso negado")
     
-    # Busca todas as transações da conta
-    transactions = db.query(Transaction).filter(
-        (Transaction.from_account_id == account_id) |
-        (Transaction.to_account_id == account_id)
-    ).order_by(Transaction.created_at.desc()).all()
+    account_number = account.account_number
+    balance = account.balance
+    period_start = start_date or account.created_at
+    period_end = end_date or datetime.utcnow()
+    media_type, extension = EXPORT_FORMATS[format]
     
-    return transactions
+    def stream():
+        # Sessão própria: a do Depends é fechada antes do fim do streaming
+        export_db = SessionLocal()
+        try:
+            rows = iter_statement(
+                export_db, account_id, start_date, end_date, transaction_type
+            )
+            yield from export_statement(
+                rows, format, account_number, balance,
+                period_start, period_end
+            )
+        finally:
+            export_db.close()
+    
+    filename = f"extrato_{account_number}.{extension}"
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 @router.get("/{account_id}/validate-black")
@@ -2,8 +2,8 @@
 Bill Payment Endpoints
 Rotas para pagamento de contas (água, luz, telefone, etc.)
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 
 from src.database.connection import get_db
@@ -11,6 +11,7 @@ from src.api.dependencies import get_current_user
 from src.models.user import User
 from src.models.account import Account
 from src.models.transaction import Transaction, TransactionType, TransactionStatus
+from src.services import balance_service, ledger_service, transaction_service
 from src.schemas.bill_payment import (
     PayBillRequest, PayBillResponse, BillPaymentHistoryResponse
 )
@@ -38,13 +39,6 @@ def pay_bill(
     if not account:
         raise HTTPException(status_code=404, detail="Conta não encontrada")
     
-    # Verifica saldo
-    if account.balance < request.amount:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Saldo insuficiente. Disponível: R$ {account.balance:.2f}"
-        )
-    
     # Valida valor
     if request.amount <= 0:
         raise HTTPException(status_code=400, detail="Valor inválido")
@@ -66,14 +60,19 @@ def pay_bill(
         created_at=datetime.utcnow()
     )
     
-    # Debita da conta
-    account.balance -= request.amount
-    account.updated_at = datetime.utcnow()
+    # Debita da conta (UPDATE condicional ao saldo disponível)
+    try:
+        new_balance = balance_service.debit(db, account.id, request.amount)
+    except balance_service.InsufficientBalanceError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Saldo insuficiente. Disponível: R$ {account.balance:.2f}"
+        )
     
     db.add(transaction)
+    ledger_service.record_transaction(db, transaction)
     db.commit()
     db.refresh(transaction)
-    db.refresh(account)
     
     return PayBillResponse(
         transaction_id=transaction.id,
@@ -82,7 +81,7 @@ def pay_bill(
         company=request.company,
         amount=request.amount,
         barcode=request.barcode,
-        new_balance=account.balance,
+        new_balance=new_balance,
         paid_at=transaction.created_at,
         status="COMPLETED"
     )
@@ -90,18 +89,19 @@ def pay_bill(
 
 @router.get("/history", response_model=List[BillPaymentHistoryResponse])
 def get_bill_payment_history(
+    response: Response,
     account_id: int = None,
-    limit: int = 50,
+    limit: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Histórico de pagamentos de contas
-    """
-    query = db.query(Transaction).filter(
-        Transaction.transaction_type == TransactionType.BILL_PAYMENT
-    )
     
+    Paginação por cursor: quando houver mais itens, o header
+    X-Next-Cursor traz o valor a ser enviado em `cursor`.
+    """
     if account_id:
         # Verifica se a conta pertence ao usuário
         account = db.query(Account).filter(
@@ -112,18 +112,24 @@ def get_bill_payment_history(
         if not account:
             raise HTTPException(status_code=404, detail="Conta não encontrada")
         
-        query = query.filter(Transaction.from_account_id == account_id)
+        account_ids = [account_id]
     else:
         # Busca todas as contas do usuário
-        user_accounts = db.query(Account).filter(
-            Account.user_id == current_user.id
-        ).all()
-        account_ids = [acc.id for acc in user_accounts]
-        query = query.filter(Transaction.from_account_id.in_(account_ids))
+        account_ids = [
+            acc_id for (acc_id,) in db.query(Account.id).filter(
+                Account.user_id == current_user.id
+            ).all()
+        ]
+    
+    try:
+        transactions, next_cursor = transaction_service.get_bill_payment_history(
+            db, account_ids, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    transactions = query.order_by(
-        Transaction.created_at.desc()
-    ).limit(limit).all()
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return [
         BillPaymentHistoryResponse(
@@ -2,16 +2,18 @@
 Investment Endpoints
 Rotas para investimentos e gerenciamento de portfólio
 """
+import json
 from typing import List, Optional
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 
 from src.database.connection import get_db
 from src.api.dependencies import get_current_user
 from src.models.user import User
 from src.models.investment import (
-    AssetType, AssetCategory, Asset, MarketHistory, Candle, CandleInterval
+    AssetType, AssetCategory, Asset, MarketHistory, CandleInterval
 )
 from src.schemas.investment import (
     AssetResponse, BuyAssetRequest, BuyAssetResponse,
@@ -20,7 +22,10 @@ from src.schemas.investment import (
 )
 from src.services import investment_service
 from src.services.account_service import get_account_by_id
-from src.services.candle_service import get_recent_candles, get_candles_summary
+from src.services.candle_archive import read_candles
+from src.services.candle_indicators import candle_indicators, parse_indicator
+from src.services.candle_service import get_candles_summary
+from src.services.latest_candles import latest_candles
 
 router = APIRouter(prefix="/investments", tags=["Investments"])
 
@@ -392,11 +397,34 @@ def get_market_status(
     }
 
 
+@router.get("/candles/latest")
+def get_latest_candles_all_assets(
+    interval: CandleInterval = Query(default=CandleInterval.ONE_MINUTE),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Obtém a última vela de todos os ativos ativos
+    Útil para dashboard em tempo real. Servido da memória do worker
+    (atualizada pelo feed); o banco só é lido com uma consulta quando o
+    intervalo ainda não foi carregado
+    """
+    candles = [candle.to_dict() for candle in latest_candles.latest(db, interval)]
+    
+    return {
+        "interval": interval.value,
+        "timestamp": datetime.utcnow().isoformat(),
+        "total": len(candles),
+        "candles": candles
+    }
+
+
 @router.get("/candles/{asset_id}")
 def get_asset_candles(
     asset_id: int,
     interval: CandleInterval = Query(default=CandleInterval.ONE_MINUTE),
     limit: int = Query(default=100, le=500),
+    encoding: str = Query(default="json", regex="^(json|binary)$"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -407,37 +435,42 @@ def get_asset_candles(
     - asset_id: ID do ativo
     - interval: Intervalo das velas (1m, 5m, 15m, 1h, 4h, 1d)
     - limit: Número máximo de velas (padrão: 100, máximo: 500)
+    - encoding: json (padrão) ou binary (colunas little-endian: cabeçalho
+      <4sBI "CNDL", versão, quantidade; depois open_time e close_time em
+      microssegundos desde a época (int64), open, high, low, close, volume
+      (float64), trades (int64) e quote_volume (float64))
     
-    Retorna dados OHLCV (Open, High, Low, Close, Volume)
+    Retorna dados OHLCV (Open, High, Low, Close, Volume). Com o arquivo
+    colunar ligado (CANDLE_ARCHIVE_ENABLED), as velas vêm do arquivo e só as
+    ainda não arquivadas são lidas do banco
     """
     # Verifica se o ativo existe
     asset = db.query(Asset).filter(Asset.id == asset_id).first()
     if not asset:
         raise HTTPException(status_code=404, detail="Ativo não encontrado")
     
-    # Busca velas
-    candles = get_recent_candles(db, asset_id, interval, limit)
+    # Busca velas (colunas NumPy)
+    candles = read_candles(db, asset_id, interval, limit)
     
-    return {
+    if encoding == "binary":
+        return Response(
+            content=candles.to_bytes(),
+            media_type="application/octet-stream",
+            headers={"X-Symbol": asset.symbol, "X-Interval": interval.value}
+        )
+    
+    # Velas serializadas direto das colunas (sem a conversão genérica do
+    # FastAPI); só o cabeçalho passa pelo json.dumps
+    head = json.dumps({
         "asset_id": asset_id,
         "symbol": asset.symbol,
         "name": asset.name,
-        "interval": interval.value,
-        "candles": [
-            {
-                "open": c.open_price,
-                "high": c.high_price,
-                "low": c.low_price,
-                "close": c.close_price,
-                "volume": c.volume,
-                "trades": c.trades_count,
-                "open_time": c.open_time.isoformat(),
-                "close_time": c.close_time.isoformat()
-            }
-            for c in candles
-        ],
-        "total": len(candles)
-    }
+        "interval": interval.value
+    }, ensure_ascii=False, separators=(",", ":"))
+    return Response(
+        content=f'{head[:-1]},"candles":{candles.to_json()},"total":{len(candles)}}}',
+        media_type="application/json"
+    )
 
 
 @router.get("/candles/{asset_id}/summary")
@@ -479,50 +512,44 @@ def get_asset_candles_summary(
     }
 
 
-@router.get("/candles/latest")
-def get_latest_candles_all_assets(
+@router.get("/candles/{asset_id}/indicators")
+def get_asset_indicators(
+    asset_id: int,
     interval: CandleInterval = Query(default=CandleInterval.ONE_MINUTE),
+    indicators: List[str] = Query(default=["sma", "ema", "rsi", "macd", "bollinger"]),
+    limit: int = Query(default=100, ge=1, le=500),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Obtém a última vela de todos os ativos ativos
-    Útil para dashboard em tempo real
+    Obtém indicadores técnicos calculados no servidor sobre as velas
+    
+    Parâmetros:
+    - interval: Intervalo das velas
+    - indicators: Um por parâmetro, com os parâmetros opcionais após ":"
+      (padrões entre parênteses): sma (20), ema (20), rsi (14),
+      macd (12,26,9) e bollinger (20,2). Ex.: ?indicators=sma:50&indicators=rsi
+    - limit: Pontos por indicador (padrão: 100, máximo: 500)
+    
+    Cada indicador traz os open_time das velas e as saídas em colunas
+    (null enquanto não há velas suficientes). As séries ficam em cache e
+    avançam a cada vela nova do simulador
     """
-    assets = db.query(Asset).filter(
-        Asset.is_active == True,
-        Asset.asset_type == AssetType.STOCK
-    ).all()
+    asset = db.query(Asset).filter(Asset.id == asset_id).first()
+    if not asset:
+        raise HTTPException(status_code=404, detail="Ativo não encontrado")
     
-    latest_candles = []
+    try:
+        parsed = [parse_indicator(spec) for spec in indicators]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    for asset in assets:
-        candles = get_recent_candles(db, asset.id, interval, limit=1)
-        if candles:
-            c = candles[0]
-            change_percent = ((c.close_price - c.open_price) / 
-                            c.open_price) * 100
-            
-            latest_candles.append({
-                "asset_id": asset.id,
-                "symbol": asset.symbol,
-                "name": asset.name,
-                "candle": {
-                    "open": c.open_price,
-                    "high": c.high_price,
-                    "low": c.low_price,
-                    "close": c.close_price,
-                    "volume": c.volume,
-                    "trades": c.trades_count,
-                    "change_percent": round(change_percent, 2),
-                    "open_time": c.open_time.isoformat(),
-                    "close_time": c.close_time.isoformat()
-                }
-            })
+    series = candle_indicators.get(db, asset_id, interval, parsed)
     
     return {
+        "asset_id": asset_id,
+        "symbol": asset.symbol,
+        "name": asset.name,
         "interval": interval.value,
-        "timestamp": datetime.utcnow().isoformat(),
-        "total": len(latest_candles),
-        "candles": latest_candles
+        "indicators": [entry.to_dict(limit) for entry in series]
     }
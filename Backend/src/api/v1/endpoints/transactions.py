@@ -18,8 +18,10 @@ from src.schemas.transaction import (
     PixSendRequest, PixReceiveRequest, PixResponse,
     BillPaymentRequest, BillPaymentResponse,
     StatementResponse, TransactionResponse,
-    ScheduleTransactionRequest, ScheduledTransactionResponse
+    ScheduleTransactionRequest, ScheduledTransactionResponse,
+    BatchRequest, BatchResponse
 )
+from src.models.account import Account
 from src.services import transaction_service
 from src.services.account_service import get_account_by_id
 
@@ -108,19 +110,18 @@ def transfer(
         )
     
     try:
-        debit_tx, credit_tx = transaction_service.create_transfer(
+        transaction = transaction_service.create_transfer(
             db, request.from_account_id, request.to_account_number,
             request.amount, request.description
         )
         return TransferResponse(
-            debit_transaction_id=debit_tx.id,
-            credit_transaction_id=credit_tx.id,
-            from_account_id=debit_tx.from_account_id,
+            transaction_id=transaction.id,
+            from_account_id=transaction.from_account_id,
             to_account_number=request.to_account_number,
             amount=request.amount,
             description=request.description,
-            created_at=debit_tx.created_at,
-            status=debit_tx.status
+            created_at=transaction.created_at,
+            status=transaction.status
         )
     except transaction_service.InsufficientBalanceError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -236,6 +237,38 @@ def pay_bill(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/batch", response_model=BatchResponse)
+def execute_batch(
+    request: BatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Executar lote de transferências, PIX e boletos (ex: folha de pagamento)
+    - mode=ALL_OR_NOTHING: se alguma operação falhar, nada é aplicado
+    - mode=BEST_EFFORT: aplica as operações válidas e reporta as falhas
+    Todas as operações são gravadas com um único commit
+    """
+    # Verifica se todas as contas de origem pertencem ao usuário
+    from_ids = {op.from_account_id for op in request.operations}
+    owned = db.query(Account.id).filter(
+        Account.id.in_(from_ids),
+        Account.user_id == current_user.id
+    ).count()
+    if owned != len(from_ids):
+        raise HTTPException(status_code=404, detail="Conta origem não encontrada")
+    
+    try:
+        result = transaction_service.execute_batch(
+            db,
+            [op.model_dump() for op in request.operations],
+            atomic=request.mode == "ALL_OR_NOTHING"
+        )
+        return BatchResponse(**result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/statement", response_model=StatementResponse)
 def get_statement(
     account_id: int,
@@ -244,8 +277,10 @@ def get_statement(
     transaction_type: Optional[TransactionType] = None,
     min_amount: Optional[float] = None,
     max_amount: Optional[float] = None,
-    limit: int = Query(default=50, le=100),
+    limit: int = Query(default=50, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -255,33 +290,42 @@ def get_statement(
     - end_date: data final
     - transaction_type: tipo de transação
     - min_amount/max_amount: faixa de valores
-    - limit/offset: paginação
+    - limit/cursor: paginação por cursor (use o next_cursor da resposta)
+    - offset: paginação legada, ignorada quando cursor é informado
+    - include_total: calcula total_count (contagem completa, mais lenta)
     """
     # Verifica se a conta pertence ao usuário
     account = get_account_by_id(db, account_id)
     if not account or account.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Conta não encontrada")
     
-    transactions, total_count = transaction_service.get_statement(
-        db, account_id, start_date, end_date, transaction_type,
-        min_amount, max_amount, limit, offset
-    )
+    try:
+        transactions, total_count, next_cursor = transaction_service.get_statement(
+            db, account_id, start_date, end_date, transaction_type,
+            min_amount, max_amount, limit, offset, cursor, include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return StatementResponse(
         transactions=[
             TransactionResponse(
                 id=t.id,
                 from_account_id=t.from_account_id,
+                to_account_id=t.to_account_id,
                 transaction_type=t.transaction_type,
                 amount=t.amount,
+                signed_amount=signed_amount,
                 description=t.description or "",
                 created_at=t.created_at,
                 status=t.status
-            ) for t in transactions
+            ) for t, signed_amount in transactions
         ],
         total_count=total_count,
         limit=limit,
-        offset=offset
+        offset=0 if cursor else offset,
+        next_cursor=next_cursor,
+        has_more=next_cursor is not None
     )
 
 
@@ -291,7 +335,10 @@ def schedule_transaction(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Agendar transação futura"""
+    """
+    Agendar transação futura (DEPOSIT, WITHDRAWAL, TRANSFER, PIX_SEND ou
+    BILL_PAYMENT), opcionalmente recorrente (DAILY, WEEKLY, MONTHLY, YEARLY)
+    """
     # Verifica se a conta pertence ao usuário
     account = get_account_by_id(db, request.account_id)
     if not account or account.user_id != current_user.id:
@@ -301,19 +348,10 @@ def schedule_transaction(
         scheduled = transaction_service.schedule_transaction(
             db, request.account_id, request.transaction_type,
             request.amount, request.scheduled_date, request.description,
-            request.to_account_id
-        )
-        return ScheduledTransactionResponse(
-            id=scheduled.id,
-            from_account_id=scheduled.from_account_id,
-            transaction_type=scheduled.transaction_type,
-            amount=scheduled.amount,
-            schedule_date=scheduled.schedule_date,
-            description=scheduled.description,
-            to_account_id=scheduled.to_account_id,
-            status=scheduled.status,
-            created_at=scheduled.created_at
+            request.to_account_id, request.pix_key, request.bar_code,
+            request.is_recurring, request.recurrence_period
         )
+        return _scheduled_response(scheduled)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -334,16 +372,23 @@ def list_scheduled_transactions(
         db, account_id
     )
     
-    return [
-        ScheduledTransactionResponse(
-            id=s.id,
-            account_id=s.account_id,
-            type=s.type,
-            amount=s.amount,
-            scheduled_date=s.scheduled_date,
-            description=s.description,
-            destination_account=s.destination_account,
-            status=s.status,
-            created_at=s.created_at
-        ) for s in scheduled_list
-    ]
+    return [_scheduled_response(s) for s in scheduled_list]
+
+
+def _scheduled_response(scheduled) -> ScheduledTransactionResponse:
+    return ScheduledTransactionResponse(
+        id=scheduled.id,
+        from_account_id=scheduled.from_account_id,
+        transaction_type=scheduled.transaction_type,
+        amount=scheduled.amount,
+        schedule_date=scheduled.schedule_date,
+        description=scheduled.description or "",
+        to_account_id=scheduled.to_account_id,
+        pix_key=scheduled.pix_key,
+        bar_code=scheduled.bar_code,
+        is_recurring=bool(scheduled.is_recurring),
+        recurrence_period=scheduled.recurrence_period,
+        status=scheduled.status,
+        created_at=scheduled.created_at,
+        executed_at=scheduled.executed_at
+    )
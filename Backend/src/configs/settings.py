@@ -28,6 +28,104 @@ class Settings(BaseSettings):
     MAX_WITHDRAWALS_PER_DAY: int = 3
     MAX_WITHDRAWAL_AMOUNT: float = 2000.00
     
+    # Balance Engine
+    BALANCE_ROW_LOCKING: bool = True  # SELECT ... FOR UPDATE (PostgreSQL)
+    MAX_BATCH_OPERATIONS: int = 1000
+    
+    # Statement Export
+    STATEMENT_EXPORT_BATCH_SIZE: int = 1000  # Linhas lidas por lote (yield_per)
+    
+    # Scheduled Transactions
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_POLL_INTERVAL: float = 5.0  # segundos entre buscas
+    SCHEDULER_BATCH_SIZE: int = 100       # itens vencidos por lote
+    SCHEDULER_WORKERS: int = 4
+    
+    # Idempotency-Key
+    IDEMPOTENCY_BACKEND: str = "memory"        # memory ou database
+    IDEMPOTENCY_TTL_SECONDS: int = 86400       # validade das respostas guardadas
+    IDEMPOTENCY_MAX_ENTRIES: int = 10000       # capacidade do LRU em memória
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 30.0     # espera por requisição em andamento
+    IDEMPOTENCY_LOCK_TIMEOUT: float = 120.0    # reserva abandonada pode ser retomada
+    
+    # Market Simulator
+    MARKET_STATE_REFRESH_SECONDS: float = 300.0  # recarrega a lista de ações
+    MARKET_TICK_SECONDS: float = 1.0             # período do tick (thread própria)
+    MARKET_QUEUE_SIZE: int = 30                  # ticks aguardando broadcast
+    EVENT_LOOP_LAG_INTERVAL: float = 0.1         # período da medição de atraso
+    EVENT_LOOP_LAG_WINDOW: int = 600             # medições usadas nos percentis
+    
+    # WebSocket Feed
+    WS_CLIENT_QUEUE_SIZE: int = 32               # frames pendentes por cliente
+    WS_SLOW_CLIENT_POLICY: str = "drop_oldest"   # drop_oldest ou disconnect
+    WS_LATENCY_WINDOW: int = 2000                # envios usados nos percentis
+    WS_MAX_SUBSCRIPTIONS: int = 200              # símbolos assinados por cliente
+    WS_PRICE_INTERVAL: float = 2.0               # envio dos preços alterados
+    
+    # Pub/Sub do feed (vários workers: um produtor, todos fazem broadcast)
+    FEED_PUBSUB_BACKEND: str = "inprocess"       # inprocess, local ou redis
+    FEED_LOCAL_HOST: str = "127.0.0.1"           # backend local: porta do produtor
+    FEED_LOCAL_PORT: int = 8765
+    FEED_FOLLOWER_BUFFER: int = 8 * 1024 * 1024  # bytes pendentes por seguidor
+    FEED_REDIS_URL: str = "redis://localhost:6379/0"
+    FEED_REDIS_CHANNEL: str = "superbank:market-feed"
+    FEED_REDIS_LEASE_KEY: str = "superbank:market-feed:producer"
+    FEED_PRODUCER_TTL: float = 10.0              # lease do produtor no Redis
+    FEED_RETRY_SECONDS: float = 1.0              # nova tentativa de conexão/eleição
+    
+    # Retenção de velas (por ativo e intervalo, a partir da última vela do par)
+    CANDLE_RETENTION_ENABLED: bool = True
+    CANDLE_RETENTION_INTERVAL: float = 300.0     # segundos entre execuções
+    CANDLE_RETENTION_CHUNK: int = 5000           # velas por DELETE (um commit cada)
+    CANDLE_RETENTION_MAX_ROWS: int = 100_000     # velas apagadas por execução
+    CANDLE_RETENTION_ROLLUP: bool = True         # agrega as vencidas antes de apagar
+    CANDLE_RETENTION: dict = {                   # janela em segundos (None = sem limite)
+        "1s": 2 * 3600,
+        "5s": 6 * 3600,
+        "10s": 12 * 3600,
+        "30s": 24 * 3600,
+        "1m": 7 * 86400,
+        "5m": 30 * 86400,
+        "15m": 90 * 86400,
+        "1h": 365 * 86400,
+        "4h": 2 * 365 * 86400,
+        "1d": None
+    }
+    CANDLE_RETENTION_OVERRIDES: dict = {}        # por símbolo: {"NEXG": {"1s": 86400}}
+    CANDLE_ROLLUP_TARGETS: dict = {              # intervalo vencido -> agregado em
+        "1s": "1m",
+        "1m": "1h",
+        "1h": "1d"
+    }
+    
+    # Particionamento das velas por intervalo e período (SQLite: uma tabela
+    # por período; PostgreSQL: partições nativas por faixa de open_time)
+    CANDLE_PARTITIONED: bool = False             # False = tabela única candles
+    CANDLE_PARTITION_REFRESH: float = 60.0       # segundos entre releituras das partições
+    CANDLE_PARTITION_PERIODS: dict = {           # período de cada partição: day, month ou year
+        "1s": "day",
+        "5s": "day",
+        "10s": "day",
+        "30s": "day",
+        "1m": "day",
+        "5m": "month",
+        "15m": "month",
+        "1h": "month",
+        "4h": "year",
+        "1d": "year"
+    }
+    
+    # Arquivo colunar das velas fechadas (histórico dos gráficos, lido via mmap)
+    CANDLE_ARCHIVE_ENABLED: bool = False
+    CANDLE_ARCHIVE_DIR: str = "./src/database/data/candle_archive"
+    CANDLE_ARCHIVE_FLUSH_SECONDS: float = 5.0    # velas acumuladas antes de gravar
+    CANDLE_ARCHIVE_INTERVALS: list = ["1m", "5m", "15m", "1h", "4h", "1d"]
+    
+    # Indicadores técnicos calculados no servidor (SMA, EMA, RSI, MACD, Bollinger)
+    INDICATOR_HISTORY: int = 500                 # pontos guardados por série
+    INDICATOR_MAX_SERIES: int = 2000             # séries em memória por worker (LRU)
+    INDICATOR_MAX_PERIOD: int = 200              # maior período aceito
+    
     # Account Types and Digits
     ACCOUNT_TYPES: dict = {
         "CORRENTE": 1,
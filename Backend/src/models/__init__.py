@@ -1,7 +1,8 @@
 from src.models.user import User, Address
-from src.models.account import Account, AccountType
+from src.models.account import Account, AccountType, BalanceSnapshot
 from src.models.transaction import (
-    Transaction, TransactionType, TransactionStatus, ScheduledTransaction
+    Transaction, TransactionType, TransactionStatus, ScheduledTransaction,
+    DailyWithdrawalCounter
 )
 from src.models.credit_card import CreditCard
 from src.models.investment import Asset, AssetType, AssetCategory, PortfolioItem
@@ -10,16 +11,20 @@ from src.models.chatbot import (
     ChatMessage, ChatFeedback
 )
 from src.models.pix_key import PixKey, PixKeyType
+from src.models.idempotency import IdempotencyKey
+from src.models.ledger import LedgerEntry, LedgerEntryType
 
 __all__ = [
     "User",
     "Address",
     "Account",
     "AccountType",
+    "BalanceSnapshot",
     "Transaction",
     "TransactionType",
     "TransactionStatus",
     "ScheduledTransaction",
+    "DailyWithdrawalCounter",
     "CreditCard",
     "Asset",
     "AssetType",
@@ -32,4 +37,7 @@ __all__ = [
     "ChatFeedback",
     "PixKey",
     "PixKeyType",
+    "IdempotencyKey",
+    "LedgerEntry",
+    "LedgerEntryType",
 ]
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Enum as SQLEnum
+from sqlalchemy import (
+    Column, Integer, String, Float, DateTime, Date, Boolean, ForeignKey,
+    UniqueConstraint, Enum as SQLEnum
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from src.database.connection import Base
@@ -48,3 +51,29 @@ class Account(Base):
     
     def __repr__(self):
         return f"<Account(id={self.id}, number={self.account_number}, type={self.account_type})>"
+
+
+class BalanceSnapshot(Base):
+    """Saldo de abertura/fechamento e fluxos de cada conta por dia (UTC)"""
+    __tablename__ = "balance_snapshots"
+    __table_args__ = (
+        UniqueConstraint(
+            "account_id", "day",
+            name="uq_balance_snapshots_account_day"
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    opening_balance = Column(Float, nullable=False)
+    closing_balance = Column(Float, nullable=False)
+    total_credits = Column(Float, default=0.0, nullable=False)
+    total_debits = Column(Float, default=0.0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return (
+            f"<BalanceSnapshot(account_id={self.account_id}, "
+            f"day={self.day}, closing={self.closing_balance})>"
+        )
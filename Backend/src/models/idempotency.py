@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Integer, Text, LargeBinary, DateTime
+from datetime import datetime
+from src.database.connection import Base
+
+
+class IdempotencyKey(Base):
+    """Resposta armazenada de uma requisição com Idempotency-Key"""
+    __tablename__ = "idempotency_keys"
+    
+    # sha256 de (usuário, Idempotency-Key)
+    key = Column(String(64), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 da requisição
+    state = Column(String(20), nullable=False, default="IN_FLIGHT")  # IN_FLIGHT, COMPLETED
+    response_status = Column(Integer)
+    response_headers = Column(Text)  # JSON [[nome, valor], ...]
+    response_body = Column(LargeBinary)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<IdempotencyKey(key={self.key[:12]}, state={self.state})>"
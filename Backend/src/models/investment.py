@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, Float, DateTime, 
-    ForeignKey, Boolean, Enum as SQLEnum
+    ForeignKey, Boolean, Index, Enum as SQLEnum
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -26,6 +26,12 @@ class AssetCategory(str, enum.Enum):
 
 class Asset(Base):
     __tablename__ = "assets"
+    __table_args__ = (
+        # Listagem de ativos ativos ordenada por nome
+        Index("ix_assets_active_name", "is_active", "name"),
+        # Geração de velas: ações ativas
+        Index("ix_assets_type_active", "asset_type", "is_active"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     symbol = Column(String(10), unique=True, nullable=False, index=True)
@@ -81,6 +87,12 @@ class CandleInterval(str, enum.Enum):
 
 class Candle(Base):
     __tablename__ = "candles"
+    __table_args__ = (
+        # Histórico por ativo/intervalo ordenado por abertura
+        Index("ix_candles_asset_interval_open_time", "asset_id", "interval", "open_time"),
+        # Última vela por ativo/intervalo
+        Index("ix_candles_asset_interval_close_time", "asset_id", "interval", "close_time"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     asset_id = Column(Integer, ForeignKey("assets.id"), nullable=False)
     interval = Column(SQLEnum(CandleInterval), nullable=False, default=CandleInterval.ONE_MINUTE)
@@ -125,6 +137,9 @@ class Candle(Base):
 
 class PortfolioItem(Base):
     __tablename__ = "portfolio_items"
+    __table_args__ = (
+        Index("ix_portfolio_items_account_asset", "account_id", "asset_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
@@ -0,0 +1,54 @@
+from sqlalchemy import (
+    Column, Integer, Float, DateTime, ForeignKey, Index,
+    Enum as SQLEnum
+)
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from src.database.connection import Base
+import enum
+
+
+class LedgerEntryType(str, enum.Enum):
+    """Origem do lançamento no razão"""
+    TRANSACTION = "TRANSACTION"  # Perna de uma transação
+    OPENING = "OPENING"  # Saldo inicial da conta (sem transação)
+    ADJUSTMENT = "ADJUSTMENT"  # Ajuste manual de saldo
+    MEMO = "MEMO"  # Transação sem efeito no saldo (valor zero, só para o extrato)
+
+
+class LedgerEntry(Base):
+    """Lançamento com sinal em uma conta (razão de partidas dobradas).
+
+    Somente inserção: cada movimentação gera um lançamento por conta
+    afetada (+ crédito, - débito) e o saldo da conta é a soma deles.
+    Transações que não mexem no saldo (compra no cartão de crédito,
+    pendentes ou com falha) geram um lançamento MEMO de valor zero, para
+    que o extrato continue listando-as.
+    """
+    __tablename__ = "ledger_entries"
+    __table_args__ = (
+        # Extrato: uma única busca no índice por conta, em ordem cronológica
+        Index("ix_ledger_entries_account_created", "account_id", "created_at"),
+        # Pernas de uma transação (migração e conciliação)
+        Index("ix_ledger_entries_transaction", "transaction_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    transaction_id = Column(Integer, ForeignKey("transactions.id"), nullable=True)
+    entry_type = Column(
+        SQLEnum(LedgerEntryType),
+        default=LedgerEntryType.TRANSACTION,
+        nullable=False
+    )
+    amount = Column(Float, nullable=False)  # + crédito, - débito
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    transaction = relationship("Transaction")
+
+    def __repr__(self):
+        return (
+            f"<LedgerEntry(account_id={self.account_id}, "
+            f"transaction_id={self.transaction_id}, amount={self.amount})>"
+        )
@@ -1,6 +1,6 @@
 from sqlalchemy import (
-    Column, Integer, String, Float, DateTime, ForeignKey, Boolean,
-    Enum as SQLEnum
+    Column, Integer, String, Float, DateTime, Date, ForeignKey, Boolean,
+    Index, UniqueConstraint, Enum as SQLEnum
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -31,6 +31,21 @@ class TransactionStatus(str, enum.Enum):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Extrato: cada lado do OR (origem/destino) vira uma busca no índice
+        Index("ix_transactions_from_account_created", "from_account_id", "created_at"),
+        Index("ix_transactions_to_account_created", "to_account_id", "created_at"),
+        # Histórico por tipo (ex.: pagamentos de contas) de uma conta
+        Index(
+            "ix_transactions_from_account_type_created",
+            "from_account_id", "transaction_type", "created_at"
+        ),
+        # Agregações por tipo/status em um período (contadores de saque)
+        Index(
+            "ix_transactions_type_status_created",
+            "transaction_type", "status", "created_at"
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     from_account_id = Column(Integer, ForeignKey("accounts.id"), nullable=True)
@@ -54,6 +69,18 @@ class Transaction(Base):
 
 class ScheduledTransaction(Base):
     __tablename__ = "scheduled_transactions"
+    __table_args__ = (
+        # Scheduler: próximos itens pendentes vencidos
+        Index(
+            "ix_scheduled_transactions_status_schedule_date",
+            "status", "schedule_date"
+        ),
+        # Listagem dos agendamentos pendentes de uma conta
+        Index(
+            "ix_scheduled_transactions_account_status_schedule_date",
+            "from_account_id", "status", "schedule_date"
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     from_account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
@@ -62,13 +89,38 @@ class ScheduledTransaction(Base):
     amount = Column(Float, nullable=False)
     description = Column(String(500))
     schedule_date = Column(DateTime, nullable=False)
-    status = Column(String(20), default="PENDING")  # PENDING, EXECUTED, FAILED
+    status = Column(String(20), default="PENDING")  # PENDING, COMPLETED, FAILED, CANCELLED
     bar_code = Column(String(100))
     pix_key = Column(String(255))
     is_recurring = Column(Boolean, default=False)
     recurrence_period = Column(String(20))  # DAILY, WEEKLY, MONTHLY, YEARLY
+    recurrence_day = Column(Integer)  # Dia âncora do mês (MONTHLY, YEARLY)
     created_at = Column(DateTime, default=datetime.utcnow)
     executed_at = Column(DateTime)
     
     def __repr__(self):
         return f"<ScheduledTransaction(id={self.id}, schedule_date={self.schedule_date})>"
+
+
+class DailyWithdrawalCounter(Base):
+    """Contadores diários de saque por conta (count e total do dia útil)"""
+    __tablename__ = "daily_withdrawal_counters"
+    __table_args__ = (
+        UniqueConstraint(
+            "account_id", "business_day",
+            name="uq_daily_withdrawal_counters_account_day"
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    business_day = Column(Date, nullable=False, index=True)
+    withdrawal_count = Column(Integer, default=0, nullable=False)
+    total_amount = Column(Float, default=0.0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return (
+            f"<DailyWithdrawalCounter(account_id={self.account_id}, "
+            f"day={self.business_day}, count={self.withdrawal_count})>"
+        )
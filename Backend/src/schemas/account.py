@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List
 
 
 class AccountCreate(BaseModel):
@@ -30,3 +30,21 @@ class BalanceResponse(BaseModel):
     account_number: str
     balance: float
     account_type: str
+
+
+class BalanceHistoryPoint(BaseModel):
+    """Saldo de um período (dia, semana ou mês)"""
+    period_start: date
+    opening_balance: float
+    closing_balance: float
+    total_credits: float
+    total_debits: float
+
+
+class BalanceHistoryResponse(BaseModel):
+    """Schema para histórico de saldo"""
+    account_id: int
+    start: datetime
+    end: datetime
+    granularity: str
+    points: List[BalanceHistoryPoint]
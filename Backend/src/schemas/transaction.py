@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Literal
 from src.models.transaction import TransactionType, TransactionStatus
+from src.configs.settings import settings
 
 
 class DepositRequest(BaseModel):
@@ -50,8 +51,19 @@ class TransferRequest(BaseModel):
 
 
 class TransferResponse(BaseModel):
-    debit_transaction_id: int
-    credit_transaction_id: int
+    transaction_id: int
+    # Obsoletos: a transferência passou a ser uma única transação (use
+    # transaction_id). Vêm sempre nulos e saem numa versão futura
+    debit_transaction_id: Optional[int] = Field(
+        default=None,
+        description="Obsoleto: sempre nulo. Use transaction_id",
+        json_schema_extra={"deprecated": True}
+    )
+    credit_transaction_id: Optional[int] = Field(
+        default=None,
+        description="Obsoleto: sempre nulo. Use transaction_id",
+        json_schema_extra={"deprecated": True}
+    )
     from_account_id: int
     to_account_number: str
     amount: float
@@ -102,11 +114,52 @@ class BillPaymentResponse(BaseModel):
     status: TransactionStatus
 
 
+class BatchOperation(BaseModel):
+    operation_type: Literal[
+        TransactionType.TRANSFER,
+        TransactionType.PIX_SEND,
+        TransactionType.BILL_PAYMENT
+    ]
+    from_account_id: int
+    amount: float = Field(..., gt=0)
+    to_account_number: Optional[str] = None  # TRANSFER
+    pix_key: Optional[str] = None  # PIX_SEND
+    bar_code: Optional[str] = None  # BILL_PAYMENT
+    description: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    mode: Literal["ALL_OR_NOTHING", "BEST_EFFORT"] = "ALL_OR_NOTHING"
+    operations: List[BatchOperation] = Field(
+        ..., min_length=1, max_length=settings.MAX_BATCH_OPERATIONS
+    )
+
+
+class BatchOperationResult(BaseModel):
+    index: int
+    operation_type: TransactionType
+    success: bool
+    transaction_ids: List[int] = []
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    mode: str
+    total: int
+    succeeded: int
+    failed: int
+    elapsed_ms: float
+    operations_per_second: float
+    results: List[BatchOperationResult]
+
+
 class TransactionResponse(BaseModel):
     id: int
-    from_account_id: int
+    from_account_id: Optional[int] = None
+    to_account_id: Optional[int] = None
     transaction_type: TransactionType
     amount: float
+    signed_amount: Optional[float] = None  # + crédito, - débito na conta
     description: str
     created_at: datetime
     status: TransactionStatus
@@ -117,9 +170,11 @@ class TransactionResponse(BaseModel):
 
 class StatementResponse(BaseModel):
     transactions: List[TransactionResponse]
-    total_count: int
+    total_count: Optional[int] = None
     limit: int
-    offset: int
+    offset: int = 0
+    next_cursor: Optional[str] = None
+    has_more: bool = False
 
 
 class ScheduleTransactionRequest(BaseModel):
@@ -129,6 +184,10 @@ class ScheduleTransactionRequest(BaseModel):
     scheduled_date: datetime
     description: str = ""
     to_account_id: Optional[int] = None
+    pix_key: Optional[str] = None
+    bar_code: Optional[str] = None
+    is_recurring: bool = False
+    recurrence_period: Optional[Literal["DAILY", "WEEKLY", "MONTHLY", "YEARLY"]] = None
 
 
 class ScheduledTransactionResponse(BaseModel):
@@ -139,8 +198,13 @@ class ScheduledTransactionResponse(BaseModel):
     schedule_date: datetime
     description: str
     to_account_id: Optional[int]
+    pix_key: Optional[str] = None
+    bar_code: Optional[str] = None
+    is_recurring: bool = False
+    recurrence_period: Optional[str] = None
     status: TransactionStatus
     created_at: datetime
+    executed_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -1,10 +1,12 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from src.models.account import Account
+from src.models.ledger import LedgerEntryType
 from src.models.user import User
 from src.utils.generators import generate_account_number
 from src.utils.validators import validate_account_age_for_type
 from src.configs.settings import settings
+from src.services import balance_service, ledger_service
 
 
 def create_account(db: Session, user_id: int, account_type: str, initial_deposit: float = 0.0) -> Account:
@@ -62,6 +64,12 @@ def create_account(db: Session, user_id: int, account_type: str, initial_deposit
     )
     
     db.add(account)
+    if initial_deposit:
+        # Saldo inicial entra no razão como lançamento de abertura
+        db.flush()
+        ledger_service.record_adjustment(
+            db, account.id, initial_deposit, LedgerEntryType.OPENING
+        )
     db.commit()
     db.refresh(account)
     return account
@@ -91,7 +99,12 @@ def get_accounts_by_user_id(db: Session, user_id: int):
 
 
 def update_balance(db: Session, account: Account, amount: float):
-    account.balance += amount
+    if amount > 0:
+        balance_service.credit(db, account.id, amount)
+    elif amount < 0:
+        balance_service.debit(db, account.id, -amount)
+    if amount:
+        ledger_service.record_adjustment(db, account.id, amount)
     db.commit()
     db.refresh(account)
     return account
@@ -0,0 +1,240 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from src.configs.settings import settings
+from src.models.account import Account, BalanceSnapshot
+from src.models.ledger import LedgerEntry, LedgerEntryType
+from src.services import balance_service
+
+
+GRANULARITIES = ("day", "week", "month")
+
+# Limite de pontos por consulta (evita respostas gigantes)
+MAX_HISTORY_POINTS = 1000
+
+
+def _bucket_start(day: date, granularity: str) -> date:
+    # Primeiro dia do período (semana começa na segunda-feira)
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day + timedelta(days=7)
+    if granularity == "month":
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def _balance_before(db: Session, account_id: int, day: date) -> Optional[float]:
+    # Saldo no início de `day`: fechamento do último snapshot anterior ou,
+    # sem histórico anterior, a abertura do primeiro snapshot seguinte
+    previous = db.query(BalanceSnapshot.closing_balance).filter(
+        BalanceSnapshot.account_id == account_id,
+        BalanceSnapshot.day < day
+    ).order_by(BalanceSnapshot.day.desc()).first()
+    if previous:
+        return previous[0]
+
+    following = db.query(BalanceSnapshot.opening_balance).filter(
+        BalanceSnapshot.account_id == account_id,
+        BalanceSnapshot.day >= day
+    ).order_by(BalanceSnapshot.day.asc()).first()
+    if following:
+        return following[0]
+
+    return None
+
+
+def _ledger_flows(
+    db: Session,
+    account_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    # Movimentações da conta direto do razão (transações e ajustes), em
+    # ordem cronológica, no índice (account_id, created_at). O lançamento de
+    # abertura não é movimentação: como nos snapshots gravados a cada
+    # movimento, ele já está no saldo de abertura do primeiro dia. Memos
+    # têm valor zero
+    query = db.query(LedgerEntry.created_at, LedgerEntry.amount).filter(
+        LedgerEntry.account_id == account_id,
+        LedgerEntry.entry_type.notin_([LedgerEntryType.OPENING, LedgerEntryType.MEMO])
+    )
+    if start:
+        query = query.filter(LedgerEntry.created_at >= start)
+    if end:
+        query = query.filter(LedgerEntry.created_at <= end)
+    return query.order_by(
+        LedgerEntry.created_at.asc(),
+        LedgerEntry.id.asc()
+    ).yield_per(settings.STATEMENT_EXPORT_BATCH_SIZE)
+
+
+def _replay(
+    db: Session,
+    account_id: int,
+    start: datetime,
+    end: datetime
+) -> Tuple[float, float]:
+    # Entradas e saídas dos lançamentos de um trecho curto (no máximo um dia)
+    credits = debits = 0.0
+    for _, amount in _ledger_flows(db, account_id, start, end):
+        if amount >= 0:
+            credits += amount
+        else:
+            debits -= amount
+    return credits, debits
+
+
+def get_balance_history(
+    db: Session,
+    account_id: int,
+    start: datetime,
+    end: datetime,
+    granularity: str = "day"
+) -> List[dict]:
+    # Histórico de saldo por período a partir dos snapshots diários.
+    # Só o trecho parcial do primeiro e do último dia é recalculado a
+    # partir das transações
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularidade inválida: {granularity}")
+    if start > end:
+        raise ValueError("Data inicial deve ser anterior à data final")
+
+    first_day, last_day = start.date(), end.date()
+
+    buckets = []
+    bucket = _bucket_start(first_day, granularity)
+    while bucket <= last_day:
+        buckets.append(bucket)
+        bucket = _next_bucket(bucket, granularity)
+        if len(buckets) > MAX_HISTORY_POINTS:
+            raise ValueError(
+                f"Período muito longo: máximo de {MAX_HISTORY_POINTS} pontos"
+            )
+
+    snapshots = db.query(BalanceSnapshot).filter(
+        BalanceSnapshot.account_id == account_id,
+        BalanceSnapshot.day >= first_day,
+        BalanceSnapshot.day <= last_day
+    ).order_by(BalanceSnapshot.day.asc()).all()
+
+    running = _balance_before(db, account_id, first_day)
+    if running is None:
+        # Conta sem nenhuma movimentação registrada: saldo constante
+        running = balance_service.get_balance(db, account_id)
+        if running is None:
+            raise ValueError("Conta não encontrada")
+
+    # Abertura no instante `start`: o que entrou e saiu do início do dia até
+    # `start` fica fora do período (saldo de abertura e fluxos)
+    before = (0.0, 0.0)
+    day_start = datetime.combine(first_day, datetime.min.time())
+    if start > day_start:
+        before = _replay(
+            db, account_id, day_start, start - timedelta(microseconds=1)
+        )
+        running += before[0] - before[1]
+
+    # Fechamento no instante `end`: desconta o que veio depois no mesmo dia
+    after = (0.0, 0.0)
+    day_end = (
+        datetime.combine(last_day, datetime.min.time()) +
+        timedelta(days=1) - timedelta(microseconds=1)
+    )
+    if end < day_end and end < datetime.utcnow():
+        after = _replay(
+            db, account_id, end + timedelta(microseconds=1), day_end
+        )
+
+    by_bucket = defaultdict(list)
+    for snapshot in snapshots:
+        by_bucket[_bucket_start(snapshot.day, granularity)].append(snapshot)
+
+    history = []
+    for index, bucket in enumerate(buckets):
+        opening = running
+        credits = debits = 0.0
+        for snapshot in by_bucket.get(bucket, []):
+            credits += snapshot.total_credits
+            debits += snapshot.total_debits
+            running = snapshot.closing_balance
+
+        # Os snapshots cobrem o dia inteiro: recorta o primeiro e o último
+        # dia com os mesmos lançamentos usados na abertura e no fechamento
+        if index == 0:
+            credits -= before[0]
+            debits -= before[1]
+        if index == len(buckets) - 1:
+            credits -= after[0]
+            debits -= after[1]
+            running -= after[0] - after[1]
+
+        history.append({
+            "period_start": max(bucket, first_day),
+            "opening_balance": round(opening, 2),
+            "closing_balance": round(running, 2),
+            "total_credits": round(credits, 2),
+            "total_debits": round(debits, 2),
+        })
+
+    return history
+
+
+def backfill_balance_snapshots(db: Session, account_id: int) -> int:
+    # Reconstrói os snapshots da conta a partir dos lançamentos do razão,
+    # ancorando no saldo atual. Retorna a quantidade de dias gravados
+    db.query(BalanceSnapshot).filter(
+        BalanceSnapshot.account_id == account_id
+    ).delete(synchronize_session=False)
+
+    balance_service.lock_accounts(db, [account_id])
+    current = balance_service.get_balance(db, account_id)
+    if current is None:
+        raise ValueError("Conta não encontrada")
+
+    flows = defaultdict(lambda: [0.0, 0.0])
+    for created_at, amount in _ledger_flows(db, account_id):
+        day_flows = flows[created_at.date()]
+        if amount >= 0:
+            day_flows[0] += amount
+        else:
+            day_flows[1] -= amount
+
+    running = current - sum(c - d for c, d in flows.values())
+    snapshots = []
+    for day in sorted(flows):
+        credits, debits = flows[day]
+        closing = running + credits - debits
+        snapshots.append({
+            "account_id": account_id,
+            "day": day,
+            "opening_balance": running,
+            "closing_balance": closing,
+            "total_credits": credits,
+            "total_debits": debits,
+            "updated_at": datetime.utcnow(),
+        })
+        running = closing
+
+    if snapshots:
+        db.execute(BalanceSnapshot.__table__.insert(), snapshots)
+    db.commit()
+
+    return len(snapshots)
+
+
+def backfill_all_balance_snapshots(db: Session) -> dict:
+    # Reconstrói os snapshots de todas as contas (uma transação por conta)
+    results = {}
+    account_ids = [account_id for (account_id,) in db.query(Account.id).all()]
+    for account_id in account_ids:
+        results[account_id] = backfill_balance_snapshots(db, account_id)
+    return results
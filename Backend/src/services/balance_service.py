@@ -0,0 +1,205 @@
+from datetime import datetime
+from typing import Dict, Iterable
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from src.models.account import Account, BalanceSnapshot
+from src.configs.settings import settings
+
+
+class InsufficientBalanceError(Exception):
+    #Erro de saldo insuficiente
+    pass
+
+
+def _supports_row_locks(db: Session) -> bool:
+    # SELECT ... FOR UPDATE só faz sentido em bancos com lock por linha
+    return (
+        settings.BALANCE_ROW_LOCKING and
+        db.get_bind().dialect.name == "postgresql"
+    )
+
+
+def _begin_savepoint(db: Session):
+    # O pysqlite só abre a transação antes do primeiro INSERT/UPDATE/DELETE:
+    # um SAVEPOINT fora de transação viraria a transação inteira e o RELEASE
+    # já faria o commit. Abre antes a transação que o UPDATE abriria
+    if db.get_bind().dialect.name == "sqlite":
+        connection = db.connection().connection.driver_connection
+        if not connection.in_transaction:
+            connection.execute("BEGIN")
+    return db.begin_nested()
+
+
+def _sync_loaded_account(db: Session, account_id: int, balance: float) -> None:
+    # Atualiza a conta já carregada na sessão sem marcá-la como alterada,
+    # evitando que um flush posterior sobrescreva o valor gravado no banco
+    account = db.identity_map.get(identity_key(Account, account_id))
+    if account is not None:
+        set_committed_value(account, "balance", balance)
+
+
+def _record_snapshot(
+    db: Session,
+    account_id: int,
+    delta: float,
+    new_balance: float,
+    now: datetime
+) -> None:
+    # Mantém o snapshot diário da conta na mesma transação da movimentação
+    credits = max(delta, 0.0)
+    debits = max(-delta, 0.0)
+    
+    day = now.date()
+    updated = db.execute(
+        update(BalanceSnapshot)
+        .where(
+            BalanceSnapshot.account_id == account_id,
+            BalanceSnapshot.day == day
+        )
+        .values(
+            closing_balance=new_balance,
+            total_credits=BalanceSnapshot.total_credits + credits,
+            total_debits=BalanceSnapshot.total_debits + debits,
+            updated_at=now
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    
+    if not updated:
+        db.execute(insert(BalanceSnapshot).values(
+            account_id=account_id,
+            day=day,
+            opening_balance=new_balance - delta,
+            closing_balance=new_balance,
+            total_credits=credits,
+            total_debits=debits,
+            updated_at=now
+        ))
+
+
+def _apply_delta(
+    db: Session,
+    account_id: int,
+    delta: float
+) -> float:
+    # UPDATE único e condicional: o saldo nunca é lido para o Python antes
+    # da escrita, então workers concorrentes não perdem atualizações
+    now = datetime.utcnow()
+    stmt = update(Account).where(Account.id == account_id)
+    if delta < 0:
+        stmt = stmt.where(Account.balance >= -delta)
+    stmt = stmt.values(
+        balance=Account.balance + delta,
+        updated_at=now
+    ).execution_options(synchronize_session=False)
+
+    if db.get_bind().dialect.update_returning:
+        new_balance = db.execute(
+            stmt.returning(Account.balance)
+        ).scalar_one_or_none()
+    else:
+        result = db.execute(stmt)
+        new_balance = None
+        if result.rowcount:
+            new_balance = get_balance(db, account_id)
+
+    if new_balance is None:
+        current = get_balance(db, account_id)
+        if current is None:
+            raise ValueError("Conta não encontrada")
+        raise InsufficientBalanceError(
+            f"Saldo insuficiente. Disponível: R$ {current}"
+        )
+
+    _sync_loaded_account(db, account_id, new_balance)
+    _record_snapshot(db, account_id, delta, new_balance, now)
+    return new_balance
+
+
+def get_balance(db: Session, account_id: int):
+    # Lê o saldo atual direto do banco (ignora o cache da sessão)
+    return db.execute(
+        select(Account.balance).where(Account.id == account_id)
+    ).scalar_one_or_none()
+
+
+def lock_accounts(db: Session, account_ids: Iterable[int]) -> None:
+    # Bloqueia as contas sempre em ordem crescente de id, para que duas
+    # transferências em sentidos opostos não entrem em deadlock
+    ids = sorted(set(account_ids))
+    if not ids or not _supports_row_locks(db):
+        return
+
+    db.execute(
+        select(Account.id)
+        .where(Account.id.in_(ids))
+        .order_by(Account.id)
+        .with_for_update()
+    ).all()
+
+
+def credit(db: Session, account_id: int, amount: float) -> float:
+    # Credita valor na conta. Retorna o novo saldo (sem commit)
+    if amount <= 0:
+        raise ValueError("Valor deve ser positivo")
+
+    lock_accounts(db, [account_id])
+    return _apply_delta(db, account_id, amount)
+
+
+def debit(db: Session, account_id: int, amount: float) -> float:
+    # Debita valor da conta se houver saldo. Retorna o novo saldo (sem commit)
+    if amount <= 0:
+        raise ValueError("Valor deve ser positivo")
+
+    lock_accounts(db, [account_id])
+    return _apply_delta(db, account_id, -amount)
+
+
+def apply_deltas(db: Session, deltas: Dict[int, float]) -> Dict[int, float]:
+    # Aplica vários deltas (conta -> valor com sinal) de forma tudo-ou-nada.
+    # Locks e escritas seguem a ordem crescente de id das contas
+    lock_accounts(db, deltas.keys())
+
+    balances = {}
+    try:
+        # Savepoint: uma falha descarta as escritas já feitas no movimento,
+        # sem desfazer o restante da transação da sessão
+        with _begin_savepoint(db):
+            for account_id in sorted(deltas):
+                delta = deltas[account_id]
+                if not delta:
+                    continue
+                balances[account_id] = _apply_delta(db, account_id, delta)
+    except (InsufficientBalanceError, ValueError):
+        # Contas carregadas na sessão voltam a ler o saldo do banco
+        for account_id in balances:
+            account = db.identity_map.get(identity_key(Account, account_id))
+            if account is not None:
+                db.expire(account, ["balance"])
+        raise
+
+    return balances
+
+
+def transfer(
+    db: Session,
+    from_account_id: int,
+    to_account_id: int,
+    amount: float
+) -> tuple[float, float]:
+    # Move valor entre duas contas. Retorna (saldo origem, saldo destino)
+    if amount <= 0:
+        raise ValueError("Valor deve ser positivo")
+
+    if from_account_id == to_account_id:
+        raise ValueError("Não é possível transferir para a mesma conta")
+
+    balances = apply_deltas(db, {
+        from_account_id: -amount,
+        to_account_id: amount
+    })
+    return balances[from_account_id], balances[to_account_id]
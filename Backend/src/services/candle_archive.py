@@ -0,0 +1,342 @@
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from src.configs.settings import settings
+from src.models.investment import CandleInterval
+from src.services.candle_service import get_recent_candles
+
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# Colunas do arquivo: um arquivo por coluna, valores little-endian de
+# largura fixa (horários em microssegundos desde a época)
+COLUMNS = (
+    ("open_time", np.dtype("<i8")),
+    ("close_time", np.dtype("<i8")),
+    ("open_price", np.dtype("<f8")),
+    ("high_price", np.dtype("<f8")),
+    ("low_price", np.dtype("<f8")),
+    ("close_price", np.dtype("<f8")),
+    ("volume", np.dtype("<f8")),
+    ("trades_count", np.dtype("<i8")),
+    ("quote_volume", np.dtype("<f8")),
+)
+TIME_COLUMNS = ("open_time", "close_time")
+
+# Resposta binária: cabeçalho (magic, versão, quantidade de velas) seguido
+# das colunas inteiras, na ordem de COLUMNS
+BINARY_HEADER = struct.Struct("<4sBI")
+BINARY_MAGIC = b"CNDL"
+BINARY_VERSION = 1
+
+# Uma vela no JSON de /investments/candles/{asset_id}
+JSON_CANDLE = (
+    '{"open":%r,"high":%r,"low":%r,"close":%r,"volume":%r,"trades":%d,'
+    '"open_time":"%s","close_time":"%s"}'
+)
+
+
+def _micros(value: datetime) -> int:
+    return (value - EPOCH) // MICROSECOND
+
+
+def _isoformat(values: np.ndarray) -> List[str]:
+    # Mesmo formato de datetime.isoformat() (microssegundos só nas velas
+    # que os têm)
+    stamps = values.astype("datetime64[us]")
+    text = np.datetime_as_string(stamps, unit="s").tolist()
+    fractional = np.flatnonzero(values % 1_000_000)
+    if fractional.size:
+        exact = np.datetime_as_string(stamps[fractional], unit="us").tolist()
+        for index, value in zip(fractional.tolist(), exact):
+            text[index] = value
+    return text
+
+
+class CandleColumns:
+    # Velas de um (ativo, intervalo) em colunas NumPy, em ordem cronológica
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns["open_time"])
+
+    @classmethod
+    def empty(cls) -> "CandleColumns":
+        return cls({name: np.empty(0, dtype) for name, dtype in COLUMNS})
+
+    @classmethod
+    def from_rows(cls, rows: Iterable) -> "CandleColumns":
+        # Linhas com os atributos de Candle (ORM ou Row) ou dicts
+        rows = [row if isinstance(row, dict) else row._mapping for row in rows]
+        columns = {}
+        for name, dtype in COLUMNS:
+            if name in TIME_COLUMNS:
+                values = [_micros(row[name]) for row in rows]
+            else:
+                values = [row[name] or 0 for row in rows]
+            columns[name] = np.array(values, dtype=dtype)
+        return cls(columns)
+
+    def concat(self, other: "CandleColumns") -> "CandleColumns":
+        if not len(other):
+            return self
+        if not len(self):
+            return other
+        return CandleColumns({
+            name: np.concatenate((self.columns[name], other.columns[name]))
+            for name, _ in COLUMNS
+        })
+
+    def last(self, limit: int) -> "CandleColumns":
+        if len(self) <= limit:
+            return self
+        return CandleColumns({
+            name: values[-limit:] for name, values in self.columns.items()
+        })
+
+    def to_json(self) -> str:
+        # Lista JSON das velas no formato de /investments/candles/{asset_id},
+        # escrita direto das colunas: cada coluna é convertida uma vez
+        # (tolist) e cada vela formatada por um template, sem dicts
+        # intermediários (floats saem com repr, como no json.dumps)
+        c = self.columns
+        return "[" + ",".join(map(JSON_CANDLE.__mod__, zip(
+            c["open_price"].tolist(), c["high_price"].tolist(),
+            c["low_price"].tolist(), c["close_price"].tolist(),
+            c["volume"].tolist(), c["trades_count"].tolist(),
+            _isoformat(c["open_time"]), _isoformat(c["close_time"])
+        ))) + "]"
+
+    def to_bytes(self) -> bytes:
+        # Cabeçalho + colunas inteiras (cópia direta dos arrays)
+        return BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(self)) + b"".join(
+            np.ascontiguousarray(self.columns[name], dtype).tobytes()
+            for name, dtype in COLUMNS
+        )
+
+
+class CandleArchive:
+    # Histórico das velas fechadas em arquivos colunares, só de acréscimo:
+    # <CANDLE_ARCHIVE_DIR>/<intervalo>/<ativo>/<coluna>.bin. O simulador
+    # acumula as velas dos intervalos de CANDLE_ARCHIVE_INTERVALS e grava a
+    # cada CANDLE_ARCHIVE_FLUSH_SECONDS (um append por coluna e par).
+    # Leituras mapeiam só o trecho pedido (np.memmap) e nunca veem uma vela
+    # pela metade: a quantidade de velas é a da coluna mais curta. Velas com
+    # open_time até a última arquivada do par são ignoradas (sem duplicatas)
+
+    def __init__(
+        self,
+        root: str = None,
+        intervals: Iterable[str] = None,
+        flush_seconds: float = None,
+        enabled: bool = None
+    ):
+        self.enabled = settings.CANDLE_ARCHIVE_ENABLED if enabled is None else enabled
+        self.root = Path(root or settings.CANDLE_ARCHIVE_DIR)
+        self.intervals = {
+            CandleInterval(interval)
+            for interval in (intervals if intervals is not None else settings.CANDLE_ARCHIVE_INTERVALS)
+        }
+        self.flush_seconds = flush_seconds or settings.CANDLE_ARCHIVE_FLUSH_SECONDS
+
+        self._pending: List[dict] = []
+        self._last: Dict[Tuple[int, CandleInterval], int] = {}
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+        # Métricas
+        self.appended = 0
+        self.skipped = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+
+    def _path(self, asset_id: int, interval: CandleInterval) -> Path:
+        return self.root / interval.value / str(asset_id)
+
+    def count(self, asset_id: int, interval: CandleInterval) -> int:
+        # Velas completas do par (a coluna mais curta)
+        path = self._path(asset_id, interval)
+        counts = []
+        for name, dtype in COLUMNS:
+            try:
+                counts.append((path / f"{name}.bin").stat().st_size // dtype.itemsize)
+            except FileNotFoundError:
+                return 0
+        return min(counts)
+
+    def _last_open_time(self, asset_id: int, interval: CandleInterval) -> Optional[int]:
+        # Última open_time arquivada do par. Na primeira escrita do par no
+        # processo, corta as colunas mais longas que a mais curta (gravação
+        # interrompida), para os próximos appends ficarem alinhados
+        key = (asset_id, interval)
+        if key not in self._last:
+            count = self.count(asset_id, interval)
+            path = self._path(asset_id, interval)
+            for name, dtype in COLUMNS:
+                column = path / f"{name}.bin"
+                if column.exists() and column.stat().st_size != count * dtype.itemsize:
+                    with open(column, "r+b") as f:
+                        f.truncate(count * dtype.itemsize)
+            if not count:
+                return None
+            dtype = COLUMNS[0][1]
+            with open(path / "open_time.bin", "rb") as f:
+                f.seek((count - 1) * dtype.itemsize)
+                self._last[key] = int(np.frombuffer(f.read(dtype.itemsize), dtype)[0])
+        return self._last[key]
+
+    def last_open_time(self, asset_id: int, interval: CandleInterval) -> Optional[datetime]:
+        # open_time da última vela arquivada do par (None se não há)
+        with self._write_lock:
+            last = self._last_open_time(asset_id, interval)
+        return EPOCH + last * MICROSECOND if last is not None else None
+
+    def append(self, rows: Iterable[dict]) -> int:
+        # Grava as velas (dicts com as colunas de Candle) nos arquivos dos
+        # pares, em ordem de open_time. Retorna as velas gravadas
+        pairs: Dict[Tuple[int, CandleInterval], List[dict]] = {}
+        for row in rows:
+            pairs.setdefault((row["asset_id"], row["interval"]), []).append(row)
+
+        written = skipped = 0
+        with self._write_lock:
+            for (asset_id, interval), pair_rows in pairs.items():
+                pair_rows.sort(key=lambda row: row["open_time"])
+                columns = CandleColumns.from_rows(pair_rows).columns
+                last = self._last_open_time(asset_id, interval)
+                if last is not None:
+                    keep = columns["open_time"] > last
+                    if not keep.all():
+                        skipped += int((~keep).sum())
+                        columns = {name: values[keep] for name, values in columns.items()}
+                size = len(columns["open_time"])
+                if not size:
+                    continue
+
+                path = self._path(asset_id, interval)
+                path.mkdir(parents=True, exist_ok=True)
+                # open_time por último: a coluna que define o fim do par
+                for name, dtype in COLUMNS[1:] + COLUMNS[:1]:
+                    with open(path / f"{name}.bin", "ab") as f:
+                        f.write(columns[name].astype(dtype, copy=False).tobytes())
+                self._last[(asset_id, interval)] = int(columns["open_time"][-1])
+                written += size
+
+        with self._lock:
+            self.appended += written
+            self.skipped += skipped
+        return written
+
+    def add(self, rows: List[dict]):
+        # Acumula as velas fechadas dos intervalos arquivados
+        if not self.enabled:
+            return
+        rows = [row for row in rows if row["interval"] in self.intervals]
+        if rows:
+            with self._lock:
+                self._pending.extend(rows)
+
+    def flush(self) -> int:
+        # Grava as velas acumuladas
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._flushed_at = time.monotonic()
+        if not rows:
+            return 0
+        started = time.perf_counter()
+        written = self.append(rows)
+        with self._lock:
+            self.flushes += 1
+            self.last_flush_seconds = time.perf_counter() - started
+        return written
+
+    def maybe_flush(self) -> int:
+        if time.monotonic() - self._flushed_at < self.flush_seconds:
+            return 0
+        return self.flush()
+
+    def read(
+        self,
+        asset_id: int,
+        interval: CandleInterval,
+        limit: int = None
+    ) -> CandleColumns:
+        # Últimas `limit` velas arquivadas do par (todas se None)
+        count = self.count(asset_id, interval)
+        start = 0 if limit is None else max(0, count - limit)
+        if count == start:
+            return CandleColumns.empty()
+
+        path = self._path(asset_id, interval)
+        columns = {}
+        for name, dtype in COLUMNS:
+            mapped = np.memmap(
+                path / f"{name}.bin", dtype=dtype, mode="r",
+                offset=start * dtype.itemsize, shape=(count - start,)
+            )
+            # Cópia do trecho: o mapeamento é liberado em seguida
+            columns[name] = np.array(mapped)
+            del mapped
+        return CandleColumns(columns)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "intervals": sorted(interval.value for interval in self.intervals),
+                "pending": len(self._pending),
+                "appended": self.appended,
+                # Velas já arquivadas recebidas de novo (ignoradas)
+                "skipped": self.skipped,
+                "flushes": self.flushes,
+                "last_flush_ms": round(self.last_flush_seconds * 1000, 2),
+            }
+
+
+# Instância global
+candle_archive = CandleArchive()
+
+
+def read_candles(
+    db: Session,
+    asset_id: int,
+    interval: CandleInterval,
+    limit: int,
+    archive: CandleArchive = None
+) -> CandleColumns:
+    # Últimas `limit` velas do par em colunas: o trecho do arquivo (quando
+    # o intervalo é arquivado) mais as velas do banco ainda não arquivadas
+    archive = archive or candle_archive
+    if not archive.enabled or interval not in archive.intervals:
+        return CandleColumns.from_rows(get_recent_candles(db, asset_id, interval, limit))
+
+    archived = archive.read(asset_id, interval, limit)
+    after = None
+    if len(archived):
+        after = EPOCH + int(archived.columns["open_time"][-1]) * MICROSECOND
+    candles = archived.concat(CandleColumns.from_rows(
+        get_recent_candles(db, asset_id, interval, limit, after=after)
+    ))
+    if len(candles) >= limit or not len(archived):
+        return candles.last(limit)
+
+    # Arquivo mais curto que o pedido (ex.: arquivamento ligado há pouco):
+    # completa com as velas do banco anteriores a ele
+    recent = CandleColumns.from_rows(get_recent_candles(db, asset_id, interval, limit))
+    if not len(recent):
+        return candles
+    older = archived.columns["open_time"] < recent.columns["open_time"][0]
+    return CandleColumns({
+        name: values[older] for name, values in archived.columns.items()
+    }).concat(recent).last(limit)
@@ -0,0 +1,570 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy.orm import Session
+
+from src.configs.settings import settings
+from src.models.investment import CandleInterval
+from src.services.candle_archive import EPOCH, read_candles
+
+
+# Velas extras lidas antes da janela pedida para os indicadores exponenciais
+# (o peso do valor inicial cai para e^-8 depois de 4 períodos)
+EMA_WARMUP_FACTOR = 4
+
+# Limite do expoente em cada bloco de _ewm (e^600 ainda cabe em float64)
+EWM_EXPONENT_LIMIT = 600.0
+
+# Atualizações incrementais entre recálculos exatos das somas das janelas
+# (evita o acúmulo de erro de arredondamento nas somas móveis)
+RESUM_EVERY = 1000
+
+NAN = float("nan")
+
+
+def _ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    # Média exponencial y[t] = y[t-1] + alpha * (x[t] - y[t-1]), começando no
+    # primeiro valor, vetorizada em blocos: dentro de um bloco que parte de
+    # y0, y[k] = w^k * (y0 + alpha * cumsum(x[j] / w^j)), com w = 1 - alpha.
+    # O tamanho do bloco limita w^-k para não estourar o float64
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    w = 1.0 - alpha
+    if not len(values) or w <= 0.0:
+        out[:] = values
+        return out
+
+    block = max(1, int(EWM_EXPONENT_LIMIT / -math.log(w)))
+    previous = values[0]
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        decay = w ** np.arange(1, len(chunk) + 1)
+        out[start:start + len(chunk)] = decay * (previous + alpha * np.cumsum(chunk / decay))
+        previous = out[start + len(chunk) - 1]
+    return out
+
+
+class RollingWindow:
+    # Janela dos últimos `period` valores com soma e soma dos quadrados
+    # mantidas em O(1) por valor
+
+    def __init__(self, period: int):
+        self.period = period
+        self.values: deque = deque(maxlen=period)
+        self.total = 0.0
+        self.squares = 0.0
+        self._updates = 0
+
+    def reset(self, values: Sequence[float]):
+        self.values = deque(values, maxlen=self.period)
+        self.total = math.fsum(self.values)
+        self.squares = math.fsum(value * value for value in self.values)
+        self._updates = 0
+
+    def push(self, value: float) -> bool:
+        # Acrescenta o valor; True quando a janela está completa
+        if len(self.values) == self.period:
+            oldest = self.values[0]
+            self.total -= oldest
+            self.squares -= oldest * oldest
+        self.values.append(value)
+        self.total += value
+        self.squares += value * value
+        self._updates += 1
+        if self._updates >= RESUM_EVERY:
+            self.reset(self.values)
+        return len(self.values) == self.period
+
+
+class Indicator(ABC):
+    # Indicador técnico sobre os fechamentos: compute() calcula a série
+    # inteira com NumPy e deixa o estado no último fechamento; update()
+    # avança uma vela em O(1). Ambos devolvem as saídas na ordem de
+    # `outputs` (NaN enquanto não há velas suficientes)
+    name = ""
+    outputs: Tuple[str, ...] = ()
+    defaults: Tuple = ()
+
+    def __init__(self, *params):
+        self.params = tuple(params) or self.defaults
+        for param in self.params:
+            if not 0 < param <= settings.INDICATOR_MAX_PERIOD:
+                raise ValueError(
+                    f"Parâmetros de {self.name} devem ser positivos e até "
+                    f"{settings.INDICATOR_MAX_PERIOD}"
+                )
+
+    @property
+    def key(self) -> str:
+        # Nome canônico usado no cache e no feed, ex.: "macd:12,26,9"
+        return f"{self.name}:{','.join(f'{param:g}' for param in self.params)}"
+
+    def copy(self) -> "Indicator":
+        # Nova instância com os mesmos parâmetros e o estado zerado (cada
+        # série tem o seu estado incremental)
+        return type(self)(*self.params)
+
+    @property
+    @abstractmethod
+    def warmup(self) -> int:
+        # Velas anteriores necessárias para o primeiro valor confiável
+        ...
+
+    @abstractmethod
+    def compute(self, close: np.ndarray) -> np.ndarray:
+        # Matriz (velas x saídas)
+        ...
+
+    @abstractmethod
+    def update(self, close: float) -> Tuple[float, ...]:
+        # Avança uma vela a partir do estado deixado por compute()
+        ...
+
+
+class SMA(Indicator):
+    name = "sma"
+    outputs = ("sma",)
+    defaults = (20,)
+
+    def __init__(self, *params):
+        super().__init__(*params)
+        (self.period,) = self.params
+        self.window = RollingWindow(self.period)
+
+    @property
+    def warmup(self) -> int:
+        return self.period - 1
+
+    def compute(self, close):
+        out = np.full(len(close), NAN)
+        if len(close) >= self.period:
+            sums = np.cumsum(np.insert(close, 0, 0.0))
+            out[self.period - 1:] = (sums[self.period:] - sums[:-self.period]) / self.period
+        self.window.reset(close[-self.period:].tolist())
+        return out[:, None]
+
+    def update(self, close):
+        if not self.window.push(close):
+            return (NAN,)
+        return (self.window.total / self.period,)
+
+
+class EMA(Indicator):
+    name = "ema"
+    outputs = ("ema",)
+    defaults = (20,)
+
+    def __init__(self, *params):
+        super().__init__(*params)
+        (self.period,) = self.params
+        self.alpha = 2.0 / (self.period + 1)
+        self.value = NAN
+        self.count = 0
+
+    @property
+    def warmup(self) -> int:
+        return EMA_WARMUP_FACTOR * self.period
+
+    def series(self, close: np.ndarray) -> np.ndarray:
+        # Média de todas as velas (sem esperar o período completo); deixa o
+        # estado no último valor
+        out = _ewm(close, self.alpha)
+        self.count = len(close)
+        self.value = float(out[-1]) if len(out) else NAN
+        return out
+
+    def compute(self, close):
+        out = self.series(close)
+        out[:self.period - 1] = NAN
+        return out[:, None]
+
+    def advance(self, close: float) -> float:
+        # Próximo valor da média (sem esperar o período completo)
+        self.count += 1
+        self.value = close if self.count == 1 else self.value + self.alpha * (close - self.value)
+        return self.value
+
+    def update(self, close):
+        value = self.advance(close)
+        return (value if self.count >= self.period else NAN,)
+
+
+class RSI(Indicator):
+    # Índice de força relativa com a suavização de Wilder (alpha = 1/período)
+    name = "rsi"
+    outputs = ("rsi",)
+    defaults = (14,)
+
+    def __init__(self, *params):
+        super().__init__(*params)
+        (self.period,) = self.params
+        self.alpha = 1.0 / self.period
+        self.previous = NAN
+        self.gain = NAN
+        self.loss = NAN
+        self.count = 0
+
+    @property
+    def warmup(self) -> int:
+        return EMA_WARMUP_FACTOR * self.period
+
+    @staticmethod
+    def _rsi(gain, loss):
+        # Sem quedas o RSI é 100; sem variação nenhuma, 50
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100.0 - 100.0 / (1.0 + gain / loss)
+        return np.where(loss == 0.0, np.where(gain == 0.0, 50.0, 100.0), rsi)
+
+    def compute(self, close):
+        out = np.full(len(close), NAN)
+        self.count = len(close)
+        self.previous = float(close[-1]) if len(close) else NAN
+        if len(close) < 2:
+            return out[:, None]
+        changes = np.diff(close)
+        gain = _ewm(np.clip(changes, 0.0, None), self.alpha)
+        loss = _ewm(np.clip(-changes, 0.0, None), self.alpha)
+        self.gain, self.loss = float(gain[-1]), float(loss[-1])
+        out[1:] = self._rsi(gain, loss)
+        out[:self.period] = NAN
+        return out[:, None]
+
+    def update(self, close):
+        self.count += 1
+        if self.count == 1:
+            self.previous = close
+            return (NAN,)
+        change = close - self.previous
+        self.previous = close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if self.count == 2:
+            self.gain, self.loss = gain, loss
+        else:
+            self.gain += self.alpha * (gain - self.gain)
+            self.loss += self.alpha * (loss - self.loss)
+        if self.count <= self.period:
+            return (NAN,)
+        if self.loss == 0.0:
+            return (50.0 if self.gain == 0.0 else 100.0,)
+        return (100.0 - 100.0 / (1.0 + self.gain / self.loss),)
+
+
+class MACD(Indicator):
+    name = "macd"
+    outputs = ("macd", "signal", "histogram")
+    defaults = (12, 26, 9)
+
+    def __init__(self, *params):
+        super().__init__(*params)
+        self.fast, self.slow, self.signal = (EMA(period) for period in self.params)
+        if self.fast.period >= self.slow.period:
+            raise ValueError("No macd, o período rápido deve ser menor que o lento")
+
+    @property
+    def warmup(self) -> int:
+        return EMA_WARMUP_FACTOR * (self.slow.period + self.signal.period)
+
+    def compute(self, close):
+        macd = self.fast.series(close) - self.slow.series(close)
+        signal = self.signal.series(macd)
+        out = np.column_stack((macd, signal, macd - signal))
+        # Linha MACD a partir do período lento; sinal e histograma depois
+        # de mais um período do sinal
+        out[:self.slow.period - 1] = NAN
+        out[:self.slow.period + self.signal.period - 2, 1:] = NAN
+        return out
+
+    def update(self, close):
+        macd = self.fast.advance(close) - self.slow.advance(close)
+        signal = self.signal.advance(macd)
+        if self.slow.count < self.slow.period:
+            return (NAN, NAN, NAN)
+        if self.slow.count < self.slow.period + self.signal.period - 1:
+            return (macd, NAN, NAN)
+        return (macd, signal, macd - signal)
+
+
+class BollingerBands(Indicator):
+    # Média simples +/- `width` desvios padrão (populacionais) da janela
+    name = "bollinger"
+    outputs = ("middle", "upper", "lower")
+    defaults = (20, 2.0)
+
+    def __init__(self, *params):
+        super().__init__(*params)
+        self.period, self.width = int(self.params[0]), float(self.params[1])
+        self.window = RollingWindow(self.period)
+
+    @property
+    def warmup(self) -> int:
+        return self.period - 1
+
+    def compute(self, close):
+        out = np.full((len(close), 3), NAN)
+        if len(close) >= self.period:
+            windows = sliding_window_view(close, self.period)
+            middle = windows.mean(axis=1)
+            band = self.width * windows.std(axis=1)
+            out[self.period - 1:] = np.column_stack((middle, middle + band, middle - band))
+        self.window.reset(close[-self.period:].tolist())
+        return out
+
+    def update(self, close):
+        if not self.window.push(close):
+            return (NAN, NAN, NAN)
+        middle = self.window.total / self.period
+        variance = max(self.window.squares / self.period - middle * middle, 0.0)
+        band = self.width * math.sqrt(variance)
+        return (middle, middle + band, middle - band)
+
+
+INDICATORS = {
+    indicator.name: indicator
+    for indicator in (SMA, EMA, RSI, MACD, BollingerBands)
+}
+
+
+def parse_indicator(spec: str) -> Indicator:
+    # "rsi" (parâmetros padrão), "sma:50", "macd:12,26,9", "bollinger:20,2".
+    # ValueError se o indicador ou os parâmetros forem inválidos
+    name, _, params = spec.strip().lower().partition(":")
+    indicator = INDICATORS.get(name)
+    if indicator is None:
+        raise ValueError(f"Indicador inválido: {name} (use {', '.join(INDICATORS)})")
+    values = [value.strip() for value in params.split(",")] if params else []
+    if len(values) > len(indicator.defaults):
+        raise ValueError(f"Parâmetros demais para {name} (máximo {len(indicator.defaults)})")
+    try:
+        parsed = [type(default)(value) for default, value in zip(indicator.defaults, values)]
+    except ValueError:
+        raise ValueError(f"Parâmetros inválidos em {spec}")
+    return indicator(*parsed, *indicator.defaults[len(parsed):])
+
+
+def _value(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+class IndicatorSeries:
+    # Um indicador de um (ativo, intervalo): estado incremental e os últimos
+    # `history` pontos (open_time da vela, saídas). Os pontos ficam numa
+    # única deque para que uma cópia seja consistente mesmo com o feed
+    # acrescentando pontos em outra thread
+
+    def __init__(self, indicator: Indicator, history: int):
+        self.indicator = indicator
+        self.points: deque = deque(maxlen=history)
+
+    @property
+    def last_open_time(self) -> Optional[datetime]:
+        return self.points[-1][0] if self.points else None
+
+    def load(self, open_times: List[datetime], close: np.ndarray):
+        # Calcula a série inteira (vetorizado); guarda só o fim dela
+        values = self.indicator.compute(close)
+        values = values[len(values) - len(open_times):].tolist()
+        self.points.extend(zip(open_times, map(tuple, values)))
+
+    def update(self, open_time: datetime, close: float) -> Tuple[float, ...]:
+        values = self.indicator.update(close)
+        self.points.append((open_time, values))
+        return values
+
+    def last(self) -> dict:
+        # Último ponto, com as saídas pelo nome
+        values = self.points[-1][1] if self.points else ()
+        return dict(zip(self.indicator.outputs, map(_value, values)))
+
+    def to_dict(self, limit: int) -> dict:
+        # Últimos `limit` pontos em colunas (null onde ainda não há valor)
+        points = list(self.points)[-limit:]
+        return {
+            "indicator": self.indicator.key,
+            "name": self.indicator.name,
+            "params": list(self.indicator.params),
+            "open_time": [open_time.isoformat() for open_time, _ in points],
+            "values": {
+                output: [_value(values[index]) for _, values in points]
+                for index, output in enumerate(self.indicator.outputs)
+            }
+        }
+
+
+Pair = Tuple[int, CandleInterval]
+
+
+class CandleIndicators:
+    # Cache dos indicadores técnicos por (ativo, intervalo, indicador,
+    # parâmetros). A primeira leitura de uma série calcula os últimos
+    # INDICATOR_HISTORY pontos com NumPy sobre as velas (mais as velas de
+    # aquecimento do indicador), numa única leitura por par; depois cada
+    # vela publicada no feed avança as séries do par em O(1), e as leituras
+    # seguintes saem da memória. Uma série sem velas novas há mais de
+    # MARKET_STATE_REFRESH_SECONDS é recalculada. As séries menos usadas
+    # são descartadas acima de INDICATOR_MAX_SERIES
+
+    def __init__(
+        self,
+        history: int = None,
+        max_series: int = None,
+        refresh_seconds: float = None
+    ):
+        self.history = history or settings.INDICATOR_HISTORY
+        self.max_series = max_series or settings.INDICATOR_MAX_SERIES
+        self.refresh_seconds = refresh_seconds or settings.MARKET_STATE_REFRESH_SECONDS
+        self._series: "OrderedDict[Tuple[int, CandleInterval, str], IndicatorSeries]" = OrderedDict()
+        self._by_pair: Dict[Pair, Dict[str, IndicatorSeries]] = {}
+        # Última vela aplicada de cada par (cobre a vela que chega entre a
+        # leitura do banco e a entrada da série no cache)
+        self._last_candle: Dict[Pair, Tuple[datetime, float]] = {}
+        self._refreshed_at: Dict[Pair, float] = {}
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.loads = 0
+        self.hits = 0
+        self.updates = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def _fresh(self, pair: Pair) -> bool:
+        refreshed_at = self._refreshed_at.get(pair)
+        return refreshed_at is not None and time.monotonic() - refreshed_at < self.refresh_seconds
+
+    def get(
+        self,
+        db: Session,
+        asset_id: int,
+        interval: CandleInterval,
+        indicators: Sequence[Indicator]
+    ) -> List[IndicatorSeries]:
+        # Séries dos indicadores no par, calculando as que faltam (ou
+        # vencidas) com uma única leitura das velas
+        pair = (asset_id, interval)
+        with self._lock:
+            cached = dict(self._by_pair.get(pair, {})) if self._fresh(pair) else {}
+            for key in cached:
+                self._series.move_to_end((asset_id, interval, key))
+            missing = [
+                indicator for indicator in indicators
+                if indicator.key not in cached
+            ]
+            self.hits += len(indicators) - len(missing)
+
+        if missing:
+            cached.update(self._load(db, pair, missing))
+        return [cached[indicator.key] for indicator in indicators]
+
+    def _load(
+        self,
+        db: Session,
+        pair: Pair,
+        indicators: Sequence[Indicator]
+    ) -> Dict[str, IndicatorSeries]:
+        asset_id, interval = pair
+        warmup = max(indicator.warmup for indicator in indicators)
+        candles = read_candles(db, asset_id, interval, self.history + warmup)
+        close = candles.columns["close_price"]
+        open_times = [
+            EPOCH + timedelta(microseconds=int(value))
+            for value in candles.columns["open_time"][-self.history:]
+        ]
+
+        loaded = {}
+        for indicator in indicators:
+            series = loaded[indicator.key] = IndicatorSeries(indicator.copy(), self.history)
+            series.load(open_times, close)
+
+        with self._lock:
+            last = self._last_candle.get(pair)
+            pair_series = self._by_pair.setdefault(pair, {})
+            for series in loaded.values():
+                if last is not None and (
+                    series.last_open_time is None or last[0] > series.last_open_time
+                ):
+                    series.update(*last)
+                key = (asset_id, interval, series.indicator.key)
+                self._series[key] = series
+                self._series.move_to_end(key)
+                pair_series[series.indicator.key] = series
+            self._refreshed_at[pair] = time.monotonic()
+            self.loads += 1
+            self._evict()
+        return loaded
+
+    def _evict(self):
+        # Descarta as séries menos usadas acima do limite (com o lock)
+        while len(self._series) > self.max_series:
+            (asset_id, interval, key), _ = self._series.popitem(last=False)
+            pair = (asset_id, interval)
+            pair_series = self._by_pair.get(pair)
+            if pair_series is not None:
+                pair_series.pop(key, None)
+                if not pair_series:
+                    del self._by_pair[pair]
+                    self._refreshed_at.pop(pair, None)
+                    self._last_candle.pop(pair, None)
+            self.evicted += 1
+
+    def apply(self, records: Iterable[dict]) -> List[dict]:
+        # Velas publicadas no feed (com symbol e name): avança as séries do
+        # par de cada vela em O(1). Retorna o novo ponto de cada série
+        # atualizada, pronto para o feed (indicator_batch)
+        updates = []
+        with self._lock:
+            for record in records:
+                pair = (record["asset_id"], record["interval"])
+                pair_series = self._by_pair.get(pair)
+                if not pair_series:
+                    continue
+                open_time = record["open_time"]
+                self._last_candle[pair] = (open_time, record["close_price"])
+                self._refreshed_at[pair] = time.monotonic()
+                for series in pair_series.values():
+                    if series.last_open_time is not None and open_time <= series.last_open_time:
+                        continue
+                    series.update(open_time, record["close_price"])
+                    self.updates += 1
+                    updates.append({
+                        "asset_id": record["asset_id"],
+                        "symbol": record["symbol"],
+                        "name": record["name"],
+                        "interval": record["interval"],
+                        "indicator": series.indicator.key,
+                        "open_time": open_time,
+                        "values": series.last()
+                    })
+        return updates
+
+    def reset(self):
+        # Descarta todas as séries (ex.: eventos do feed perdidos)
+        with self._lock:
+            self._series.clear()
+            self._by_pair = {}
+            self._last_candle = {}
+            self._refreshed_at = {}
+
+    def metrics(self) -> dict:
+        return {
+            "series": len(self._series),
+            "pairs": len(self._by_pair),
+            "max_series": self.max_series,
+            "history": self.history,
+            "loads": self.loads,
+            "hits": self.hits,
+            "updates": self.updates,
+            "evicted": self.evicted,
+        }
+
+
+# Instância global (uma por worker, atualizada pelo feed)
+candle_indicators = CandleIndicators()
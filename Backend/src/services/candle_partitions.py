@@ -0,0 +1,295 @@
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import Column, Index, MetaData, Table, inspect, insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from src.configs.settings import settings
+from src.database.connection import engine as default_engine
+from src.models.investment import Candle, CandleInterval
+
+
+# Formato da data no nome de cada partição, por período
+SUFFIXES = {"day": "%Y%m%d", "month": "%Y%m", "year": "%Y"}
+
+# candles_<intervalo>_<AAAA[MM[DD]]>, ex.: candles_1s_20260301
+PARTITION_NAME = re.compile(r"^candles_(\w+?)_(\d{4}|\d{6}|\d{8})$")
+
+
+def period_start(value: datetime, period: str) -> datetime:
+    # Início do período (dia, mês ou ano) que contém `value`
+    if period == "day":
+        return datetime(value.year, value.month, value.day)
+    if period == "month":
+        return datetime(value.year, value.month, 1)
+    return datetime(value.year, 1, 1)
+
+
+def period_end(start: datetime, period: str) -> datetime:
+    # Início do período seguinte (limite exclusivo da partição)
+    if period == "day":
+        return start + timedelta(days=1)
+    if period == "month":
+        return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return datetime(start.year + 1, 1, 1)
+
+
+def _columns(native: bool = False) -> List[Column]:
+    # Colunas de Candle, sem a chave estrangeira (partições são histórico
+    # descartável). No PostgreSQL a chave primária inclui open_time, que é a
+    # chave de particionamento
+    columns = []
+    for column in Candle.__table__.columns:
+        primary_key = column.primary_key or (native and column.name == "open_time")
+        columns.append(Column(
+            column.name,
+            column.type,
+            primary_key=primary_key,
+            autoincrement=True if native and column.primary_key else "auto",
+            nullable=column.nullable and not primary_key,
+            index=bool(column.index) and not column.primary_key,
+            default=column.default.arg if column.default is not None else None
+        ))
+    return columns
+
+
+@dataclass
+class CandlePartition:
+    interval: CandleInterval
+    start: datetime
+    end: datetime
+    table: Table
+
+
+class CandlePartitions:
+    # Roteador das velas particionadas por intervalo e período
+    # (CANDLE_PARTITION_PERIODS). No SQLite cada partição é uma tabela
+    # candles_<intervalo>_<período> com os índices de Candle; no PostgreSQL
+    # cada intervalo tem uma tabela pai candles_<intervalo> particionada por
+    # faixa de open_time e as partições são criadas com PARTITION OF.
+    # Escritas vão para a partição do open_time (criada se não existe),
+    # leituras percorrem as partições da mais recente para a mais antiga e
+    # a retenção descarta partições inteiras (DROP TABLE) em vez de apagar
+    # velas. Desligado (CANDLE_PARTITIONED=False), tudo usa a tabela candles.
+    # Outros processos percebem partições criadas ou apagadas em até
+    # `refresh_seconds` (prepare() cria a próxima partição com antecedência)
+
+    def __init__(
+        self,
+        enabled: bool = None,
+        periods: Dict[str, str] = None,
+        refresh_seconds: float = None,
+        bind: Engine = None
+    ):
+        self.enabled = settings.CANDLE_PARTITIONED if enabled is None else enabled
+        self.periods = {
+            CandleInterval(interval): period
+            for interval, period in (periods or settings.CANDLE_PARTITION_PERIODS).items()
+        }
+        self.refresh_seconds = refresh_seconds or settings.CANDLE_PARTITION_REFRESH
+        self.bind = bind or default_engine
+        self.native = self.bind.dialect.name == "postgresql"
+
+        self._metadata = MetaData()
+        self._partitions: Dict[CandleInterval, Dict[datetime, CandlePartition]] = {}
+        self._parents: Dict[CandleInterval, Table] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.RLock()
+
+        # Métricas
+        self.created = 0
+        self.dropped = 0
+
+    def period(self, interval: CandleInterval) -> str:
+        return self.periods.get(interval, "day")
+
+    def _name(self, interval: CandleInterval, start: datetime) -> str:
+        return f"candles_{interval.value}_{start.strftime(SUFFIXES[self.period(interval)])}"
+
+    def _define(self, name: str, parent: bool = False) -> Table:
+        if name in self._metadata.tables:
+            return self._metadata.tables[name]
+        kwargs = {"postgresql_partition_by": "RANGE (open_time)"} if parent else {}
+        return Table(
+            name, self._metadata,
+            *_columns(self.native),
+            # Mesmos índices de Candle (herdados pelas partições no PostgreSQL)
+            Index(f"ix_{name}_asset_interval_open_time", "asset_id", "interval", "open_time"),
+            Index(f"ix_{name}_asset_interval_close_time", "asset_id", "interval", "close_time"),
+            **kwargs
+        )
+
+    def _parent(self, interval: CandleInterval, conn) -> Table:
+        # Tabela pai do intervalo (PostgreSQL), criada na primeira partição
+        parent = self._parents.get(interval)
+        if parent is None:
+            parent = self._define(f"candles_{interval.value}", parent=True)
+            parent.create(conn, checkfirst=True)
+            self._parents[interval] = parent
+        return parent
+
+    def _load(self):
+        # Relê as partições existentes quando o cache venceu
+        if (
+            self._loaded_at is not None and
+            time.monotonic() - self._loaded_at < self.refresh_seconds
+        ):
+            return
+        with self._lock:
+            names = set(inspect(self.bind).get_table_names())
+            partitions: Dict[CandleInterval, Dict[datetime, CandlePartition]] = {}
+            for name in names:
+                match = PARTITION_NAME.match(name)
+                if match is None:
+                    continue
+                try:
+                    interval = CandleInterval(match.group(1))
+                    period = self.period(interval)
+                    start = datetime.strptime(match.group(2), SUFFIXES[period])
+                except ValueError:
+                    # Sufixo de outro período (configuração alterada)
+                    continue
+                partitions.setdefault(interval, {})[start] = CandlePartition(
+                    interval, start, period_end(start, period), self._define(name)
+                )
+            if self.native:
+                self._parents = {
+                    interval: self._define(f"candles_{interval.value}", parent=True)
+                    for interval in CandleInterval
+                    if f"candles_{interval.value}" in names
+                }
+            self._partitions = partitions
+            self._loaded_at = time.monotonic()
+
+    def reset(self):
+        # Descarta o cache (ex.: tabelas apagadas por fora)
+        with self._lock:
+            self._loaded_at = None
+
+    def ensure(self, interval: CandleInterval, open_time: datetime) -> CandlePartition:
+        # Partição que recebe velas de `open_time`, criada se não existe.
+        # A criação usa uma conexão própria: chame antes de escrever na sessão
+        self._load()
+        period = self.period(interval)
+        start = period_start(open_time, period)
+        partition = self._partitions.get(interval, {}).get(start)
+        if partition is not None:
+            return partition
+
+        with self._lock:
+            partition = self._partitions.get(interval, {}).get(start)
+            if partition is not None:
+                return partition
+            end = period_end(start, period)
+            name = self._name(interval, start)
+            table = self._define(name)
+            with self.bind.begin() as conn:
+                if self.native:
+                    parent = self._parent(interval, conn)
+                    conn.execute(text(
+                        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{parent.name}" '
+                        f"FOR VALUES FROM ('{start.isoformat(' ')}') TO ('{end.isoformat(' ')}')"
+                    ))
+                else:
+                    table.create(conn, checkfirst=True)
+            partition = CandlePartition(interval, start, end, table)
+            self._partitions.setdefault(interval, {})[start] = partition
+            self.created += 1
+        return partition
+
+    def prepare(self, now: datetime = None):
+        # Cria as partições do período atual e do seguinte de cada intervalo
+        if not self.enabled:
+            return
+        now = now or datetime.utcnow()
+        for interval in CandleInterval:
+            start = period_start(now, self.period(interval))
+            self.ensure(interval, start)
+            self.ensure(interval, period_end(start, self.period(interval)))
+
+    def partitions(self, interval: CandleInterval = None) -> List[CandlePartition]:
+        # Partições existentes (todas ou de um intervalo), da mais antiga
+        # para a mais recente
+        if not self.enabled:
+            return []
+        self._load()
+        intervals = [interval] if interval is not None else list(self._partitions)
+        return sorted(
+            (
+                partition
+                for key in intervals
+                for partition in self._partitions.get(key, {}).values()
+            ),
+            key=lambda partition: (partition.interval.value, partition.start)
+        )
+
+    def tables(
+        self,
+        interval: CandleInterval,
+        start: datetime = None,
+        end: datetime = None
+    ) -> List[Table]:
+        # Tabelas a ler para velas do intervalo com open_time em
+        # [start, end), da mais recente para a mais antiga. No PostgreSQL é
+        # a tabela pai (o planejador descarta as partições fora da faixa)
+        if not self.enabled:
+            return [Candle.__table__]
+        self._load()
+        if self.native:
+            parent = self._parents.get(interval)
+            return [parent] if parent is not None else []
+        return [
+            partition.table
+            for partition in reversed(self.partitions(interval))
+            if (start is None or partition.end > start)
+            and (end is None or partition.start < end)
+        ]
+
+    def insert(self, db: Session, rows: List[dict]):
+        # INSERT em lote, um por partição de destino
+        if not rows:
+            return
+        if not self.enabled:
+            db.execute(insert(Candle), rows)
+            return
+
+        groups: Dict[Table, List[dict]] = {}
+        for row in rows:
+            partition = self.ensure(row['interval'], row['open_time'])
+            table = self._parents[partition.interval] if self.native else partition.table
+            groups.setdefault(table, []).append(row)
+        for table, group in groups.items():
+            db.execute(insert(table), group)
+
+    def drop(self, partition: CandlePartition):
+        # Descarta a partição inteira (DROP TABLE)
+        with self._lock:
+            with self.bind.begin() as conn:
+                partition.table.drop(conn, checkfirst=True)
+            self._partitions.get(partition.interval, {}).pop(partition.start, None)
+            self._metadata.remove(partition.table)
+            self.dropped += 1
+
+    def metrics(self) -> dict:
+        partitions = self.partitions()
+        counts: Dict[str, int] = {}
+        for partition in partitions:
+            counts[partition.interval.value] = counts.get(partition.interval.value, 0) + 1
+        oldest = min((partition.start for partition in partitions), default=None)
+        return {
+            "enabled": self.enabled,
+            "native": self.native,
+            "partitions": counts,
+            "oldest": oldest.isoformat() if oldest else None,
+            "created": self.created,
+            "dropped": self.dropped,
+        }
+
+
+# Instância global
+candle_partitions = CandlePartitions()
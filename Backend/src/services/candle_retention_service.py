@@ -0,0 +1,510 @@
+import asyncio
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Table, delete, func, select
+from sqlalchemy.orm import Session
+
+from src.configs.settings import settings
+from src.database.connection import SessionLocal
+from src.models.investment import Asset, Candle, CandleInterval
+from src.services.candle_partitions import (
+    CandlePartition, CandlePartitions, candle_partitions
+)
+from src.services.candle_service import INTERVAL_SECONDS
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _floor(value: datetime, duration: timedelta) -> datetime:
+    # Início do período de `duration` que contém `value` (alinhado à época)
+    return EPOCH + ((value - EPOCH) // duration) * duration
+
+
+def _windows(config: Dict[str, Optional[float]]) -> Dict[CandleInterval, Optional[timedelta]]:
+    return {
+        CandleInterval(interval): timedelta(seconds=seconds) if seconds else None
+        for interval, seconds in config.items()
+    }
+
+
+class CandleRetentionService:
+    # Retenção das velas por (ativo, intervalo): apaga as velas com
+    # open_time anterior à última vela do par menos a janela do intervalo
+    # (CANDLE_RETENTION, com exceções por símbolo em
+    # CANDLE_RETENTION_OVERRIDES), então cada ativo mantém o próprio
+    # histórico recente. Os DELETEs são faixas de open_time no índice
+    # (asset_id, interval, open_time), em blocos de `chunk` velas com um
+    # commit cada, e cada execução apaga no máximo `max_rows` velas (a
+    # próxima continua do par onde esta parou). Com `rollup`, as velas
+    # vencidas são agregadas no intervalo de CANDLE_ROLLUP_TARGETS antes
+    # de apagadas, só nos períodos que ainda não têm vela desse intervalo.
+    # Com velas particionadas (CANDLE_PARTITIONED), a retenção descarta
+    # partições inteiras: a janela vale para o intervalo (a maior entre a
+    # padrão e as exceções), contada da última vela do intervalo, e a
+    # partição cai quando o período dela termina antes do limite. O rollup
+    # lê a partição ativo a ativo, no máximo `max_rows` velas por execução
+
+    def __init__(
+        self,
+        windows: Dict[str, Optional[float]] = None,
+        overrides: Dict[str, Dict[str, Optional[float]]] = None,
+        rollup_targets: Dict[str, str] = None,
+        chunk: int = None,
+        max_rows: int = None,
+        interval: float = None,
+        rollup: bool = None,
+        session_factory=None,
+        partitions: CandlePartitions = None
+    ):
+        self.windows = _windows(windows or settings.CANDLE_RETENTION)
+        self.overrides = {
+            symbol: _windows(config)
+            for symbol, config in (
+                overrides if overrides is not None else settings.CANDLE_RETENTION_OVERRIDES
+            ).items()
+        }
+        self.rollup_targets = {
+            CandleInterval(source): CandleInterval(target)
+            for source, target in (rollup_targets or settings.CANDLE_ROLLUP_TARGETS).items()
+        }
+        self.chunk = chunk or settings.CANDLE_RETENTION_CHUNK
+        self.max_rows = max_rows or settings.CANDLE_RETENTION_MAX_ROWS
+        self.interval = interval or settings.CANDLE_RETENTION_INTERVAL
+        self.rollup = settings.CANDLE_RETENTION_ROLLUP if rollup is None else rollup
+        self.session_factory = session_factory or SessionLocal
+        self.partitions = partitions or candle_partitions
+
+        self._cursor = 0
+        # Partição em agregação e último ativo agregado nela
+        self._partition_cursor: Tuple[Optional[str], int] = (None, 0)
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.started_at: Optional[datetime] = None
+        self.last_run_at: Optional[datetime] = None
+        self.runs = 0
+        self.deleted = 0
+        self.rolled_up = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_deleted = 0
+        self.last_run_seconds = 0.0
+        self.backlog = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def window(self, symbol: str, interval: CandleInterval) -> Optional[timedelta]:
+        # Janela de retenção do par (None = sem limite)
+        override = self.overrides.get(symbol)
+        if override is not None and interval in override:
+            return override[interval]
+        return self.windows.get(interval)
+
+    def _pairs(self, db: Session) -> List[Tuple[int, str, CandleInterval]]:
+        # Pares (ativo, intervalo) com janela de retenção, em ordem estável
+        assets = db.query(Asset.id, Asset.symbol).order_by(Asset.symbol).all()
+        return [
+            (asset_id, symbol, interval)
+            for asset_id, symbol in assets
+            for interval in INTERVAL_SECONDS
+            if self.window(symbol, interval) is not None
+        ]
+
+    def interval_window(self, interval: CandleInterval) -> Optional[timedelta]:
+        # Janela do intervalo inteiro (velas particionadas): a maior entre a
+        # padrão e as exceções por símbolo, None se alguma é ilimitada
+        windows = [self.windows.get(interval)] + [
+            override[interval] for override in self.overrides.values()
+            if interval in override
+        ]
+        if any(window is None for window in windows):
+            return None
+        return max(windows)
+
+    def _target(self, symbol: Optional[str], interval: CandleInterval) -> Optional[CandleInterval]:
+        # Intervalo em que as velas vencidas do par (ou do intervalo, com
+        # `symbol` None) são agregadas, ou None
+        target = self.rollup_targets.get(interval) if self.rollup else None
+        if target is None:
+            return None
+        # Só agrega se o intervalo maior é mantido por mais tempo
+        if symbol is None:
+            window = self.interval_window(interval)
+            target_window = self.interval_window(target)
+        else:
+            window = self.window(symbol, interval)
+            target_window = self.window(symbol, target)
+        if target_window is not None and target_window <= window:
+            return None
+        return target
+
+    def _limit(
+        self,
+        db: Session,
+        asset_id: int,
+        interval: CandleInterval,
+        window: timedelta,
+        target: Optional[CandleInterval]
+    ) -> Optional[datetime]:
+        # Velas com open_time < limite venceram; None se não há nenhuma.
+        # Mínimo e máximo saem de duas buscas no índice
+        pair = (Candle.asset_id == asset_id) & (Candle.interval == interval)
+        oldest, newest = db.execute(select(
+            select(func.min(Candle.open_time)).where(pair).scalar_subquery(),
+            select(func.max(Candle.open_time)).where(pair).scalar_subquery()
+        )).one()
+        if newest is None:
+            return None
+
+        limit = newest - window
+        if target is not None:
+            # Períodos do intervalo maior nunca ficam divididos
+            limit = _floor(limit, timedelta(seconds=INTERVAL_SECONDS[target]))
+        return limit if oldest < limit else None
+
+    def _chunk_end(
+        self,
+        db: Session,
+        asset_id: int,
+        interval: CandleInterval,
+        limit: datetime,
+        target: Optional[CandleInterval]
+    ) -> datetime:
+        # Fim (exclusivo) da próxima faixa: a (chunk + 1)-ésima vela mais
+        # antiga antes do limite, ou o próprio limite
+        boundary = db.query(Candle.open_time).filter(
+            Candle.asset_id == asset_id,
+            Candle.interval == interval,
+            Candle.open_time < limit
+        ).order_by(Candle.open_time).offset(self.chunk).limit(1).scalar()
+        if boundary is None:
+            return limit
+        if target is None:
+            return boundary
+
+        duration = timedelta(seconds=INTERVAL_SECONDS[target])
+        end = _floor(boundary, duration)
+        oldest = db.query(func.min(Candle.open_time)).filter(
+            Candle.asset_id == asset_id, Candle.interval == interval
+        ).scalar()
+        # Faixa menor que um período: vai até o fim do primeiro período
+        if end <= oldest:
+            end = _floor(oldest, duration) + duration
+        return min(end, limit)
+
+    def _rollup(
+        self,
+        db: Session,
+        asset_id: int,
+        interval: CandleInterval,
+        end: datetime,
+        target: CandleInterval,
+        table: Table = None
+    ) -> Tuple[int, int]:
+        # Agrega as velas da faixa (de `table`, padrão candles) no intervalo
+        # `target`, só nos períodos sem vela desse intervalo.
+        # Retorna (velas lidas, velas criadas)
+        table = table if table is not None else Candle.__table__
+        rows = db.execute(select(
+            table.c.open_time, table.c.open_price, table.c.high_price,
+            table.c.low_price, table.c.close_price, table.c.volume,
+            table.c.trades_count, table.c.quote_volume
+        ).where(
+            table.c.asset_id == asset_id,
+            table.c.interval == interval,
+            table.c.open_time < end
+        ).order_by(table.c.open_time)).all()
+        if not rows:
+            return 0, 0
+
+        duration = timedelta(seconds=INTERVAL_SECONDS[target])
+        buckets: Dict[datetime, list] = {}
+        for row in rows:
+            start = _floor(row.open_time, duration)
+            bucket = buckets.get(start)
+            if bucket is None:
+                buckets[start] = [
+                    row.open_price, row.high_price, row.low_price,
+                    row.close_price, row.volume or 0.0,
+                    row.trades_count or 0, row.quote_volume or 0.0
+                ]
+                continue
+            bucket[1] = max(bucket[1], row.high_price)
+            bucket[2] = min(bucket[2], row.low_price)
+            bucket[3] = row.close_price
+            bucket[4] += row.volume or 0.0
+            bucket[5] += row.trades_count or 0
+            bucket[6] += row.quote_volume or 0.0
+
+        # Velas existentes do intervalo maior (o agregador ao vivo não
+        # alinha os períodos à época: vale qualquer sobreposição)
+        first = min(buckets)
+        existing = sorted(
+            open_time
+            for target_table in self.partitions.tables(target, first - duration, end)
+            for (open_time,) in db.execute(select(target_table.c.open_time).where(
+                target_table.c.asset_id == asset_id,
+                target_table.c.interval == target,
+                target_table.c.open_time > first - duration,
+                target_table.c.open_time < end
+            ).order_by(target_table.c.open_time))
+        )
+
+        created = []
+        for start, bucket in buckets.items():
+            index = bisect.bisect_left(existing, start + duration)
+            if index and existing[index - 1] > start - duration:
+                continue
+            created.append({
+                'asset_id': asset_id,
+                'interval': target,
+                'open_price': bucket[0],
+                'high_price': bucket[1],
+                'low_price': bucket[2],
+                'close_price': bucket[3],
+                'volume': round(bucket[4], 2),
+                'trades_count': bucket[5],
+                'quote_volume': round(bucket[6], 2),
+                'open_time': start,
+                'close_time': start + duration
+            })
+        self.partitions.insert(db, created)
+        return len(rows), len(created)
+
+    def _trim_pair(
+        self,
+        db: Session,
+        asset_id: int,
+        interval: CandleInterval,
+        window: timedelta,
+        target: Optional[CandleInterval],
+        budget: int
+    ) -> Tuple[int, int]:
+        # Apaga as velas vencidas do par em faixas de até `chunk` velas, um
+        # commit por faixa, até acabar ou esgotar `budget`.
+        # Retorna (velas apagadas, velas agregadas)
+        limit = self._limit(db, asset_id, interval, window, target)
+        deleted = rolled_up = 0
+        while limit is not None and deleted < budget:
+            end = self._chunk_end(db, asset_id, interval, limit, target)
+            if target is not None:
+                rolled_up += self._rollup(db, asset_id, interval, end, target)[1]
+            result = db.execute(delete(Candle).where(
+                Candle.asset_id == asset_id,
+                Candle.interval == interval,
+                Candle.open_time < end
+            ))
+            db.commit()
+            deleted += result.rowcount
+            if end >= limit or not result.rowcount:
+                break
+        return deleted, rolled_up
+
+    def _newest(self, db: Session, partitions: List[CandlePartition]) -> Optional[datetime]:
+        # open_time da última vela do intervalo (partições da mais recente
+        # para a mais antiga, pelo índice de open_time)
+        for partition in reversed(partitions):
+            table = partition.table
+            newest = db.execute(select(func.max(table.c.open_time))).scalar()
+            if newest is not None:
+                return newest
+        return None
+
+    def _rollup_partition(
+        self,
+        db: Session,
+        partition: CandlePartition,
+        target: CandleInterval,
+        budget: int
+    ) -> Tuple[bool, int, int]:
+        # Agrega a partição ativo a ativo (cada próximo ativo sai de uma
+        # busca no índice), um commit por ativo, até acabar ou esgotar
+        # `budget` velas lidas. Retorna (concluída, velas lidas, velas criadas)
+        table = partition.table
+        name, after = self._partition_cursor
+        if name != table.name:
+            after = 0
+        read = created = 0
+        while read < budget:
+            asset_id = db.execute(
+                select(func.min(table.c.asset_id)).where(table.c.asset_id > after)
+            ).scalar()
+            if asset_id is None:
+                return True, read, created
+            asset_read, asset_created = self._rollup(
+                db, asset_id, partition.interval, partition.end, target, table
+            )
+            db.commit()
+            read += asset_read
+            created += asset_created
+            after = asset_id
+            self._partition_cursor = (table.name, after)
+        return False, read, created
+
+    def _drop_partitions(self, db: Session, max_rows: int) -> Tuple[int, int, bool]:
+        # Descarta as partições vencidas de todos os intervalos, agregando
+        # antes as que têm intervalo de rollup.
+        # Retorna (partições descartadas, velas agregadas, limite atingido)
+        self.partitions.prepare()
+        dropped = rolled_up = read = 0
+        for interval in INTERVAL_SECONDS:
+            window = self.interval_window(interval)
+            partitions = self.partitions.partitions(interval)
+            if window is None or not partitions:
+                continue
+            newest = self._newest(db, partitions)
+            if newest is None:
+                continue
+
+            limit = newest - window
+            target = self._target(None, interval)
+            for partition in partitions:
+                if partition.end > limit:
+                    break
+                if target is not None:
+                    done, partition_read, partition_rolled = self._rollup_partition(
+                        db, partition, target, max_rows - read
+                    )
+                    read += partition_read
+                    rolled_up += partition_rolled
+                    if not done:
+                        return dropped, rolled_up, True
+                # Sem transação aberta na sessão antes do DROP
+                db.commit()
+                self.partitions.drop(partition)
+                dropped += 1
+        return dropped, rolled_up, False
+
+    def run_once(self, max_rows: int = None) -> int:
+        # Uma execução limitada a `max_rows` velas apagadas (ou agregadas,
+        # com partições), continuando do par ou da partição onde a anterior
+        # parou. Retorna as velas apagadas (com partições, as partições
+        # descartadas)
+        max_rows = max_rows or self.max_rows
+        started = time.perf_counter()
+        deleted = rolled_up = dropped = 0
+        backlog = False
+
+        db = self.session_factory()
+        try:
+            if self.partitions.enabled:
+                dropped, rolled_up, backlog = self._drop_partitions(db, max_rows)
+                pairs = []
+            else:
+                pairs = self._pairs(db)
+            if self._cursor >= len(pairs):
+                self._cursor = 0
+
+            visited = 0
+            while visited < len(pairs) and deleted < max_rows:
+                asset_id, symbol, interval = pairs[self._cursor]
+                pair_deleted, pair_rolled = self._trim_pair(
+                    db, asset_id, interval,
+                    self.window(symbol, interval),
+                    self._target(symbol, interval),
+                    max_rows - deleted
+                )
+                deleted += pair_deleted
+                rolled_up += pair_rolled
+                # Par com velas vencidas restantes: a próxima execução
+                # começa por ele
+                if deleted >= max_rows:
+                    backlog = True
+                    break
+                self._cursor = (self._cursor + 1) % len(pairs)
+                visited += 1
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            db.close()
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.runs += 1
+            self.deleted += deleted
+            self.rolled_up += rolled_up
+            self.dropped += dropped
+            self.last_deleted = deleted
+            self.last_run_seconds = elapsed
+            self.last_run_at = datetime.utcnow()
+            self.backlog = backlog
+        return dropped if self.partitions.enabled else deleted
+
+    async def _loop(self):
+        print(
+            f"🧹 Retenção de velas iniciada (bloco: {self.chunk}, "
+            f"máximo por execução: {self.max_rows}, intervalo: {self.interval}s)"
+        )
+        while self._running:
+            try:
+                removed = await asyncio.to_thread(self.run_once)
+                if removed:
+                    unit = "partições" if self.partitions.enabled else "velas"
+                    print(f"🧹 {removed} {unit} antigas removidas "
+                          f"({self.last_run_seconds * 1000:.0f} ms)")
+            except Exception as e:
+                print(f"⚠️  Erro na retenção de velas: {e}")
+
+            # Ainda há velas vencidas: continua logo (após uma pausa curta
+            # para não disputar o banco com o simulador)
+            await asyncio.sleep(1.0 if self.backlog else self.interval)
+        print("🧹 Retenção de velas parada")
+
+    def start(self):
+        # Inicia o loop no event loop atual
+        if self._running:
+            return
+        self._running = True
+        self.started_at = datetime.utcnow()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._running,
+                "interval": self.interval,
+                "chunk": self.chunk,
+                "max_rows": self.max_rows,
+                "rollup": self.rollup,
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+                "runs": self.runs,
+                "deleted": self.deleted,
+                "rolled_up": self.rolled_up,
+                "partitioned": self.partitions.enabled,
+                # Partições descartadas inteiras (velas particionadas)
+                "dropped_partitions": self.dropped,
+                "errors": self.errors,
+                "last_deleted": self.last_deleted,
+                "last_run_ms": round(self.last_run_seconds * 1000, 2),
+                # A última execução parou no limite: ainda há velas vencidas
+                "backlog": self.backlog,
+            }
+
+
+# Instância global
+candle_retention = CandleRetentionService()
@@ -1,8 +1,38 @@
 import random
+import threading
+import time
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from dataclasses import dataclass
+from sqlalchemy import Table, func, select, update
 from sqlalchemy.orm import Session
+from src.configs.settings import settings
 from src.models.investment import Asset, Candle, CandleInterval, AssetType
+from src.services.candle_partitions import candle_partitions
 import math
+import numpy as np
+
+
+# Duração de cada intervalo em segundos
+INTERVAL_SECONDS = {
+    CandleInterval.ONE_SECOND: 1,
+    CandleInterval.FIVE_SECONDS: 5,
+    CandleInterval.TEN_SECONDS: 10,
+    CandleInterval.THIRTY_SECONDS: 30,
+    CandleInterval.ONE_MINUTE: 60,
+    CandleInterval.FIVE_MINUTES: 300,
+    CandleInterval.FIFTEEN_MINUTES: 900,
+    CandleInterval.ONE_HOUR: 3600,
+    CandleInterval.FOUR_HOURS: 14400,
+    CandleInterval.ONE_DAY: 86400
+}
+
+# Intervalo simulado pelo simulador da API; os maiores são agregados dele
+BASE_INTERVAL = CandleInterval.ONE_SECOND
+
+# Limite de elementos da matriz ativos x ticks gerada de uma vez
+# (intervalos longos são processados em blocos de ativos)
+MAX_TICK_MATRIX_ELEMENTS = 2_000_000
 
 
 class CandleSimulator:
@@ -23,6 +53,9 @@ class CandleSimulator:
             AssetType.STOCK: 50000,
             AssetType.FUND: 10000
         }
+        
+        # Gerador usado pela simulação vetorizada
+        self.rng = np.random.default_rng()
     
     def generate_realistic_price_movement(
         self, 
@@ -85,40 +118,151 @@ class CandleSimulator:
             'quote_volume': round(volume * close_price, 2)
         }
     
+    def generate_price_movements(
+        self,
+        current_prices: Sequence[float],
+        asset_types: Sequence[AssetType],
+        time_elapsed: int = 60
+    ) -> dict:
+        # Versão vetorizada de generate_realistic_price_movement: simula os
+        # ticks de todos os ativos como uma matriz (ativos x ticks) e calcula
+        # OHLC/volume/trades com reduções por linha. Retorna arrays alinhados
+        # com a entrada (mesmas chaves do dict da versão escalar)
+        prices = np.asarray(current_prices, dtype=np.float64)
+        count = len(prices)
+        num_ticks = max(10, int(time_elapsed / 6))
+        
+        time_factor = math.sqrt(time_elapsed / 60)
+        vol = np.array(
+            [self.volatility.get(asset_type, 0.01) for asset_type in asset_types],
+            dtype=np.float64
+        ) * time_factor
+        base_vol = np.array(
+            [self.base_volume.get(asset_type, 10000) for asset_type in asset_types],
+            dtype=np.float64
+        )
+        
+        open_prices = prices
+        close_prices = np.empty(count)
+        high_prices = np.empty(count)
+        low_prices = np.empty(count)
+        
+        # Blocos de ativos para limitar a memória nos intervalos longos
+        chunk = max(1, MAX_TICK_MATRIX_ELEMENTS // num_ticks)
+        for start in range(0, count, chunk):
+            end = min(start + chunk, count)
+            chunk_vol = vol[start:end, None]
+            
+            # Random walk com tendência: preço_t = preço_0 * prod(1 + mov)
+            movements = self.rng.standard_normal((end - start, num_ticks))
+            movements *= chunk_vol
+            movements += self.market_trend * chunk_vol * 0.1
+            movements += 1.0
+            path = np.cumprod(movements, axis=1)
+            path *= prices[start:end, None]
+            # Evita preços negativos
+            np.maximum(path, 0.01, out=path)
+            
+            close_prices[start:end] = path[:, -1]
+            high_prices[start:end] = np.maximum(path.max(axis=1), prices[start:end])
+            low_prices[start:end] = np.minimum(path.min(axis=1), prices[start:end])
+        
+        # Volume varia com volatilidade (mais volatilidade = mais volume)
+        volatility_factor = np.abs(close_prices - open_prices) / open_prices
+        volume = (
+            base_vol *
+            self.rng.uniform(0.5, 1.5, count) *
+            (1 + volatility_factor * 10)
+        )
+        
+        # Número de trades (proporcional ao volume)
+        trades_count = (volume / self.rng.uniform(50, 200, count)).astype(np.int64)
+        
+        return {
+            'open': np.round(open_prices, 2),
+            'high': np.round(high_prices, 2),
+            'low': np.round(low_prices, 2),
+            'close': np.round(close_prices, 2),
+            'volume': np.round(volume, 2),
+            'trades_count': trades_count,
+            'quote_volume': np.round(volume * close_prices, 2)
+        }
+    
+    def generate_candle_rows(
+        self,
+        assets: Sequence[Asset],
+        interval: CandleInterval,
+        open_times: Sequence[datetime],
+        time_elapsed: int = None,
+        prices: Optional[Dict[int, float]] = None
+    ) -> List[dict]:
+        # Gera as velas de um intervalo para todos os ativos de uma vez.
+        # Retorna dicts com as colunas de Candle, prontos para inserção em lote.
+        # `prices` (asset_id -> preço) substitui o current_price dos ativos
+        if not assets:
+            return []
+        if time_elapsed is None:
+            time_elapsed = INTERVAL_SECONDS.get(interval, 60)
+        
+        data = self.generate_price_movements(
+            [
+                prices.get(asset.id, asset.current_price) if prices
+                else asset.current_price
+                for asset in assets
+            ],
+            [asset.asset_type for asset in assets],
+            time_elapsed
+        )
+        duration = timedelta(seconds=time_elapsed)
+        
+        return [
+            {
+                'asset_id': asset.id,
+                'interval': interval,
+                'open_price': open_price,
+                'high_price': high_price,
+                'low_price': low_price,
+                'close_price': close_price,
+                'volume': volume,
+                'trades_count': trades_count,
+                'quote_volume': quote_volume,
+                'open_time': open_time,
+                'close_time': open_time + duration
+            }
+            for (
+                asset, open_time, open_price, high_price, low_price,
+                close_price, volume, trades_count, quote_volume
+            ) in zip(
+                assets, open_times,
+                data['open'].tolist(), data['high'].tolist(),
+                data['low'].tolist(), data['close'].tolist(),
+                data['volume'].tolist(), data['trades_count'].tolist(),
+                data['quote_volume'].tolist()
+            )
+        ]
+    
     def create_candle(
         self,
         db: Session,
         asset: Asset,
         interval: CandleInterval = CandleInterval.ONE_MINUTE,
-        time_elapsed: int = None
+        time_elapsed: int = None,
+        candle_data: dict = None
     ) -> Candle:
+        # `candle_data` permite usar OHLCV já gerado (ex.: pela simulação
+        # vetorizada); sem ele, a vela é simulada aqui
         now = datetime.utcnow()
         
         # Define tempo baseado no intervalo ou usa fornecido
         if time_elapsed is None:
-            interval_seconds = {
-                CandleInterval.ONE_SECOND: 1,
-                CandleInterval.FIVE_SECONDS: 5,
-                CandleInterval.TEN_SECONDS: 10,
-                CandleInterval.THIRTY_SECONDS: 30,
-                CandleInterval.ONE_MINUTE: 60,
-                CandleInterval.FIVE_MINUTES: 300,
-                CandleInterval.FIFTEEN_MINUTES: 900,
-                CandleInterval.ONE_HOUR: 3600,
-                CandleInterval.FOUR_HOURS: 14400,
-                CandleInterval.ONE_DAY: 86400
-            }
-            time_elapsed = interval_seconds.get(interval, 60)
+            time_elapsed = INTERVAL_SECONDS.get(interval, 60)
         
         # Busca última vela para este ativo/intervalo
-        last_candle = db.query(Candle).filter(
-            Candle.asset_id == asset.id,
-            Candle.interval == interval
-        ).order_by(Candle.close_time.desc()).first()
+        last_close_time = get_last_close_time(db, asset.id, interval)
         
         # Define open_time e close_time
-        if last_candle:
-            open_time = last_candle.close_time
+        if last_close_time:
+            open_time = last_close_time
         else:
             # Primeira vela - alinha com o intervalo
             open_time = now.replace(second=0, microsecond=0)
@@ -126,31 +270,39 @@ class CandleSimulator:
         close_time = open_time + timedelta(seconds=time_elapsed)
         
         # Gera dados OHLCV realistas
-        candle_data = self.generate_realistic_price_movement(
-            current_price=asset.current_price,
-            asset_type=asset.asset_type,
-            time_elapsed=time_elapsed
-        )
+        if candle_data is None:
+            candle_data = self.generate_realistic_price_movement(
+                current_price=asset.current_price,
+                asset_type=asset.asset_type,
+                time_elapsed=time_elapsed
+            )
         
         # Cria vela
-        candle = Candle(
-            asset_id=asset.id,
-            interval=interval,
-            open_price=candle_data['open'],
-            high_price=candle_data['high'],
-            low_price=candle_data['low'],
-            close_price=candle_data['close'],
-            volume=candle_data['volume'],
-            trades_count=candle_data['trades_count'],
-            quote_volume=candle_data['quote_volume'],
-            open_time=open_time,
-            close_time=close_time
-        )
+        row = {
+            'asset_id': asset.id,
+            'interval': interval,
+            'open_price': candle_data['open'],
+            'high_price': candle_data['high'],
+            'low_price': candle_data['low'],
+            'close_price': candle_data['close'],
+            'volume': candle_data['volume'],
+            'trades_count': candle_data['trades_count'],
+            'quote_volume': candle_data['quote_volume'],
+            'open_time': open_time,
+            'close_time': close_time
+        }
         
         # Atualiza preço atual do ativo
         asset.current_price = candle_data['close']
         asset.updated_at = now
         
+        if candle_partitions.enabled:
+            # Vela gravada na partição (o objeto retornado não é da sessão)
+            candle_partitions.insert(db, [row])
+            db.commit()
+            return Candle(**row)
+        
+        candle = Candle(**row)
         db.add(candle)
         db.commit()
         db.refresh(candle)
@@ -170,44 +322,429 @@ class CandleSimulator:
 candle_simulator = CandleSimulator()
 
 
-def generate_candles_for_all_stocks(
-    db: Session,
-    interval: CandleInterval = CandleInterval.ONE_MINUTE,
-    time_elapsed: int = 60
-):
-    # Busca apenas ações (STOCK) - Fundos não variam
-    stocks = db.query(Asset).filter(
-        Asset.asset_type == AssetType.STOCK,
-        Asset.is_active == True
-    ).all()
+class TickWriteStats:
+    # Latência de escrita por tick do simulador (INSERT em lote das velas,
+    # UPDATE em lote dos preços e commit)
     
-    candles = []
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self.candles = 0
+        self.last_candles = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.total_ms = 0.0
+        self.last_tick_at: Optional[datetime] = None
+    
+    def record(self, candles: int, seconds: float):
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            self.ticks += 1
+            self.candles += candles
+            self.last_candles = candles
+            self.last_ms = elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.total_ms += elapsed_ms
+            self.last_tick_at = datetime.utcnow()
+    
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "ticks": self.ticks,
+                "candles_written": self.candles,
+                "last_tick_candles": self.last_candles,
+                "last_tick_at": self.last_tick_at.isoformat() if self.last_tick_at else None,
+                "write_ms": {
+                    "last": round(self.last_ms, 2),
+                    "avg": round(self.total_ms / self.ticks, 2) if self.ticks else 0.0,
+                    "max": round(self.max_ms, 2),
+                },
+            }
+
+
+tick_write_stats = TickWriteStats()
+
+
+@dataclass
+class StockState:
+    # Dados de uma ação ativa mantidos em memória pelo simulador
+    id: int
+    symbol: str
+    name: str
+    asset_type: AssetType
+    current_price: float
+
+
+class CandleStateCache:
+    # Estado em memória do simulador: ações ativas e, por (ativo, intervalo),
+    # o fechamento da última vela (close_time, close_price). É carregado uma
+    # vez com uma consulta agrupada e atualizado a cada tick gravado, então
+    # os ticks seguintes não fazem leituras no banco. A lista de ações é
+    # recarregada a cada MARKET_STATE_REFRESH_SECONDS
     
-    for stock in stocks:
-        try:
-            candle = candle_simulator.create_candle(
-                db, stock, interval, time_elapsed
+    def __init__(self, refresh_seconds: float = None):
+        self.refresh_seconds = refresh_seconds or settings.MARKET_STATE_REFRESH_SECONDS
+        self._stocks: Dict[int, StockState] = {}
+        self._last: Dict[Tuple[int, CandleInterval], Tuple[datetime, float]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+    
+    def _last_candles(self, db: Session, table: Table, asset_ids: Optional[List[int]]):
+        # Última vela de cada (ativo, intervalo) da tabela em uma única
+        # consulta: MAX(close_time) agrupado no índice (asset_id, interval,
+        # close_time) e o preço de fechamento por uma subconsulta no mesmo índice
+        last = table.alias()
+        close_price = select(last.c.close_price).where(
+            last.c.asset_id == table.c.asset_id,
+            last.c.interval == table.c.interval
+        ).order_by(last.c.close_time.desc()).limit(1).scalar_subquery()
+        
+        query = select(
+            table.c.asset_id,
+            table.c.interval,
+            func.max(table.c.close_time),
+            close_price
+        )
+        if asset_ids is not None:
+            query = query.where(table.c.asset_id.in_(asset_ids))
+        return db.execute(query.group_by(table.c.asset_id, table.c.interval)).all()
+    
+    def _load_last_candles(self, db: Session, asset_ids: Optional[List[int]] = None):
+        # Com velas particionadas, a consulta roda partição a partição (da
+        # mais recente para a mais antiga) só para os ativos ainda sem vela
+        if not candle_partitions.enabled:
+            rows = self._last_candles(db, Candle.__table__, asset_ids)
+        else:
+            rows = []
+            for interval in CandleInterval:
+                missing = None if asset_ids is None else set(asset_ids)
+                for table in candle_partitions.tables(interval):
+                    found = self._last_candles(
+                        db, table, None if missing is None else list(missing)
+                    )
+                    rows.extend(found)
+                    if missing is not None:
+                        missing.difference_update(row[0] for row in found)
+                        if not missing:
+                            break
+        
+        for asset_id, interval, close_time, close_price in rows:
+            self._last[(asset_id, interval)] = (close_time, close_price)
+    
+    def warm(self, db: Session):
+        # Carrega ações ativas e o fechamento da última vela de cada uma.
+        # Em recargas, só busca velas de ações que ainda não estavam no estado
+        stocks = {
+            row.id: StockState(
+                row.id, row.symbol, row.name, row.asset_type, row.current_price
+            )
+            for row in db.query(
+                Asset.id, Asset.symbol, Asset.name, Asset.asset_type,
+                Asset.current_price
+            ).filter(
+                Asset.asset_type == AssetType.STOCK,
+                Asset.is_active == True
             )
-            candles.append(candle)
-        except Exception as e:
-            print(f"⚠️  Erro ao criar vela para {stock.symbol}: {e}")
+        }
+        
+        with self._lock:
+            new_ids = None
+            if self.loaded:
+                new_ids = [asset_id for asset_id in stocks if asset_id not in self._stocks]
+            elif candle_partitions.enabled:
+                # Partições antigas só são lidas para ações ainda sem vela
+                new_ids = list(stocks)
+            if new_ids is None or new_ids:
+                self._load_last_candles(db, new_ids)
+            self._stocks = stocks
+            self._loaded_at = time.monotonic()
+    
+    def stocks(self, db: Session) -> List[StockState]:
+        # Ações ativas (carrega/recarrega o estado quando necessário)
+        if (
+            not self.loaded or
+            time.monotonic() - self._loaded_at >= self.refresh_seconds
+        ):
+            self.warm(db)
+        return list(self._stocks.values())
+    
+    def stock(self, asset_id: int) -> Optional[StockState]:
+        return self._stocks.get(asset_id)
+    
+    def next_open_times(
+        self,
+        stocks: Sequence[StockState],
+        interval: CandleInterval,
+        now: datetime
+    ) -> List[datetime]:
+        # Abertura da próxima vela de cada ativo: fechamento da última vela do
+        # ativo/intervalo ou, sem histórico, o minuto atual
+        first_open = now.replace(second=0, microsecond=0)
+        last = self._last
+        return [
+            last[(stock.id, interval)][0] if (stock.id, interval) in last
+            else first_open
+            for stock in stocks
+        ]
+    
+    def apply(self, rows: List[dict]):
+        # Registra as velas gravadas no tick (chamado após o commit)
+        with self._lock:
+            for row in rows:
+                self._last[(row['asset_id'], row['interval'])] = (
+                    row['close_time'], row['close_price']
+                )
+                stock = self._stocks.get(row['asset_id'])
+                if stock is not None:
+                    stock.current_price = row['close_price']
+    
+    def invalidate(self):
+        # Força recarga completa no próximo tick (ex.: velas apagadas)
+        with self._lock:
+            self._stocks = {}
+            self._last = {}
+            self._loaded_at = None
+
+
+# Estado usado pelo simulador em segundo plano da API
+candle_state = CandleStateCache()
+
+
+class CandleRollup:
+    # Deriva as velas dos intervalos maiores a partir das velas base (1s):
+    # abertura = primeira, máxima = maior, mínima = menor, fechamento =
+    # última, volume/trades = soma. Guarda só a vela parcial de cada
+    # (ativo, intervalo), então o custo por vela base é O(1) por intervalo.
+    # A vela fecha quando as velas base cobrem a duração do intervalo.
+    # Parciais não são persistidas: após reiniciar, cada intervalo começa
+    # uma vela nova na próxima vela base
+    
+    def __init__(self, intervals: Sequence[CandleInterval] = None):
+        if intervals is None:
+            intervals = [
+                interval for interval in INTERVAL_SECONDS
+                if INTERVAL_SECONDS[interval] > INTERVAL_SECONDS[BASE_INTERVAL]
+            ]
+        self._durations = [
+            (interval, timedelta(seconds=INTERVAL_SECONDS[interval]))
+            for interval in intervals
+        ]
+        # (ativo, intervalo) -> [open_time, open, high, low, close,
+        #                        volume, trades_count, quote_volume]
+        self._partial: Dict[Tuple[int, CandleInterval], list] = {}
+        self._lock = threading.Lock()
+    
+    def add(self, base_rows: List[dict]) -> List[dict]:
+        # Agrega as velas base de um tick e retorna as velas maiores que
+        # fecharam com elas (dicts com as colunas de Candle)
+        completed = []
+        partials = self._partial
+        
+        with self._lock:
+            for row in base_rows:
+                asset_id = row['asset_id']
+                close_time = row['close_time']
+                
+                for interval, duration in self._durations:
+                    key = (asset_id, interval)
+                    partial = partials.get(key)
+                    
+                    if partial is None:
+                        partial = [
+                            row['open_time'], row['open_price'],
+                            row['high_price'], row['low_price'],
+                            row['close_price'], row['volume'],
+                            row['trades_count'], row['quote_volume']
+                        ]
+                        partials[key] = partial
+                    else:
+                        if row['high_price'] > partial[2]:
+                            partial[2] = row['high_price']
+                        if row['low_price'] < partial[3]:
+                            partial[3] = row['low_price']
+                        partial[4] = row['close_price']
+                        partial[5] += row['volume']
+                        partial[6] += row['trades_count']
+                        partial[7] += row['quote_volume']
+                    
+                    if close_time - partial[0] < duration:
+                        continue
+                    
+                    del partials[key]
+                    completed.append({
+                        'asset_id': asset_id,
+                        'interval': interval,
+                        'open_price': partial[1],
+                        'high_price': partial[2],
+                        'low_price': partial[3],
+                        'close_price': partial[4],
+                        'volume': round(partial[5], 2),
+                        'trades_count': partial[6],
+                        'quote_volume': round(partial[7], 2),
+                        'open_time': partial[0],
+                        'close_time': close_time
+                    })
+        
+        return completed
+    
+    def reset(self):
+        # Descarta as velas parciais (ex.: velas apagadas do banco)
+        with self._lock:
+            self._partial = {}
+
+
+# Agregação usada pelo simulador em segundo plano da API
+candle_rollup = CandleRollup()
+
+
+def persist_candles(
+    db: Session,
+    rows: List[dict],
+    prices: Dict[int, float],
+    now: Optional[datetime] = None
+) -> float:
+    # Grava as velas de um tick com um INSERT em lote (executemany) por
+    # tabela de destino, atualiza o preço dos ativos com um UPDATE em lote
+    # por chave primária e faz um único commit. Retorna o tempo de escrita
+    # em segundos
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+    
+    candle_partitions.insert(db, rows)
+    if prices:
+        db.execute(update(Asset), [
+            {"id": asset_id, "current_price": price, "updated_at": now}
+            for asset_id, price in prices.items()
+        ])
+    db.commit()
+    
+    elapsed = time.perf_counter() - started
+    tick_write_stats.record(len(rows), elapsed)
+    return elapsed
+
+
+def simulate_market_tick(
+    db: Session,
+    intervals: Sequence[Tuple[CandleInterval, int]],
+    state: Optional[CandleStateCache] = None
+) -> List[dict]:
+    # Gera as velas de todos os intervalos vencidos neste tick para todas as
+    # ações e grava tudo de uma vez (um commit por tick). Cada intervalo parte
+    # do preço deixado pelo anterior. Com um `state` já carregado, o tick não
+    # faz nenhuma leitura no banco. Retorna as velas geradas (dicts)
+    state = state or CandleStateCache()
+    stocks = state.stocks(db)
+    if not stocks or not intervals:
+        return []
+    
+    now = datetime.utcnow()
+    prices = {stock.id: stock.current_price for stock in stocks}
+    rows = []
+    
+    for interval, time_elapsed in intervals:
+        interval_rows = candle_simulator.generate_candle_rows(
+            stocks, interval,
+            state.next_open_times(stocks, interval, now),
+            time_elapsed, prices
+        )
+        for row in interval_rows:
+            prices[row['asset_id']] = row['close_price']
+        rows.extend(interval_rows)
+        
+        # Atualiza tendência de mercado
+        candle_simulator.update_market_trend()
+    
+    persist_candles(db, rows, prices, now)
+    state.apply(rows)
+    
+    return rows
+
+
+def simulate_base_tick(
+    db: Session,
+    state: CandleStateCache,
+    rollup: CandleRollup
+) -> List[dict]:
+    # Simula apenas a vela base (1s) de todas as ações e deriva dela as
+    # velas dos intervalos maiores que fecham neste tick, gravando tudo com
+    # um único commit. Assim as velas maiores são consistentes com as velas
+    # base que contêm. Retorna as velas gravadas (base e agregadas)
+    stocks = state.stocks(db)
+    if not stocks:
+        return []
+    
+    now = datetime.utcnow()
+    rows = candle_simulator.generate_candle_rows(
+        stocks, BASE_INTERVAL,
+        state.next_open_times(stocks, BASE_INTERVAL, now),
+        INTERVAL_SECONDS[BASE_INTERVAL]
+    )
+    prices = {row['asset_id']: row['close_price'] for row in rows}
+    rows.extend(rollup.add(rows))
     
     # Atualiza tendência de mercado
     candle_simulator.update_market_trend()
     
-    return candles
+    persist_candles(db, rows, prices, now)
+    state.apply(rows)
+    
+    return rows
+
+
+def generate_candles_for_all_stocks(
+    db: Session,
+    interval: CandleInterval = CandleInterval.ONE_MINUTE,
+    time_elapsed: int = 60
+) -> List[dict]:
+    # Gera e grava uma vela do intervalo para cada ação ativa
+    return simulate_market_tick(db, [(interval, time_elapsed)])
+
+
+def get_last_close_time(
+    db: Session,
+    asset_id: int,
+    interval: CandleInterval
+) -> Optional[datetime]:
+    # Fechamento da última vela do ativo/intervalo (None sem histórico)
+    for table in candle_partitions.tables(interval):
+        close_time = db.execute(
+            select(table.c.close_time).where(
+                table.c.asset_id == asset_id,
+                table.c.interval == interval
+            ).order_by(table.c.close_time.desc()).limit(1)
+        ).scalar()
+        if close_time is not None:
+            return close_time
+    return None
 
 
 def get_recent_candles(
     db: Session,
     asset_id: int,
     interval: CandleInterval = CandleInterval.ONE_MINUTE,
-    limit: int = 100
+    limit: int = 100,
+    after: Optional[datetime] = None
 ):
-    candles = db.query(Candle).filter(
-        Candle.asset_id == asset_id,
-        Candle.interval == interval
-    ).order_by(Candle.open_time.desc()).limit(limit).all()
+    # Linhas com as colunas de Candle (só open_time > `after`, se dado);
+    # com velas particionadas, lê as partições da mais recente para a mais
+    # antiga até completar `limit`
+    candles = []
+    for table in candle_partitions.tables(interval, start=after):
+        query = select(table).where(
+            table.c.asset_id == asset_id,
+            table.c.interval == interval
+        )
+        if after is not None:
+            query = query.where(table.c.open_time > after)
+        candles.extend(db.execute(
+            query.order_by(table.c.open_time.desc()).limit(limit - len(candles))
+        ).all())
+        if len(candles) >= limit:
+            break
     
     return list(reversed(candles))  # Retorna em ordem cronológica
 
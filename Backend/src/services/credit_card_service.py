@@ -8,6 +8,7 @@ from src.models.user import User
 from src.models.transaction import Transaction, TransactionType, TransactionStatus
 from src.utils.generators import generate_card_number, calculate_credit_score
 from src.configs.settings import settings
+from src.services import balance_service, ledger_service
 import random
 
 
@@ -243,7 +244,9 @@ def make_purchase(
     card.available_limit -= amount
     card.updated_at = datetime.utcnow()
     
+    # Sem efeito no saldo da conta: vira um lançamento MEMO no razão
     db.add(transaction)
+    ledger_service.record_transaction(db, transaction)
     db.commit()
     db.refresh(transaction)
     db.refresh(card)
@@ -270,12 +273,6 @@ def pay_bill(
     if not account:
         raise ValueError("Conta vinculada não encontrada")
     
-    # Verifica saldo na conta
-    if account.balance < amount:
-        raise ValueError(
-            f"Saldo insuficiente na conta. Disponível: R$ {account.balance}"
-        )
-    
     # Valor não pode ser maior que a fatura
     if amount > card.current_bill_amount:
         raise ValueError(
@@ -292,9 +289,14 @@ def pay_bill(
         status=TransactionStatus.COMPLETED
     )
     
-    # Atualiza conta
-    account.balance -= amount
-    account.updated_at = datetime.utcnow()
+    # Atualiza conta (UPDATE condicional ao saldo disponível)
+    try:
+        balance_service.debit(db, account.id, amount)
+    except balance_service.InsufficientBalanceError:
+        raise ValueError(
+            f"Saldo insuficiente na conta. "
+            f"Disponível: R$ {balance_service.get_balance(db, account.id)}"
+        )
     
     # Atualiza cartão
     card.current_bill_amount -= amount
@@ -302,6 +304,7 @@ def pay_bill(
     card.updated_at = datetime.utcnow()
     
     db.add(transaction)
+    ledger_service.record_transaction(db, transaction)
     db.commit()
     db.refresh(transaction)
     db.refresh(card)
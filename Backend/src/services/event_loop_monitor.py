@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from src.configs.settings import settings
+from src.utils.metrics import percentile_ms
+
+
+class EventLoopLagMonitor:
+    # Mede o atraso do event loop: uma tarefa dorme `interval` segundos e
+    # registra quanto acordou depois do previsto. Qualquer trabalho síncrono
+    # no loop (consultas, commits, CPU) aparece como atraso aqui, e o mesmo
+    # atraso é sentido por todas as requisições HTTP e envios de WebSocket
+
+    def __init__(self, interval: float = None, window: int = None):
+        self.interval = interval or settings.EVENT_LOOP_LAG_INTERVAL
+        self.window = window or settings.EVENT_LOOP_LAG_WINDOW
+
+        self._samples: deque = deque(maxlen=self.window)
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+        self.started_at: Optional[float] = None
+        self.samples = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._lag_total = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def record(self, lag: float):
+        lag = max(lag, 0.0)
+        with self._lock:
+            self._samples.append(lag)
+            self.samples += 1
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._lag_total += lag
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(loop.time() - expected)
+
+    def start(self):
+        # Inicia a medição no event loop atual (chamado no lifespan)
+        if self.running:
+            return
+        self.started_at = time.monotonic()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self.samples = 0
+            self.last_lag = 0.0
+            self.max_lag = 0.0
+            self._lag_total = 0.0
+
+    def metrics(self) -> dict:
+        # Atraso em ms: percentis sobre as últimas `window` medições,
+        # média e máximo desde o início
+        with self._lock:
+            recent = sorted(self._samples)
+
+            return {
+                "running": self.running,
+                "interval_ms": round(self.interval * 1000, 1),
+                "samples": self.samples,
+                "lag_ms": {
+                    "last": round(self.last_lag * 1000, 2),
+                    "avg": round(self._lag_total / self.samples * 1000, 2) if self.samples else 0.0,
+                    "p50": percentile_ms(recent, 0.50),
+                    "p99": percentile_ms(recent, 0.99),
+                    "max": round(self.max_lag * 1000, 2),
+                },
+            }
+
+
+# Instância global (event loop da API)
+loop_monitor = EventLoopLagMonitor()
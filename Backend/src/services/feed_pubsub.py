@@ -0,0 +1,417 @@
+import asyncio
+import json
+import os
+import struct
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from enum import Enum
+from typing import Awaitable, Callable, Optional, Set
+
+from src.configs.settings import settings
+from src.models.investment import CandleInterval
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:  # dependência opcional (backend redis)
+    aioredis = None
+    RedisError = OSError
+
+
+Handler = Callable[[dict], Awaitable[None]]
+Callback = Callable[[], Awaitable[None]]
+
+# Frames do backend local: tamanho (4 bytes, big-endian) + evento em JSON
+FRAME_HEADER = struct.Struct(">I")
+
+DATETIME_FIELDS = ("open_time", "close_time")
+
+# Renova o lease do produtor só se ele ainda for deste worker
+RENEW_LEASE = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LEASE = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Tipo não serializável no feed: {type(value).__name__}")
+
+
+def encode_event(event: dict) -> bytes:
+    # Evento do feed em JSON (datas em ISO 8601, enums pelo valor)
+    return json.dumps(event, default=_default, separators=(",", ":")).encode()
+
+
+def decode_event(data: bytes) -> dict:
+    # Inverso de encode_event para os eventos de velas e preços
+    event = json.loads(data)
+    event["timestamp"] = datetime.fromisoformat(event["timestamp"])
+    for record in event.get("records", ()):
+        record["interval"] = CandleInterval(record["interval"])
+        for field in DATETIME_FIELDS:
+            record[field] = datetime.fromisoformat(record[field])
+    return event
+
+
+class FeedPubSub(ABC):
+    # Pub/sub do feed de mercado entre workers do uvicorn. Um único worker
+    # é o produtor (roda o simulador e publica os eventos); todos, inclusive
+    # o produtor, recebem cada evento e fazem o broadcast para as próprias
+    # conexões WebSocket, então todos os clientes veem os mesmos preços.
+    # Callbacks de start():
+    # - handler(evento): evento publicado pelo produtor (em todos os workers)
+    # - on_promote(): este worker virou o produtor
+    # - on_demote(): este worker deixou de ser o produtor
+    # - on_follow(): (re)conectou como seguidor; eventos podem ter sido perdidos
+    name = ""
+
+    def __init__(self):
+        self.producer = False
+        self._handler: Optional[Handler] = None
+        self._on_promote: Optional[Callback] = None
+        self._on_demote: Optional[Callback] = None
+        self._on_follow: Optional[Callback] = None
+
+        # Métricas
+        self.published = 0
+        self.received = 0
+        self.promotions = 0
+        self.errors = 0
+
+    async def start(
+        self,
+        handler: Handler,
+        on_promote: Callback = None,
+        on_demote: Callback = None,
+        on_follow: Callback = None
+    ):
+        self._handler = handler
+        self._on_promote = on_promote
+        self._on_demote = on_demote
+        self._on_follow = on_follow
+        await self._start()
+
+    @abstractmethod
+    async def _start(self):
+        # Conecta ao transporte e disputa o papel de produtor
+        ...
+
+    @abstractmethod
+    async def publish(self, event: dict):
+        # Publica um evento (só tem efeito no produtor)
+        ...
+
+    async def stop(self):
+        self.producer = False
+
+    async def _promote(self):
+        self.producer = True
+        self.promotions += 1
+        print(f"📡 Worker {os.getpid()} é o produtor do feed ({self.name})")
+        if self._on_promote:
+            await self._on_promote()
+
+    async def _demote(self):
+        self.producer = False
+        print(f"📡 Worker {os.getpid()} deixou de ser o produtor do feed")
+        if self._on_demote:
+            await self._on_demote()
+
+    async def _follow(self):
+        if self._on_follow:
+            await self._on_follow()
+
+    async def _deliver(self, event: dict):
+        self.received += 1
+        try:
+            await self._handler(event)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️  Erro ao processar evento do feed: {e}")
+
+    def metrics(self) -> dict:
+        return {
+            "backend": self.name,
+            "pid": os.getpid(),
+            "producer": self.producer,
+            "promotions": self.promotions,
+            "published": self.published,
+            "received": self.received,
+            "errors": self.errors,
+        }
+
+
+class InProcessPubSub(FeedPubSub):
+    # Um único worker: ele é o produtor e os eventos não saem do processo
+    name = "inprocess"
+
+    async def _start(self):
+        await self._promote()
+
+    async def publish(self, event: dict):
+        self.published += 1
+        await self._deliver(event)
+
+
+class LocalPubSub(FeedPubSub):
+    # Vários workers na mesma máquina, sem serviço externo. O primeiro que
+    # consegue abrir a porta local vira o produtor e repassa cada evento,
+    # serializado uma vez, aos demais, que se conectam como seguidores. Se
+    # o produtor cair, os seguidores disputam a porta de novo. Um seguidor
+    # lento (buffer acima de FEED_FOLLOWER_BUFFER) é desconectado e, ao
+    # reconectar, recarrega os preços do banco (on_follow)
+
+    name = "local"
+
+    def __init__(
+        self,
+        host: str = None,
+        port: int = None,
+        retry_seconds: float = None,
+        max_buffer: int = None
+    ):
+        super().__init__()
+        self.host = host or settings.FEED_LOCAL_HOST
+        self.port = port or settings.FEED_LOCAL_PORT
+        self.retry_seconds = retry_seconds or settings.FEED_RETRY_SECONDS
+        self.max_buffer = max_buffer or settings.FEED_FOLLOWER_BUFFER
+
+        self._task: Optional[asyncio.Task] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._followers: Set[asyncio.StreamWriter] = set()
+        self.connected = False
+        self.bytes_published = 0
+        self.slow_followers = 0
+
+    async def _start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                self._server = await asyncio.start_server(
+                    self._accept, self.host, self.port
+                )
+            except OSError:
+                # Porta ocupada: outro worker é o produtor
+                await self._subscribe()
+                await asyncio.sleep(self.retry_seconds)
+                continue
+
+            await self._promote()
+            await self._server.serve_forever()
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Seguidor conectado: recebe os eventos até fechar a conexão
+        self._followers.add(writer)
+        try:
+            await reader.read()
+        except ConnectionError:
+            pass
+        finally:
+            self._followers.discard(writer)
+            writer.close()
+
+    async def _subscribe(self):
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError:
+            return
+
+        self.connected = True
+        try:
+            await self._follow()
+            while True:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                (size,) = FRAME_HEADER.unpack(header)
+                await self._deliver(decode_event(await reader.readexactly(size)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connected = False
+            writer.close()
+
+    async def publish(self, event: dict):
+        if not self.producer:
+            return
+        data = encode_event(event)
+        frame = FRAME_HEADER.pack(len(data)) + data
+        for writer in list(self._followers):
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                self.slow_followers += 1
+                self._followers.discard(writer)
+                writer.close()
+                continue
+            writer.write(frame)
+            self.bytes_published += len(frame)
+        self.published += 1
+        await self._deliver(event)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._server:
+            self._server.close()
+            self._server = None
+        for writer in list(self._followers):
+            writer.close()
+        self._followers.clear()
+        await super().stop()
+
+    def metrics(self) -> dict:
+        metrics = super().metrics()
+        metrics.update({
+            "address": f"{self.host}:{self.port}",
+            "followers": len(self._followers),
+            "connected": self.connected,
+            "bytes_published": self.bytes_published,
+            # Seguidores desconectados por não acompanhar o feed
+            "slow_followers": self.slow_followers,
+        })
+        return metrics
+
+
+class RedisPubSub(FeedPubSub):
+    # Workers em uma ou mais máquinas, via Redis (ou compatível). O produtor
+    # é quem detém o lease FEED_REDIS_LEASE_KEY (SET NX com expiração,
+    # renovado a cada FEED_PRODUCER_TTL / 3). Os eventos vão pelo canal
+    # FEED_REDIS_CHANNEL, que o próprio produtor também assina
+
+    name = "redis"
+
+    def __init__(
+        self,
+        url: str = None,
+        channel: str = None,
+        lease_key: str = None,
+        ttl: float = None,
+        retry_seconds: float = None
+    ):
+        super().__init__()
+        self.url = url or settings.FEED_REDIS_URL
+        self.channel = channel or settings.FEED_REDIS_CHANNEL
+        self.lease_key = lease_key or settings.FEED_REDIS_LEASE_KEY
+        self.ttl = ttl or settings.FEED_PRODUCER_TTL
+        self.retry_seconds = retry_seconds or settings.FEED_RETRY_SECONDS
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+        self._elector: Optional[asyncio.Task] = None
+
+    async def _start(self):
+        self._redis = aioredis.from_url(self.url)
+        self._listener = asyncio.create_task(self._listen())
+        self._elector = asyncio.create_task(self._elect())
+
+    async def _listen(self):
+        first = True
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                if not first and not self.producer:
+                    await self._follow()
+                first = False
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        await self._deliver(decode_event(message["data"]))
+            except RedisError as e:
+                print(f"⚠️  Conexão com o Redis do feed perdida: {e}")
+                await asyncio.sleep(self.retry_seconds)
+            finally:
+                await pubsub.close()
+
+    async def _elect(self):
+        ttl_ms = int(self.ttl * 1000)
+        while True:
+            try:
+                if self.producer:
+                    renewed = await self._redis.eval(
+                        RENEW_LEASE, 1, self.lease_key, self.worker_id, ttl_ms
+                    )
+                    if not renewed:
+                        await self._demote()
+                elif await self._redis.set(
+                    self.lease_key, self.worker_id, nx=True, px=ttl_ms
+                ):
+                    await self._promote()
+            except RedisError as e:
+                print(f"⚠️  Erro no lease do produtor do feed: {e}")
+                # Sem renovar, o lease pode expirar e outro worker assumir
+                if self.producer:
+                    await self._demote()
+            await asyncio.sleep(self.ttl / 3)
+
+    async def publish(self, event: dict):
+        if not self.producer:
+            return
+        await self._redis.publish(self.channel, encode_event(event))
+        self.published += 1
+
+    async def stop(self):
+        for task in (self._elector, self._listener):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._elector = self._listener = None
+        if self._redis is not None:
+            if self.producer:
+                try:
+                    await self._redis.eval(RELEASE_LEASE, 1, self.lease_key, self.worker_id)
+                except RedisError:
+                    pass
+            await self._redis.close()
+            self._redis = None
+        await super().stop()
+
+    def metrics(self) -> dict:
+        metrics = super().metrics()
+        metrics.update({
+            "channel": self.channel,
+            "worker_id": self.worker_id,
+        })
+        return metrics
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (InProcessPubSub, LocalPubSub, RedisPubSub)
+}
+
+
+def get_pubsub(name: str = None) -> FeedPubSub:
+    # Backend pelo nome (padrão: FEED_PUBSUB_BACKEND); ValueError se
+    # desconhecido ou indisponível
+    name = name or settings.FEED_PUBSUB_BACKEND
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"FEED_PUBSUB_BACKEND inválido: use {', '.join(BACKENDS)}")
+    if backend is RedisPubSub and aioredis is None:
+        raise ValueError("Backend redis indisponível (pacote redis não instalado)")
+    return backend()
+
+
+# Instância global (uma por worker)
+feed_pubsub = get_pubsub()
@@ -0,0 +1,301 @@
+import asyncio
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from src.configs.settings import settings
+from src.database.connection import SessionLocal
+from src.models.idempotency import IdempotencyKey
+
+
+IN_FLIGHT = "IN_FLIGHT"
+COMPLETED = "COMPLETED"
+
+
+class IdempotencyStore(ABC):
+    # Interface dos armazenamentos de respostas idempotentes.
+    # Registros são dicts: key, fingerprint, state, status, headers, body
+
+    @abstractmethod
+    async def reserve(self, key: str, fingerprint: str) -> Optional[dict]:
+        # Reserva a chave para esta requisição. Retorna None se a reserva
+        # foi feita, ou o registro existente (em andamento ou concluído)
+        ...
+
+    @abstractmethod
+    async def complete(
+        self,
+        key: str,
+        status: int,
+        headers: List[List[str]],
+        body: bytes
+    ) -> None:
+        # Guarda a resposta da requisição reservada
+        ...
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        # Libera a reserva sem guardar resposta (ex.: erro 5xx)
+        ...
+
+    async def wait(self, key: str, timeout: float) -> bool:
+        # Espera a requisição em andamento terminar (polling por padrão).
+        # Retorna False se o tempo acabou
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            record = await self.get(key)
+            if record is None or record["state"] != IN_FLIGHT:
+                return True
+            await asyncio.sleep(0.05)
+        return False
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[dict]:
+        # Registro atual da chave (None se não existe ou expirou)
+        ...
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    # LRU em memória com expiração por TTL (um por processo). Duplicatas
+    # concorrentes esperam num asyncio.Event da reserva em andamento
+
+    def __init__(self, ttl_seconds: int = None, max_entries: int = None):
+        self.ttl = ttl_seconds or settings.IDEMPOTENCY_TTL_SECONDS
+        self.max_entries = max_entries or settings.IDEMPOTENCY_MAX_ENTRIES
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._events: Dict[str, asyncio.Event] = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str) -> Optional[dict]:
+        record = self._entries.get(key)
+        if record is None:
+            return None
+
+        now = time.monotonic()
+        expired = record["expires_at"] <= now
+        abandoned = (
+            record["state"] == IN_FLIGHT and
+            now - record["reserved_at"] > settings.IDEMPOTENCY_LOCK_TIMEOUT
+        )
+        if expired or abandoned:
+            del self._entries[key]
+            event = self._events.pop(key, None)
+            if event:
+                event.set()
+            return None
+
+        self._entries.move_to_end(key)
+        return record
+
+    def _evict(self) -> None:
+        # Remove as entradas concluídas menos usadas até caber no limite
+        if len(self._entries) <= self.max_entries:
+            return
+        for key in list(self._entries):
+            if len(self._entries) <= self.max_entries:
+                break
+            if self._entries[key]["state"] == COMPLETED:
+                del self._entries[key]
+
+    async def reserve(self, key: str, fingerprint: str) -> Optional[dict]:
+        with self._lock:
+            record = self._alive(key)
+            if record is not None:
+                return record
+
+            now = time.monotonic()
+            self._entries[key] = {
+                "key": key,
+                "fingerprint": fingerprint,
+                "state": IN_FLIGHT,
+                "status": None,
+                "headers": None,
+                "body": None,
+                "reserved_at": now,
+                "expires_at": now + self.ttl,
+            }
+            self._events[key] = asyncio.Event()
+            self._evict()
+            return None
+
+    async def complete(self, key, status, headers, body) -> None:
+        with self._lock:
+            record = self._entries.get(key)
+            if record is not None:
+                record.update(
+                    state=COMPLETED,
+                    status=status,
+                    headers=headers,
+                    body=body,
+                    expires_at=time.monotonic() + self.ttl
+                )
+            event = self._events.pop(key, None)
+        if event:
+            event.set()
+
+    async def release(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            event = self._events.pop(key, None)
+        if event:
+            event.set()
+
+    async def wait(self, key: str, timeout: float) -> bool:
+        event = self._events.get(key)
+        if event is None:
+            return True
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._alive(key)
+
+
+class DatabaseIdempotencyStore(IdempotencyStore):
+    # Armazenamento na tabela idempotency_keys: compartilhado entre
+    # processos/instâncias. A reserva é o INSERT da chave primária
+
+    def __init__(self, ttl_seconds: int = None, session_factory=None):
+        self.ttl = ttl_seconds or settings.IDEMPOTENCY_TTL_SECONDS
+        self.session_factory = session_factory or SessionLocal
+        self._reservations = 0
+
+    @staticmethod
+    def _to_dict(row: IdempotencyKey) -> dict:
+        return {
+            "key": row.key,
+            "fingerprint": row.fingerprint,
+            "state": row.state,
+            "status": row.response_status,
+            "headers": json.loads(row.response_headers) if row.response_headers else None,
+            "body": row.response_body,
+            "reserved_at": row.created_at,
+        }
+
+    def _is_stale(self, row: IdempotencyKey, now: datetime) -> bool:
+        if row.expires_at <= now:
+            return True
+        return (
+            row.state == IN_FLIGHT and
+            (now - row.created_at).total_seconds() > settings.IDEMPOTENCY_LOCK_TIMEOUT
+        )
+
+    def _reserve(self, key: str, fingerprint: str) -> Optional[dict]:
+        db = self.session_factory()
+        try:
+            for _ in range(3):
+                now = datetime.utcnow()
+                db.add(IdempotencyKey(
+                    key=key,
+                    fingerprint=fingerprint,
+                    state=IN_FLIGHT,
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=self.ttl)
+                ))
+                try:
+                    db.commit()
+                    self._reservations += 1
+                    if self._reservations % 1000 == 0:
+                        self._purge(db)
+                    return None
+                except IntegrityError:
+                    db.rollback()
+
+                row = db.get(IdempotencyKey, key)
+                if row is None:
+                    continue
+                if not self._is_stale(row, now):
+                    return self._to_dict(row)
+
+                # Registro expirado ou reserva abandonada: remove e tenta de novo
+                db.query(IdempotencyKey).filter(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.created_at == row.created_at
+                ).delete(synchronize_session=False)
+                db.commit()
+
+            raise RuntimeError("Não foi possível reservar a Idempotency-Key")
+        finally:
+            db.close()
+
+    def _complete(self, key, status, headers, body) -> None:
+        db = self.session_factory()
+        try:
+            db.query(IdempotencyKey).filter(IdempotencyKey.key == key).update({
+                IdempotencyKey.state: COMPLETED,
+                IdempotencyKey.response_status: status,
+                IdempotencyKey.response_headers: json.dumps(headers),
+                IdempotencyKey.response_body: body,
+                IdempotencyKey.expires_at: datetime.utcnow() + timedelta(seconds=self.ttl),
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _release(self, key: str) -> None:
+        db = self.session_factory()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.key == key,
+                IdempotencyKey.state == IN_FLIGHT
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _get(self, key: str) -> Optional[dict]:
+        db = self.session_factory()
+        try:
+            row = db.get(IdempotencyKey, key)
+            if row is None or self._is_stale(row, datetime.utcnow()):
+                return None
+            return self._to_dict(row)
+        finally:
+            db.close()
+
+    def _purge(self, db) -> int:
+        # Remove registros expirados (busca no índice de expires_at)
+        deleted = db.query(IdempotencyKey).filter(
+            IdempotencyKey.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def purge_expired(self) -> int:
+        db = self.session_factory()
+        try:
+            return self._purge(db)
+        finally:
+            db.close()
+
+    async def reserve(self, key: str, fingerprint: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._reserve, key, fingerprint)
+
+    async def complete(self, key, status, headers, body) -> None:
+        await asyncio.to_thread(self._complete, key, status, headers, body)
+
+    async def release(self, key: str) -> None:
+        await asyncio.to_thread(self._release, key)
+
+    async def get(self, key: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, key)
+
+
+def create_idempotency_store(backend: str = None) -> IdempotencyStore:
+    # Cria o armazenamento configurado em IDEMPOTENCY_BACKEND
+    backend = backend or settings.IDEMPOTENCY_BACKEND
+    if backend == "memory":
+        return MemoryIdempotencyStore()
+    if backend == "database":
+        return DatabaseIdempotencyStore()
+    raise ValueError(f"IDEMPOTENCY_BACKEND inválido: {backend}")
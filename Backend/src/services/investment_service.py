@@ -6,6 +6,7 @@ from sqlalchemy import and_
 from src.models.investment import Asset, AssetType, AssetCategory, PortfolioItem
 from src.models.account import Account, AccountType
 from src.models.transaction import Transaction, TransactionType, TransactionStatus
+from src.services import balance_service, ledger_service
 import random
 
 
@@ -65,11 +66,13 @@ def buy_asset(
     # Calcula valor total
     total_cost = asset.current_price * quantity
     
-    # Verifica saldo
-    if account.balance < total_cost:
+    # Debita o custo com verificação de saldo no próprio UPDATE
+    try:
+        balance_service.debit(db, account_id, total_cost)
+    except balance_service.InsufficientBalanceError:
         raise ValueError(
             f"Saldo insuficiente. Necessário: R$ {total_cost}, "
-            f"Disponível: R$ {account.balance}"
+            f"Disponível: R$ {balance_service.get_balance(db, account_id)}"
         )
     
     # Busca ou cria item no portfólio
@@ -116,11 +119,8 @@ def buy_asset(
         status=TransactionStatus.COMPLETED
     )
     
-    # Atualiza saldo da conta
-    account.balance -= total_cost
-    account.updated_at = datetime.utcnow()
-    
     db.add(transaction)
+    ledger_service.record_transaction(db, transaction)
     db.commit()
     db.refresh(portfolio_item)
     db.refresh(transaction)
@@ -195,10 +195,10 @@ def sell_asset(
     )
     
     # Atualiza saldo da conta
-    account.balance += total_value
-    account.updated_at = datetime.utcnow()
+    balance_service.credit(db, account_id, total_value)
     
     db.add(transaction)
+    ledger_service.record_transaction(db, transaction)
     db.commit()
     
     if portfolio_item:
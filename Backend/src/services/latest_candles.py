@@ -0,0 +1,190 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Table, select
+from sqlalchemy.orm import Session
+
+from src.configs.settings import settings
+from src.models.investment import Asset, AssetType, CandleInterval
+from src.services.candle_partitions import candle_partitions
+
+
+@dataclass
+class LatestCandle:
+    # Última vela de um ativo em um intervalo
+    asset_id: int
+    symbol: str
+    name: str
+    open_price: float
+    high_price: float
+    low_price: float
+    close_price: float
+    volume: float
+    trades_count: int
+    open_time: datetime
+    close_time: datetime
+
+    @classmethod
+    def from_row(cls, row) -> "LatestCandle":
+        # Linha do banco ou vela publicada no feed (com symbol e name)
+        return cls(
+            row["asset_id"], row["symbol"], row["name"],
+            row["open_price"], row["high_price"], row["low_price"],
+            row["close_price"], row["volume"] or 0.0, row["trades_count"] or 0,
+            row["open_time"], row["close_time"]
+        )
+
+    def to_dict(self) -> dict:
+        change_percent = (
+            (self.close_price - self.open_price) / self.open_price * 100
+            if self.open_price else 0.0
+        )
+        return {
+            "asset_id": self.asset_id,
+            "symbol": self.symbol,
+            "name": self.name,
+            "candle": {
+                "open": self.open_price,
+                "high": self.high_price,
+                "low": self.low_price,
+                "close": self.close_price,
+                "volume": self.volume,
+                "trades": self.trades_count,
+                "change_percent": round(change_percent, 2),
+                "open_time": self.open_time.isoformat(),
+                "close_time": self.close_time.isoformat()
+            }
+        }
+
+
+class LatestCandles:
+    # Última vela de cada ação ativa, por intervalo, para o painel do
+    # mercado inteiro em uma única chamada. Cada worker mantém a sua cópia
+    # atualizada pelas velas publicadas no feed (O(1) por vela, sem ler o
+    # banco); um intervalo ainda não carregado, ou carregado há mais de
+    # MARKET_STATE_REFRESH_SECONDS (ações novas ou desativadas), é lido com
+    # uma única consulta: para cada ação, a vela mais recente buscada no
+    # índice (asset_id, interval, open_time)
+
+    def __init__(self, refresh_seconds: float = None):
+        self.refresh_seconds = refresh_seconds or settings.MARKET_STATE_REFRESH_SECONDS
+        self._candles: Dict[CandleInterval, Dict[int, LatestCandle]] = {}
+        self._loaded_at: Dict[CandleInterval, float] = {}
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.loads = 0
+        self.applied = 0
+        self.updated_at: Optional[datetime] = None
+
+    def stale(self, interval: CandleInterval) -> bool:
+        loaded_at = self._loaded_at.get(interval)
+        return loaded_at is None or time.monotonic() - loaded_at >= self.refresh_seconds
+
+    def _query(self, db: Session, table: Table, interval: CandleInterval, asset_ids: Optional[List[int]]):
+        # Última vela de cada ação ativa na tabela: a subconsulta correlacionada
+        # acha o id da vela mais recente da ação no índice, sem ordenar o
+        # intervalo inteiro como um ROW_NUMBER() faria
+        last = table.alias()
+        latest_id = select(last.c.id).where(
+            last.c.asset_id == Asset.id,
+            last.c.interval == interval
+        ).order_by(last.c.open_time.desc()).limit(1).scalar_subquery()
+
+        query = select(table, Asset.symbol, Asset.name).select_from(Asset).join(
+            table, table.c.id == latest_id
+        ).where(
+            Asset.asset_type == AssetType.STOCK,
+            Asset.is_active == True
+        )
+        if asset_ids is not None:
+            query = query.where(Asset.id.in_(asset_ids))
+        return db.execute(query).mappings().all()
+
+    def load(self, db: Session, interval: CandleInterval) -> int:
+        # Relê a última vela de cada ação ativa no intervalo. Com velas
+        # particionadas, as partições mais antigas só são lidas para as ações
+        # ainda sem vela. Retorna o número de ações com vela
+        rows = []
+        missing = None
+        tables = candle_partitions.tables(interval)
+        for table in tables:
+            found = self._query(db, table, interval, missing)
+            rows.extend(found)
+            if table is tables[-1]:
+                break
+            if missing is None:
+                missing = [
+                    asset_id for (asset_id,) in db.execute(
+                        select(Asset.id).where(
+                            Asset.asset_type == AssetType.STOCK,
+                            Asset.is_active == True
+                        )
+                    )
+                ]
+            found_ids = {row["asset_id"] for row in found}
+            missing = [asset_id for asset_id in missing if asset_id not in found_ids]
+            if not missing:
+                break
+
+        with self._lock:
+            current = self._candles.get(interval, {})
+            candles = {}
+            for row in rows:
+                candle = LatestCandle.from_row(row)
+                # Velas aplicadas pelo feed durante a consulta são mais novas
+                newer = current.get(candle.asset_id)
+                if newer is not None and newer.open_time > candle.open_time:
+                    candle = newer
+                candles[candle.asset_id] = candle
+            self._candles[interval] = candles
+            self._loaded_at[interval] = time.monotonic()
+            self.loads += 1
+            return len(candles)
+
+    def apply(self, records: Iterable[dict]):
+        # Velas de um tick publicadas no feed (com symbol e name). Só os
+        # intervalos já carregados são mantidos; os demais são lidos do banco
+        # quando pedidos
+        with self._lock:
+            for record in records:
+                candles = self._candles.get(record["interval"])
+                if candles is None:
+                    continue
+                current = candles.get(record["asset_id"])
+                if current is None or record["open_time"] >= current.open_time:
+                    candles[record["asset_id"]] = LatestCandle.from_row(record)
+                    self.applied += 1
+            self.updated_at = datetime.utcnow()
+
+    def reset(self):
+        # Descarta as velas em memória (ex.: eventos do feed perdidos)
+        with self._lock:
+            self._candles = {}
+            self._loaded_at = {}
+
+    def latest(self, db: Session, interval: CandleInterval) -> List[LatestCandle]:
+        # Última vela de cada ação ativa no intervalo, por símbolo
+        if self.stale(interval):
+            self.load(db, interval)
+        with self._lock:
+            candles = list(self._candles.get(interval, {}).values())
+        return sorted(candles, key=lambda candle: candle.symbol)
+
+    def metrics(self) -> dict:
+        return {
+            "intervals": {
+                interval.value: len(candles)
+                for interval, candles in self._candles.items()
+            },
+            "loads": self.loads,
+            "applied": self.applied,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+# Instância global (uma por worker, atualizada pelo feed)
+latest_candles = LatestCandles()
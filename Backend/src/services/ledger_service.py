@@ -0,0 +1,277 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import exists, func, insert
+from sqlalchemy.orm import Session
+
+from src.models.account import Account
+from src.models.ledger import LedgerEntry, LedgerEntryType
+from src.models.transaction import Transaction, TransactionType, TransactionStatus
+
+
+# Tipos que entram como crédito na conta; os demais (exceto TRANSFER) saem
+CREDIT_TRANSACTION_TYPES = {
+    TransactionType.DEPOSIT,
+    TransactionType.PIX_RECEIVE,
+    TransactionType.INVESTMENT_SELL,
+}
+
+# Compras no cartão de crédito não movimentam o saldo da conta
+NON_BALANCE_TRANSACTION_TYPES = {
+    TransactionType.CARD_CREDIT,
+}
+
+# Diferença tolerada entre saldo e soma dos lançamentos (arredondamento)
+RECONCILIATION_TOLERANCE = 0.005
+
+
+def postings_for(transaction) -> List[Tuple[int, float]]:
+    # Lançamentos (conta, valor com sinal) de uma transação: transferências
+    # geram duas pernas, as demais operações uma só
+    if (
+        transaction.transaction_type in NON_BALANCE_TRANSACTION_TYPES or
+        transaction.status not in (None, TransactionStatus.COMPLETED)
+    ):
+        return []
+
+    amount = transaction.amount
+    if transaction.transaction_type == TransactionType.TRANSFER:
+        return [
+            (transaction.from_account_id, -amount),
+            (transaction.to_account_id, amount)
+        ]
+    if transaction.transaction_type in CREDIT_TRANSACTION_TYPES:
+        return [(transaction.to_account_id or transaction.from_account_id, amount)]
+    return [(transaction.from_account_id, -amount)]
+
+
+def legacy_postings(transaction) -> List[Tuple[int, float]]:
+    # Lançamentos de transações anteriores ao razão. Transferências eram
+    # gravadas em duas linhas: "- Para:" é o débito da origem e "- De:" o
+    # crédito do destino
+    if transaction.transaction_type != TransactionType.TRANSFER:
+        return postings_for(transaction)
+    if transaction.status not in (None, TransactionStatus.COMPLETED):
+        return []
+    if " - De: " in (transaction.description or ""):
+        return [(transaction.to_account_id, transaction.amount)]
+    return [(transaction.from_account_id, -transaction.amount)]
+
+
+def ledger_entries_for(
+    transaction,
+    postings: List[Tuple[int, float]]
+) -> List[Tuple[int, float, LedgerEntryType]]:
+    # Lançamentos (conta, valor, tipo) a gravar para uma transação. Sem
+    # pernas de saldo, cada conta envolvida recebe um MEMO de valor zero
+    # (o extrato lista a transação sem alterar o saldo nem a conciliação)
+    if postings:
+        return [
+            (account_id, amount, LedgerEntryType.TRANSACTION)
+            for account_id, amount in postings
+        ]
+    accounts = dict.fromkeys(
+        account_id
+        for account_id in (transaction.from_account_id, transaction.to_account_id)
+        if account_id is not None
+    )
+    return [(account_id, 0.0, LedgerEntryType.MEMO) for account_id in accounts]
+
+
+def record_transaction(db: Session, transaction: Transaction) -> List[LedgerEntry]:
+    # Adiciona os lançamentos da transação na sessão (sem commit). A
+    # transação e os lançamentos compartilham o mesmo created_at
+    if transaction.created_at is None:
+        transaction.created_at = datetime.utcnow()
+
+    entries = [
+        LedgerEntry(
+            account_id=account_id,
+            transaction=transaction,
+            entry_type=entry_type,
+            amount=amount,
+            created_at=transaction.created_at
+        )
+        for account_id, amount, entry_type in ledger_entries_for(
+            transaction, postings_for(transaction)
+        )
+    ]
+    db.add_all(entries)
+    return entries
+
+
+def record_adjustment(
+    db: Session,
+    account_id: int,
+    amount: float,
+    entry_type: LedgerEntryType = LedgerEntryType.ADJUSTMENT,
+    created_at: Optional[datetime] = None
+) -> LedgerEntry:
+    # Lançamento sem transação: saldo inicial ou ajuste de saldo (sem commit)
+    entry = LedgerEntry(
+        account_id=account_id,
+        entry_type=entry_type,
+        amount=amount,
+        created_at=created_at or datetime.utcnow()
+    )
+    db.add(entry)
+    return entry
+
+
+def get_ledger_balance(db: Session, account_id: int) -> float:
+    # Saldo da conta segundo o razão (soma de todos os lançamentos)
+    return db.query(
+        func.coalesce(func.sum(LedgerEntry.amount), 0.0)
+    ).filter(LedgerEntry.account_id == account_id).scalar()
+
+
+def migrate_transactions(db: Session, batch_size: int = 1000) -> int:
+    # Gera os lançamentos das transações que ainda não estão no razão, em
+    # lotes por id (um commit por lote). Pode ser executada de novo sem
+    # duplicar lançamentos. Retorna a quantidade de lançamentos criados
+    created = 0
+    last_id = 0
+
+    while True:
+        rows = db.query(
+            Transaction.id,
+            Transaction.from_account_id,
+            Transaction.to_account_id,
+            Transaction.transaction_type,
+            Transaction.amount,
+            Transaction.description,
+            Transaction.status,
+            Transaction.created_at
+        ).filter(
+            Transaction.id > last_id,
+            ~exists().where(LedgerEntry.transaction_id == Transaction.id)
+        ).order_by(Transaction.id).limit(batch_size).all()
+
+        if not rows:
+            break
+
+        entries = [
+            {
+                "account_id": account_id,
+                "transaction_id": row.id,
+                "entry_type": entry_type,
+                "amount": amount,
+                "created_at": row.created_at or datetime.utcnow(),
+            }
+            for row in rows
+            for account_id, amount, entry_type in ledger_entries_for(
+                row, legacy_postings(row)
+            )
+            if account_id is not None
+        ]
+        if entries:
+            db.execute(insert(LedgerEntry), entries)
+        db.commit()
+
+        created += len(entries)
+        last_id = rows[-1].id
+
+    return created
+
+
+def _ledger_totals(db: Session, account_ids: List[int]) -> dict:
+    # Soma dos lançamentos de um lote de contas (uma consulta agrupada)
+    return dict(
+        db.query(LedgerEntry.account_id, func.sum(LedgerEntry.amount))
+        .filter(LedgerEntry.account_id.in_(account_ids))
+        .group_by(LedgerEntry.account_id)
+        .all()
+    )
+
+
+def _iter_account_batches(db: Session, batch_size: int):
+    # Percorre as contas em lotes por id (memória limitada ao lote)
+    last_id = 0
+    while True:
+        accounts = db.query(Account.id, Account.balance, Account.created_at).filter(
+            Account.id > last_id
+        ).order_by(Account.id).limit(batch_size).all()
+        if not accounts:
+            return
+        yield accounts
+        last_id = accounts[-1].id
+
+
+def migrate_opening_balances(db: Session, batch_size: int = 1000) -> int:
+    # Lança o saldo inicial das contas que não têm lançamento de abertura:
+    # a diferença entre o saldo atual e a soma dos lançamentos existentes.
+    # Deve rodar depois de migrate_transactions. Retorna as contas ajustadas
+    created = 0
+
+    for accounts in _iter_account_batches(db, batch_size):
+        ids = [account.id for account in accounts]
+        totals = _ledger_totals(db, ids)
+        opened = {
+            account_id for (account_id,) in db.query(LedgerEntry.account_id).filter(
+                LedgerEntry.account_id.in_(ids),
+                LedgerEntry.entry_type == LedgerEntryType.OPENING
+            ).distinct()
+        }
+
+        for account in accounts:
+            if account.id in opened:
+                continue
+            opening = account.balance - (totals.get(account.id) or 0.0)
+            if abs(opening) < RECONCILIATION_TOLERANCE:
+                continue
+            record_adjustment(
+                db, account.id, opening,
+                LedgerEntryType.OPENING, account.created_at
+            )
+            created += 1
+        db.commit()
+
+    return created
+
+
+def reconcile(
+    db: Session,
+    batch_size: int = 1000,
+    max_reported: int = 100
+) -> dict:
+    # Confere o saldo de cada conta contra a soma dos seus lançamentos e o
+    # fechamento das transferências (soma das pernas = 0). Lê as contas em
+    # lotes e agrega no banco, então a memória não cresce com o histórico
+    checked = 0
+    mismatch_count = 0
+    mismatches = []
+
+    for accounts in _iter_account_batches(db, batch_size):
+        totals = _ledger_totals(db, [account.id for account in accounts])
+        for account in accounts:
+            checked += 1
+            ledger_total = totals.get(account.id) or 0.0
+            difference = account.balance - ledger_total
+            if abs(difference) < RECONCILIATION_TOLERANCE:
+                continue
+            mismatch_count += 1
+            if len(mismatches) < max_reported:
+                mismatches.append({
+                    "account_id": account.id,
+                    "balance": round(account.balance, 2),
+                    "ledger_balance": round(ledger_total, 2),
+                    "difference": round(difference, 2),
+                })
+
+    transfer_imbalance = db.query(
+        func.coalesce(func.sum(LedgerEntry.amount), 0.0)
+    ).join(
+        Transaction, LedgerEntry.transaction_id == Transaction.id
+    ).filter(
+        Transaction.transaction_type == TransactionType.TRANSFER
+    ).scalar()
+
+    return {
+        "accounts_checked": checked,
+        "mismatch_count": mismatch_count,
+        "mismatches": mismatches,
+        "transfer_imbalance": round(transfer_imbalance, 2),
+        "balanced": (
+            mismatch_count == 0 and
+            abs(transfer_imbalance) < RECONCILIATION_TOLERANCE
+        ),
+    }
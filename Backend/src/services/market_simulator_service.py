@@ -0,0 +1,238 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+from src.configs.settings import settings
+from src.database.connection import SessionLocal
+from src.services.candle_archive import CandleArchive, candle_archive
+from src.services.candle_partitions import candle_partitions
+from src.services.candle_service import (
+    CandleRollup, CandleStateCache, candle_rollup, candle_state,
+    simulate_base_tick
+)
+from src.services.price_snapshot import PriceSnapshot, price_snapshot
+
+
+class MarketSimulatorWorker:
+    # Roda o simulador de velas numa thread própria: geração (NumPy),
+    # INSERT/UPDATE em lote e commit acontecem fora do event loop. Cada tick
+    # gravado vai para uma fila asyncio limitada e uma tarefa no event loop
+    # só faz o broadcast. Com a fila cheia (clientes lentos), o lote mais
+    # antigo é descartado para a simulação nunca esperar pelo broadcast
+
+    def __init__(
+        self,
+        tick_seconds: float = None,
+        queue_size: int = None,
+        session_factory=None,
+        state: CandleStateCache = None,
+        rollup: CandleRollup = None,
+        snapshot: PriceSnapshot = None,
+        archive: CandleArchive = None
+    ):
+        self.tick_seconds = tick_seconds or settings.MARKET_TICK_SECONDS
+        self.queue_size = queue_size or settings.MARKET_QUEUE_SIZE
+        self.session_factory = session_factory or SessionLocal
+        self.state = state or candle_state
+        self.rollup = rollup or candle_rollup
+        self.snapshot = snapshot if snapshot is not None else price_snapshot
+        self.archive = archive or candle_archive
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.started_at: Optional[datetime] = None
+        self.ticks = 0
+        self.errors = 0
+        self.overruns = 0
+        self.published = 0
+        self.dropped = 0
+        self.last_tick_seconds = 0.0
+        self.max_tick_seconds = 0.0
+        self.last_publish_seconds = 0.0
+        self.max_publish_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _warm(self):
+        # Estado recarregado do banco a cada início (velas podem ter sido
+        # apagadas enquanto o simulador estava parado). Com velas
+        # particionadas, cria antes as partições do período atual e do seguinte
+        db = self.session_factory()
+        try:
+            candle_partitions.prepare()
+            self.state.invalidate()
+            self.rollup.reset()
+            self.state.warm(db)
+            self.snapshot.load(db)
+        except Exception as e:
+            print(f"⚠️  Erro ao carregar estado das velas: {e}")
+        finally:
+            db.close()
+
+    def tick(self) -> List[dict]:
+        # Um tick completo numa sessão própria (executado na thread). Os
+        # preços novos vão para o snapshot compartilhado do feed e as velas
+        # gravadas para o arquivo colunar (CANDLE_ARCHIVE_ENABLED)
+        db = self.session_factory()
+        try:
+            rows = simulate_base_tick(db, self.state, self.rollup)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self.snapshot.update_prices({
+            row['asset_id']: row['close_price'] for row in rows
+        })
+        self.archive.add(rows)
+        return rows
+
+    def _run(self):
+        self._warm()
+        next_tick = time.monotonic()
+
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                rows = self.tick()
+            except Exception as e:
+                print(f"⚠️  Erro no simulador: {e}")
+                with self._lock:
+                    self.errors += 1
+                rows = []
+            self._flush_archive()
+            elapsed = time.monotonic() - started
+
+            with self._lock:
+                self.ticks += 1
+                self.last_tick_seconds = elapsed
+                self.max_tick_seconds = max(self.max_tick_seconds, elapsed)
+
+            if rows:
+                try:
+                    self._loop.call_soon_threadsafe(self._enqueue, rows)
+                except RuntimeError:
+                    # Event loop já encerrado
+                    break
+
+            # Cadência fixa: o próximo tick é agendado a partir do anterior,
+            # não do fim deste. Se o tick passou do período, segue sem acumular
+            next_tick += self.tick_seconds
+            now = time.monotonic()
+            if now > next_tick:
+                with self._lock:
+                    self.overruns += 1
+                next_tick = now
+            self._stop.wait(next_tick - now)
+
+        self._flush_archive(force=True)
+
+    def _flush_archive(self, force: bool = False):
+        # Grava as velas acumuladas no arquivo colunar a cada
+        # CANDLE_ARCHIVE_FLUSH_SECONDS (ou já, ao parar). Erros de disco
+        # não interrompem o simulador
+        try:
+            if force:
+                self.archive.flush()
+            else:
+                self.archive.maybe_flush()
+        except Exception as e:
+            print(f"⚠️  Erro ao gravar o arquivo de velas: {e}")
+
+    def _enqueue(self, rows: List[dict]):
+        # Executado no event loop (via call_soon_threadsafe)
+        if self._queue.full():
+            self._queue.get_nowait()
+            with self._lock:
+                self.dropped += 1
+        self._queue.put_nowait(rows)
+
+    async def _consume(self, publish: Callable[[List[dict]], Awaitable[None]]):
+        while True:
+            rows = await self._queue.get()
+            started = time.perf_counter()
+            try:
+                await publish(rows)
+            except Exception as e:
+                print(f"⚠️  Erro ao publicar velas: {e}")
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.published += 1
+                self.last_publish_seconds = elapsed
+                self.max_publish_seconds = max(self.max_publish_seconds, elapsed)
+
+    def start(self, publish: Callable[[List[dict]], Awaitable[None]]) -> bool:
+        # Inicia a thread do simulador e o consumidor da fila no event loop
+        # atual. `publish` recebe as velas gravadas em cada tick (dicts)
+        if self.running:
+            return False
+
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._consumer = asyncio.create_task(self._consume(publish))
+        self._stop.clear()
+        self.started_at = datetime.utcnow()
+        self._thread = threading.Thread(
+            target=self._run, name="market-simulator", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    async def stop(self) -> bool:
+        if self._thread is None:
+            return False
+
+        self._stop.set()
+        await asyncio.to_thread(self._thread.join)
+        self._thread = None
+
+        if self._consumer:
+            self._consumer.cancel()
+            try:
+                await self._consumer
+            except asyncio.CancelledError:
+                pass
+            self._consumer = None
+        return True
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "tick_seconds": self.tick_seconds,
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "ticks": self.ticks,
+                "errors": self.errors,
+                # Ticks que demoraram mais que o período
+                "overruns": self.overruns,
+                "tick_ms": {
+                    "last": round(self.last_tick_seconds * 1000, 2),
+                    "max": round(self.max_tick_seconds * 1000, 2),
+                },
+                "queue": {
+                    "size": self._queue.qsize() if self._queue else 0,
+                    "max_size": self.queue_size,
+                    "published": self.published,
+                    # Lotes descartados porque o broadcast não acompanhou
+                    "dropped": self.dropped,
+                },
+                "publish_ms": {
+                    "last": round(self.last_publish_seconds * 1000, 2),
+                    "max": round(self.max_publish_seconds * 1000, 2),
+                },
+            }
+
+
+# Instância global
+market_simulator = MarketSimulatorWorker()
@@ -0,0 +1,152 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from src.configs.settings import settings
+from src.models.investment import Asset
+
+
+@dataclass
+class PriceEntry:
+    # Preço de um ativo no snapshot e a versão em que mudou pela última vez
+    asset_id: int
+    symbol: str
+    name: str
+    price: float
+    version: int
+
+    def to_dict(self) -> dict:
+        return {
+            "asset_id": self.asset_id,
+            "symbol": self.symbol,
+            "name": self.name,
+            "price": self.price
+        }
+
+
+class PriceSnapshot:
+    # Snapshot versionado dos preços de todos os ativos ativos, compartilhado
+    # por todas as conexões do feed. O simulador atualiza os preços a cada
+    # tick (sem ler o banco) e os leitores pedem só o que mudou desde a
+    # última versão que viram. A lista de ativos é recarregada do banco a
+    # cada MARKET_STATE_REFRESH_SECONDS, com uma única consulta
+
+    def __init__(self, refresh_seconds: float = None):
+        self.refresh_seconds = refresh_seconds or settings.MARKET_STATE_REFRESH_SECONDS
+        self._entries: Dict[int, PriceEntry] = {}
+        self._by_symbol: Dict[str, PriceEntry] = {}
+        self._version = 0
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.updated_at: Optional[datetime] = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stale(self) -> bool:
+        return (
+            not self.loaded or
+            time.monotonic() - self._loaded_at >= self.refresh_seconds
+        )
+
+    def load(self, db: Session) -> int:
+        # Recarrega os ativos ativos; só os preços que mudaram (ou ativos
+        # novos) ganham uma nova versão. Retorna a versão atual
+        rows = db.query(
+            Asset.id, Asset.symbol, Asset.name, Asset.current_price
+        ).filter(Asset.is_active == True).all()
+
+        with self._lock:
+            version = self._version + 1
+            changed = False
+            entries = {}
+            for row in rows:
+                entry = self._entries.get(row.id)
+                if entry is None or entry.price != row.current_price or entry.symbol != row.symbol:
+                    entry = PriceEntry(row.id, row.symbol, row.name, row.current_price, version)
+                    changed = True
+                entries[row.id] = entry
+
+            self._entries = entries
+            self._by_symbol = {entry.symbol: entry for entry in entries.values()}
+            if changed:
+                self._version = version
+                self.updated_at = datetime.utcnow()
+            self._loaded_at = time.monotonic()
+            return self._version
+
+    def update_prices(self, prices: Dict[int, float]) -> int:
+        # Aplica os preços de um tick (asset_id -> preço). Ativos que não
+        # estão no snapshot são ignorados até a próxima recarga
+        with self._lock:
+            version = self._version + 1
+            changed = False
+            for asset_id, price in prices.items():
+                entry = self._entries.get(asset_id)
+                if entry is not None and entry.price != price:
+                    entry.price = price
+                    entry.version = version
+                    changed = True
+            if changed:
+                self._version = version
+                self.updated_at = datetime.utcnow()
+            return self._version
+
+    def apply(self, version: int, changes: List[dict]) -> int:
+        # Aplica mudanças publicadas pelo produtor do feed (workers seguidores
+        # não rodam o simulador). Ativos novos são incluídos
+        with self._lock:
+            version = max(version, self._version)
+            for change in changes:
+                entry = self._entries.get(change["asset_id"])
+                if entry is None:
+                    entry = PriceEntry(
+                        change["asset_id"], change["symbol"], change["name"],
+                        change["price"], version
+                    )
+                    self._entries[entry.asset_id] = entry
+                    self._by_symbol[entry.symbol] = entry
+                else:
+                    entry.price = change["price"]
+                    entry.version = version
+            if changes:
+                self._version = version
+                self.updated_at = datetime.utcnow()
+            return self._version
+
+    def changes_since(self, version: int) -> Tuple[int, List[PriceEntry]]:
+        # Entradas alteradas depois de `version` (0 = snapshot completo) e a
+        # versão atual, que o leitor usa na próxima chamada
+        with self._lock:
+            if version >= self._version:
+                return self._version, []
+            return self._version, [
+                PriceEntry(e.asset_id, e.symbol, e.name, e.price, e.version)
+                for e in self._entries.values() if e.version > version
+            ]
+
+    def get(self, symbol: str) -> Optional[PriceEntry]:
+        return self._by_symbol.get(symbol)
+
+    def metrics(self) -> dict:
+        return {
+            "assets": len(self._entries),
+            "version": self._version,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+# Snapshot usado pelo feed de mercado da API
+price_snapshot = PriceSnapshot()
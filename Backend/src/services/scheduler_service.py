@@ -0,0 +1,206 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+from src.configs.settings import settings
+from src.database.connection import SessionLocal
+from src.models.transaction import TransactionStatus
+from src.services import transaction_service
+
+
+class ScheduledTransactionScheduler:
+    # Executa agendamentos vencidos em segundo plano: busca lotes limitados
+    # no índice (status, schedule_date) e distribui os itens num pool de
+    # workers, cada um com sua própria sessão
+
+    def __init__(
+        self,
+        batch_size: int = None,
+        workers: int = None,
+        poll_interval: float = None
+    ):
+        self.batch_size = batch_size or settings.SCHEDULER_BATCH_SIZE
+        self.workers = workers or settings.SCHEDULER_WORKERS
+        self.poll_interval = poll_interval or settings.SCHEDULER_POLL_INTERVAL
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.started_at: Optional[datetime] = None
+        self.last_run_at: Optional[datetime] = None
+        self.batches = 0
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_batch_size = 0
+        self.last_batch_done = 0
+        self.last_batch_seconds = 0.0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self.busy_seconds = 0.0
+        self._lag_total = 0.0
+        self._lag_count = 0
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def _execute(self, scheduled_id: int, schedule_date: datetime) -> Optional[str]:
+        # Executa um item numa sessão própria e registra o atraso. Retorna o
+        # status final ou None (item de outro worker ou erro)
+        db = SessionLocal()
+        try:
+            started = datetime.utcnow()
+            status = transaction_service.execute_scheduled_transaction(
+                db, scheduled_id, started
+            )
+            lag = (started - schedule_date).total_seconds()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️  Erro no agendamento {scheduled_id}: {e}")
+            with self._lock:
+                self.errors += 1
+            return None
+        finally:
+            db.close()
+
+        with self._lock:
+            if status == TransactionStatus.COMPLETED.value:
+                self.completed += 1
+            elif status == TransactionStatus.FAILED.value:
+                self.failed += 1
+            else:
+                self.skipped += 1
+                return None
+
+            self.last_lag_seconds = lag
+            self.max_lag_seconds = max(self.max_lag_seconds, lag)
+            self._lag_total += lag
+            self._lag_count += 1
+        return status
+
+    def run_once(self) -> int:
+        # Processa um lote de agendamentos vencidos. Retorna o tamanho do lote
+        started = time.perf_counter()
+
+        db = SessionLocal()
+        try:
+            due = transaction_service.get_due_scheduled_transactions(
+                db, datetime.utcnow(), self.batch_size
+            )
+        finally:
+            db.close()
+
+        statuses = []
+        if due:
+            executor = self._executor or ThreadPoolExecutor(self.workers)
+            try:
+                statuses = list(executor.map(lambda item: self._execute(*item), due))
+            finally:
+                if executor is not self._executor:
+                    executor.shutdown()
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.batches += 1
+            self.last_run_at = datetime.utcnow()
+            self.last_batch_size = len(due)
+            self.last_batch_done = sum(status is not None for status in statuses)
+            self.last_batch_seconds = elapsed
+            self.busy_seconds += elapsed
+
+        return len(due)
+
+    async def _loop(self):
+        print(
+            f"⏰ Scheduler de agendamentos iniciado "
+            f"(lote: {self.batch_size}, workers: {self.workers}, "
+            f"intervalo: {self.poll_interval}s)"
+        )
+        while self._running:
+            try:
+                processed = await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                print(f"⚠️  Erro no scheduler de agendamentos: {e}")
+                processed = 0
+
+            # Lote cheio com itens concluídos: ainda há itens vencidos,
+            # continua sem esperar. Um lote sem nenhum item concluído (erros
+            # ou itens de outros workers) espera, para não girar em vazio
+            if processed < self.batch_size or not self.last_batch_done:
+                await asyncio.sleep(self.poll_interval)
+        print("⏰ Scheduler de agendamentos parado")
+
+    def start(self):
+        # Inicia o loop no event loop atual (chamado no lifespan)
+        if self._running:
+            return
+        self._running = True
+        self.started_at = datetime.utcnow()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="scheduled-tx"
+        )
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def metrics(self) -> dict:
+        # Atraso (execução - data agendada) e vazão do scheduler
+        with self._lock:
+            processed = self.completed + self.failed
+            uptime = (
+                (datetime.utcnow() - self.started_at).total_seconds()
+                if self.started_at else 0.0
+            )
+            return {
+                "running": self._running,
+                "batch_size": self.batch_size,
+                "workers": self.workers,
+                "poll_interval": self.poll_interval,
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+                "batches": self.batches,
+                "completed": self.completed,
+                "failed": self.failed,
+                "skipped": self.skipped,
+                "errors": self.errors,
+                "last_batch_size": self.last_batch_size,
+                "last_batch_done": self.last_batch_done,
+                "last_batch_ms": round(self.last_batch_seconds * 1000, 2),
+                "lag_seconds": {
+                    "last": round(self.last_lag_seconds, 3),
+                    "avg": round(self._lag_total / self._lag_count, 3) if self._lag_count else 0.0,
+                    "max": round(self.max_lag_seconds, 3),
+                },
+                "throughput": {
+                    # Itens por segundo de processamento efetivo
+                    "busy_per_second": round(processed / self.busy_seconds, 2) if self.busy_seconds else 0.0,
+                    # Itens por segundo desde o início
+                    "per_second": round(processed / uptime, 4) if uptime else 0.0,
+                },
+            }
+
+
+# Instância global
+scheduler = ScheduledTransactionScheduler()
@@ -1,14 +1,22 @@
 from datetime import datetime, date, timedelta
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, or_, func, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import calendar
+import time
 
 from src.models.transaction import (
     Transaction, TransactionType, TransactionStatus,
-    ScheduledTransaction
+    ScheduledTransaction, DailyWithdrawalCounter
 )
 from src.models.account import Account
+from src.models.ledger import LedgerEntry
 from src.configs.settings import settings
+from src.utils.pagination import encode_cursor, decode_cursor
+from src.services import balance_service, ledger_service
+from src.services.balance_service import InsufficientBalanceError  # noqa: F401
 
 
 class TransactionLimitError(Exception):
@@ -16,49 +24,139 @@ class TransactionLimitError(Exception):
     pass
 
 
-class InsufficientBalanceError(Exception):
-    #Erro de saldo insuficiente
-    pass
+def _business_day(moment: Optional[datetime] = None) -> date:
+    # Dia útil dos contadores (mesma base UTC do created_at das transações)
+    return (moment or datetime.utcnow()).date()
 
 
-def _check_daily_withdrawal_limits(
+def _get_daily_withdrawal_counter(
     db: Session,
     account_id: int,
-    amount: float
-) -> None:
-    # Verifica valor máximo por saque
+    business_day: date
+) -> Optional[DailyWithdrawalCounter]:
+    return db.query(DailyWithdrawalCounter).filter(
+        DailyWithdrawalCounter.account_id == account_id,
+        DailyWithdrawalCounter.business_day == business_day
+    ).first()
+
+
+def _check_daily_withdrawal_limits(amount: float) -> None:
+    # Verifica valor máximo por saque (os limites do dia são verificados
+    # no próprio incremento do contador)
     if amount > settings.MAX_WITHDRAWAL_AMOUNT:
         raise TransactionLimitError(
             f"Valor máximo por saque é "
             f"R$ {settings.MAX_WITHDRAWAL_AMOUNT}"
         )
-    
-    # Busca saques do dia
-    today_start = datetime.combine(date.today(), datetime.min.time())
-    today_withdrawals = db.query(Transaction).filter(
-        and_(
-            Transaction.from_account_id == account_id,
-            Transaction.transaction_type == TransactionType.WITHDRAWAL,
-            Transaction.status == TransactionStatus.COMPLETED,
-            Transaction.created_at >= today_start
+    if amount > settings.DAILY_WITHDRAWAL_LIMIT:
+        raise TransactionLimitError(
+            f"Limite diário total é R$ {settings.DAILY_WITHDRAWAL_LIMIT}"
         )
-    ).all()
+
+
+def _upsert_counter(db: Session):
+    # INSERT ... ON CONFLICT do dialeto em uso (PostgreSQL ou SQLite)
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql_insert(DailyWithdrawalCounter)
+    return sqlite_insert(DailyWithdrawalCounter)
+
+
+def _register_daily_withdrawal(
+    db: Session,
+    account_id: int,
+    amount: float
+) -> None:
+    # Reserva o saque no contador do dia com um único upsert atômico na
+    # mesma transação do saque: o incremento só acontece se os limites
+    # continuarem respeitados, então saques concorrentes não passam do
+    # limite nem colidem na chave única (account_id, business_day).
+    # Um novo dia gera uma nova chave, então a virada é automática.
+    business_day = _business_day()
+    now = datetime.utcnow()
+    counter = DailyWithdrawalCounter.__table__.c
+    stmt = _upsert_counter(db).values(
+        account_id=account_id,
+        business_day=business_day,
+        withdrawal_count=1,
+        total_amount=amount,
+        updated_at=now
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[counter.account_id, counter.business_day],
+        set_={
+            "withdrawal_count": counter.withdrawal_count + 1,
+            "total_amount": counter.total_amount + amount,
+            "updated_at": now
+        },
+        where=and_(
+            counter.withdrawal_count < settings.MAX_WITHDRAWALS_PER_DAY,
+            counter.total_amount + amount <= settings.DAILY_WITHDRAWAL_LIMIT
+        )
+    ).returning(counter.withdrawal_count)
     
-    # Verifica número de saques
-    if len(today_withdrawals) >= settings.MAX_WITHDRAWALS_PER_DAY:
+    if db.execute(stmt).first() is not None:
+        return
+    
+    # Nenhuma linha: o contador existente já estourou algum limite
+    current = _get_daily_withdrawal_counter(db, account_id, business_day)
+    if current.withdrawal_count >= settings.MAX_WITHDRAWALS_PER_DAY:
         raise TransactionLimitError(
             f"Limite de {settings.MAX_WITHDRAWALS_PER_DAY} "
             f"saques diários atingido"
         )
+    raise TransactionLimitError(
+        f"Limite diário total de "
+        f"R$ {settings.DAILY_WITHDRAWAL_LIMIT} atingido. "
+        f"Já sacou R$ {current.total_amount} hoje"
+    )
+
+
+def rebuild_daily_withdrawal_counters(
+    db: Session,
+    business_day: Optional[date] = None
+) -> int:
+    # Reconstrói os contadores de um dia a partir do histórico de saques
+    business_day = business_day or _business_day()
+    day_start = datetime.combine(business_day, datetime.min.time())
+    day_end = day_start + timedelta(days=1)
     
-    # Verifica valor total diário
-    total_today = sum(t.amount for t in today_withdrawals)
-    if total_today + amount > settings.DAILY_WITHDRAWAL_LIMIT:
-        raise TransactionLimitError(
-            f"Limite diário total de "
-            f"R$ {settings.DAILY_WITHDRAWAL_LIMIT} atingido. "
-            f"Já sacou R$ {total_today} hoje"
+    db.query(DailyWithdrawalCounter).filter(
+        DailyWithdrawalCounter.business_day == business_day
+    ).delete(synchronize_session=False)
+    
+    totals = db.query(
+        Transaction.from_account_id,
+        func.count(Transaction.id),
+        func.coalesce(func.sum(Transaction.amount), 0.0)
+    ).filter(
+        and_(
+            Transaction.transaction_type == TransactionType.WITHDRAWAL,
+            Transaction.status == TransactionStatus.COMPLETED,
+            Transaction.created_at >= day_start,
+            Transaction.created_at < day_end
         )
+    ).group_by(Transaction.from_account_id).all()
+    
+    for account_id, count, total in totals:
+        db.add(DailyWithdrawalCounter(
+            account_id=account_id,
+            business_day=business_day,
+            withdrawal_count=count,
+            total_amount=total
+        ))
+    
+    db.commit()
+    return len(totals)
+
+
+def prune_daily_withdrawal_counters(db: Session, keep_days: int = 7) -> int:
+    # Remove contadores de dias antigos (não participam mais das checagens)
+    cutoff = _business_day() - timedelta(days=keep_days)
+    deleted = db.query(DailyWithdrawalCounter).filter(
+        DailyWithdrawalCounter.business_day < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
 
 
 def create_deposit(
@@ -70,10 +168,8 @@ def create_deposit(
     if amount <= 0:
         raise ValueError("Valor do depósito deve ser positivo")
     
-    # Busca conta
-    account = db.query(Account).filter(Account.id == account_id).first()
-    if not account:
-        raise ValueError("Conta não encontrada")
+    # Atualiza saldo (UPDATE atômico; falha se a conta não existir)
+    balance_service.credit(db, account_id, amount)
     
     # Cria transação
     transaction = Transaction(
@@ -84,11 +180,8 @@ def create_deposit(
         status=TransactionStatus.COMPLETED
     )
     
-    # Atualiza saldo
-    account.balance += amount
-    account.updated_at = datetime.utcnow()
-    
     db.add(transaction)
+    ledger_service.record_transaction(db, transaction)
     db.commit()
     db.refresh(transaction)
     
@@ -104,19 +197,12 @@ def create_withdrawal(
     if amount <= 0:
         raise ValueError("Valor do saque deve ser positivo")
     
-    # Busca conta
-    account = db.query(Account).filter(Account.id == account_id).first()
-    if not account:
-        raise ValueError("Conta não encontrada")
-    
-    # Verifica saldo
-    if account.balance < amount:
-        raise InsufficientBalanceError(
-            f"Saldo insuficiente. Disponível: R$ {account.balance}"
-        )
+    # Verifica limite por saque e reserva os limites diários no contador
+    _check_daily_withdrawal_limits(amount)
+    _register_daily_withdrawal(db, account_id, amount)
     
-    # Verifica limites diários
-    _check_daily_withdrawal_limits(db, account_id, amount)
+    # Debita com verificação de saldo no próprio UPDATE
+    balance_service.debit(db, account_id, amount)
     
     # Cria transação
     transaction = Transaction(
@@ -127,24 +213,41 @@ def create_withdrawal(
         status=TransactionStatus.COMPLETED
     )
     
-    # Atualiza saldo
-    account.balance -= amount
-    account.updated_at = datetime.utcnow()
-    
     db.add(transaction)
+    ledger_service.record_transaction(db, transaction)
     db.commit()
     db.refresh(transaction)
     
     return transaction
 
 
+def _build_transfer_transaction(
+    from_account: Account,
+    to_account: Account,
+    amount: float,
+    description: str
+) -> Transaction:
+    # Uma única transação; o débito e o crédito são os lançamentos no razão
+    return Transaction(
+        from_account_id=from_account.id,
+        to_account_id=to_account.id,
+        transaction_type=TransactionType.TRANSFER,
+        amount=amount,
+        description=(
+            f"{description} - {from_account.account_number} "
+            f"→ {to_account.account_number}"
+        ),
+        status=TransactionStatus.COMPLETED
+    )
+
+
 def create_transfer(
     db: Session,
     from_account_id: int,
     to_account_number: str,
     amount: float,
     description: str = "Transferência"
-) -> tuple[Transaction, Transaction]:
+) -> Transaction:
     if amount <= 0:
         raise ValueError("Valor da transferência deve ser positivo")
     
@@ -165,54 +268,42 @@ def create_transfer(
         if from_account.id == to_account.id:
             raise ValueError("Não é possível transferir para a mesma conta")
         
-        # Verifica saldo
-        if from_account.balance < amount:
-            raise InsufficientBalanceError(
-                f"Saldo insuficiente. Disponível: R$ {from_account.balance}"
-            )
-        
-        # Cria transação de débito
-        debit_transaction = Transaction(
-            from_account_id=from_account.id,
-            to_account_id=to_account.id,
-            transaction_type=TransactionType.TRANSFER,
-            amount=amount,
-            description=f"{description} - Para: {to_account.account_number}",
-            status=TransactionStatus.COMPLETED
-        )
+        # Atualiza saldos (ordem determinística de lock entre as contas)
+        balance_service.transfer(db, from_account.id, to_account.id, amount)
         
-        # Cria transação de crédito
-        credit_transaction = Transaction(
-            from_account_id=from_account.id,
-            to_account_id=to_account.id,
-            transaction_type=TransactionType.TRANSFER,
-            amount=amount,
-            description=f"{description} - De: {from_account.account_number}",
-            status=TransactionStatus.COMPLETED
+        transaction = _build_transfer_transaction(
+            from_account, to_account, amount, description
         )
         
-        # Atualiza saldos
-        from_account.balance -= amount
-        from_account.updated_at = datetime.utcnow()
-        
-        to_account.balance += amount
-        to_account.updated_at = datetime.utcnow()
-        
-        # Adiciona tudo em uma única transação
-        db.add(debit_transaction)
-        db.add(credit_transaction)
+        # Transação e lançamentos (débito e crédito) em um único commit
+        db.add(transaction)
+        ledger_service.record_transaction(db, transaction)
         db.commit()
+        db.refresh(transaction)
         
-        db.refresh(debit_transaction)
-        db.refresh(credit_transaction)
-        
-        return debit_transaction, credit_transaction
+        return transaction
         
     except Exception as e:
         db.rollback()
         raise e
 
 
+def _build_pix_send_transaction(
+    from_account_id: int,
+    pix_key: str,
+    amount: float,
+    description: str
+) -> Transaction:
+    return Transaction(
+        from_account_id=from_account_id,
+        transaction_type=TransactionType.PIX_SEND,
+        amount=amount,
+        pix_key=pix_key,
+        description=f"{description} - Chave: {pix_key}",
+        status=TransactionStatus.COMPLETED
+    )
+
+
 def create_pix_send(
     db: Session,
     from_account_id: int,
@@ -224,32 +315,15 @@ def create_pix_send(
     if amount <= 0:
         raise ValueError("Valor do PIX deve ser positivo")
     
-    # Busca conta
-    account = db.query(Account).filter(Account.id == from_account_id).first()
-    if not account:
-        raise ValueError("Conta não encontrada")
+    # Debita com verificação de saldo no próprio UPDATE
+    balance_service.debit(db, from_account_id, amount)
     
-    # Verifica saldo
-    if account.balance < amount:
-        raise InsufficientBalanceError(
-            f"Saldo insuficiente. Disponível: R$ {account.balance}"
-        )
-    
-    # Cria transação
-    transaction = Transaction(
-        from_account_id=from_account_id,
-        transaction_type=TransactionType.PIX_SEND,
-        amount=amount,
-        pix_key=pix_key,
-        description=f"{description} - Chave: {pix_key}",
-        status=TransactionStatus.COMPLETED
+    transaction = _build_pix_send_transaction(
+        from_account_id, pix_key, amount, description
     )
     
-    # Atualiza saldo
-    account.balance -= amount
-    account.updated_at = datetime.utcnow()
-    
     db.add(transaction)
+    ledger_service.record_transaction(db, transaction)
     db.commit()
     db.refresh(transaction)
     
@@ -284,16 +358,32 @@ def create_pix_receive(
     )
     
     # Atualiza saldo
-    account.balance += amount
-    account.updated_at = datetime.utcnow()
+    balance_service.credit(db, account.id, amount)
     
     db.add(transaction)
+    ledger_service.record_transaction(db, transaction)
     db.commit()
     db.refresh(transaction)
     
     return transaction
 
 
+def _build_bill_payment_transaction(
+    account_id: int,
+    bar_code: str,
+    amount: float,
+    description: str
+) -> Transaction:
+    return Transaction(
+        from_account_id=account_id,
+        transaction_type=TransactionType.BILL_PAYMENT,
+        amount=amount,
+        bar_code=bar_code,
+        description=f"{description} - Código: {bar_code[:10]}...",
+        status=TransactionStatus.COMPLETED
+    )
+
+
 def pay_bill(
     db: Session,
     account_id: int,
@@ -309,63 +399,308 @@ def pay_bill(
             "Código de barras inválido (mínimo 44 dígitos)"
         )
     
-    # Busca conta
-    account = db.query(Account).filter(Account.id == account_id).first()
-    if not account:
-        raise ValueError("Conta não encontrada")
+    # Debita com verificação de saldo no próprio UPDATE
+    balance_service.debit(db, account_id, amount)
     
-    # Verifica saldo
-    if account.balance < amount:
-        raise InsufficientBalanceError(
-            f"Saldo insuficiente. Disponível: R$ {account.balance}"
-        )
-    
-    # Cria transação
-    transaction = Transaction(
-        from_account_id=account_id,
-        transaction_type=TransactionType.BILL_PAYMENT,
-        amount=amount,
-        bar_code=bar_code,
-        description=f"{description} - Código: {bar_code[:10]}...",
-        status=TransactionStatus.COMPLETED
+    transaction = _build_bill_payment_transaction(
+        account_id, bar_code, amount, description
     )
     
-    # Atualiza saldo
-    account.balance -= amount
-    account.updated_at = datetime.utcnow()
-    
     db.add(transaction)
+    ledger_service.record_transaction(db, transaction)
     db.commit()
     db.refresh(transaction)
     
     return transaction
 
 
-def get_statement(
+BATCH_OPERATION_TYPES = {
+    TransactionType.TRANSFER,
+    TransactionType.PIX_SEND,
+    TransactionType.BILL_PAYMENT
+}
+
+_BATCH_DEFAULT_DESCRIPTIONS = {
+    TransactionType.TRANSFER: "Transferência",
+    TransactionType.PIX_SEND: "PIX enviado",
+    TransactionType.BILL_PAYMENT: "Pagamento de boleto"
+}
+
+
+def _validate_batch_operation(
+    operation: dict,
+    accounts_by_id: dict,
+    accounts_by_number: dict,
+    projected_balances: dict
+) -> Optional[str]:
+    # Valida uma operação do lote contra os saldos projetados.
+    # Retorna a mensagem de erro ou None se a operação é válida
+    operation_type = operation.get("operation_type")
+    amount = operation.get("amount") or 0
+    from_account = accounts_by_id.get(operation.get("from_account_id"))
+    
+    if operation_type not in BATCH_OPERATION_TYPES:
+        return f"Tipo de operação não suportado em lote: {operation_type}"
+    if amount <= 0:
+        return "Valor deve ser positivo"
+    if not from_account:
+        return "Conta origem não encontrada"
+    
+    if operation_type == TransactionType.TRANSFER:
+        to_account = accounts_by_number.get(operation.get("to_account_number"))
+        if not to_account:
+            return "Conta destino não encontrada"
+        if to_account.id == from_account.id:
+            return "Não é possível transferir para a mesma conta"
+    elif operation_type == TransactionType.PIX_SEND:
+        if not operation.get("pix_key"):
+            return "Chave PIX obrigatória"
+    elif operation_type == TransactionType.BILL_PAYMENT:
+        bar_code = operation.get("bar_code")
+        if not bar_code or len(bar_code) < 44:
+            return "Código de barras inválido (mínimo 44 dígitos)"
+    
+    if projected_balances[from_account.id] < amount:
+        return (
+            f"Saldo insuficiente. Disponível: "
+            f"R$ {round(projected_balances[from_account.id], 2)}"
+        )
+    
+    return None
+
+
+def _batch_balance_deltas(
+    operation: dict,
+    accounts_by_number: dict
+) -> List[tuple[int, float]]:
+    # Efeito de uma operação do lote nos saldos: [(conta, delta), ...]
+    amount = operation["amount"]
+    deltas = [(operation["from_account_id"], -amount)]
+    if operation["operation_type"] == TransactionType.TRANSFER:
+        to_account = accounts_by_number[operation["to_account_number"]]
+        deltas.append((to_account.id, amount))
+    return deltas
+
+
+def _build_batch_transactions(
+    operation: dict,
+    accounts_by_id: dict,
+    accounts_by_number: dict
+) -> List[Transaction]:
+    # Cria as transações de uma operação do lote (sem tocar em saldos)
+    operation_type = operation["operation_type"]
+    amount = operation["amount"]
+    description = (
+        operation.get("description") or
+        _BATCH_DEFAULT_DESCRIPTIONS[operation_type]
+    )
+    from_account = accounts_by_id[operation["from_account_id"]]
+    
+    if operation_type == TransactionType.TRANSFER:
+        to_account = accounts_by_number[operation["to_account_number"]]
+        return [_build_transfer_transaction(
+            from_account, to_account, amount, description
+        )]
+    if operation_type == TransactionType.PIX_SEND:
+        return [_build_pix_send_transaction(
+            from_account.id, operation["pix_key"], amount, description
+        )]
+    return [_build_bill_payment_transaction(
+        from_account.id, operation["bar_code"], amount, description
+    )]
+
+
+def execute_batch(
     db: Session,
+    operations: List[dict],
+    atomic: bool = True
+) -> dict:
+    # Executa transferências, PIX e boletos em lote, com um único commit.
+    # atomic=True: tudo ou nada; atomic=False: aplica o que for válido
+    if not operations:
+        raise ValueError("Lote vazio")
+    if len(operations) > settings.MAX_BATCH_OPERATIONS:
+        raise ValueError(
+            f"Lote excede o máximo de {settings.MAX_BATCH_OPERATIONS} operações"
+        )
+    
+    started = time.perf_counter()
+    
+    # Carrega todas as contas envolvidas em uma única consulta
+    from_ids = {op.get("from_account_id") for op in operations}
+    to_numbers = {
+        op.get("to_account_number") for op in operations
+        if op.get("to_account_number")
+    }
+    accounts = db.query(Account).filter(
+        or_(
+            Account.id.in_(from_ids),
+            Account.account_number.in_(to_numbers)
+        )
+    ).all()
+    accounts_by_id = {account.id: account for account in accounts}
+    accounts_by_number = {account.account_number: account for account in accounts}
+    
+    # Valida tudo contra os saldos carregados, projetando cada operação
+    projected_balances = {account.id: account.balance for account in accounts}
+    results = []
+    valid_indexes = []
+    
+    for index, operation in enumerate(operations):
+        error = _validate_batch_operation(
+            operation, accounts_by_id, accounts_by_number, projected_balances
+        )
+        results.append({
+            "index": index,
+            "operation_type": operation.get("operation_type"),
+            "success": error is None,
+            "transaction_ids": [],
+            "error": error
+        })
+        if error:
+            continue
+        
+        valid_indexes.append(index)
+        amount = operation["amount"]
+        projected_balances[operation["from_account_id"]] -= amount
+        if operation["operation_type"] == TransactionType.TRANSFER:
+            to_account = accounts_by_number[operation["to_account_number"]]
+            projected_balances[to_account.id] += amount
+    
+    if atomic and len(valid_indexes) != len(operations):
+        for result in results:
+            if result["success"]:
+                result["success"] = False
+                result["error"] = "Não executada: lote atômico contém operações inválidas"
+        valid_indexes = []
+    
+    # Aplica as operações válidas em uma única unidade de trabalho:
+    # um UPDATE por conta com o delta líquido do lote
+    net_deltas = {}
+    for index in valid_indexes:
+        for account_id, delta in _batch_balance_deltas(
+            operations[index], accounts_by_number
+        ):
+            net_deltas[account_id] = net_deltas.get(account_id, 0.0) + delta
+    
+    applied = []
+    if valid_indexes:
+        try:
+            balance_service.apply_deltas(db, net_deltas)
+            applied = list(valid_indexes)
+        except (InsufficientBalanceError, ValueError) as e:
+            # Saldo alterado por outra operação concorrente
+            db.rollback()
+            if atomic:
+                for result in results:
+                    result["success"] = False
+                    result["error"] = f"Lote atômico revertido: {e}"
+            else:
+                # Reaplica item a item, mantendo apenas os que couberem
+                for index in valid_indexes:
+                    try:
+                        balance_service.apply_deltas(
+                            db,
+                            dict(_batch_balance_deltas(
+                                operations[index], accounts_by_number
+                            ))
+                        )
+                        applied.append(index)
+                    except (InsufficientBalanceError, ValueError) as item_error:
+                        results[index]["success"] = False
+                        results[index]["error"] = str(item_error)
+    
+    if applied:
+        created = {
+            index: _build_batch_transactions(
+                operations[index], accounts_by_id, accounts_by_number
+            )
+            for index in applied
+        }
+        for transactions in created.values():
+            for transaction in transactions:
+                db.add(transaction)
+                ledger_service.record_transaction(db, transaction)
+        db.flush()
+        for index, transactions in created.items():
+            results[index]["transaction_ids"] = [t.id for t in transactions]
+        db.commit()
+    
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for result in results if result["success"])
+    
+    return {
+        "mode": "ALL_OR_NOTHING" if atomic else "BEST_EFFORT",
+        "total": len(operations),
+        "succeeded": succeeded,
+        "failed": len(operations) - succeeded,
+        "elapsed_ms": round(elapsed * 1000, 2),
+        "operations_per_second": (
+            round(len(operations) / elapsed, 2) if elapsed > 0 else 0.0
+        ),
+        "results": results
+    }
+
+
+def paginate_by_cursor(
+    query,
+    limit: int,
+    cursor: Optional[str] = None,
+    created_column=Transaction.created_at,
+    id_column=Transaction.id,
+    position=lambda item: (item.created_at, item.id),
+    offset: int = 0
+) -> tuple[list, Optional[str]]:
+    # Paginação por chave (created_at, id) decrescente: cada página é uma
+    # busca no índice a partir do último item, sem OFFSET. `offset` só é
+    # usado pela paginação legada (sem cursor)
+    decoded = decode_cursor(cursor)
+    if decoded:
+        created_at, item_id = decoded
+        query = query.filter(
+            or_(
+                created_column < created_at,
+                and_(
+                    created_column == created_at,
+                    id_column < item_id
+                )
+            )
+        )
+    
+    query = query.order_by(created_column.desc(), id_column.desc())
+    if offset and not decoded:
+        query = query.offset(offset)
+    
+    # Busca um item a mais só para saber se existe próxima página
+    items = query.limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(*position(items[-1]))
+    
+    return items, next_cursor
+
+
+def _filter_statement(
+    query,
     account_id: int,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     transaction_type: Optional[TransactionType] = None,
     min_amount: Optional[float] = None,
-    max_amount: Optional[float] = None,
-    limit: int = 50,
-    offset: int = 0
-) -> tuple[List[Transaction], int]:
-    from sqlalchemy import or_
+    max_amount: Optional[float] = None
+):
+    # Aplica os filtros do extrato de uma conta sobre os seus lançamentos
+    # no razão (uma busca no índice account_id, created_at)
+    query = query.join(
+        Transaction, LedgerEntry.transaction_id == Transaction.id
+    ).filter(LedgerEntry.account_id == account_id)
     
-    query = db.query(Transaction).filter(
-        or_(
-            Transaction.from_account_id == account_id,
-            Transaction.to_account_id == account_id
-        )
-    )
-    
-    # Filtros
     if start_date:
-        query = query.filter(Transaction.created_at >= start_date)
+        query = query.filter(LedgerEntry.created_at >= start_date)
     if end_date:
-        query = query.filter(Transaction.created_at <= end_date)
+        query = query.filter(LedgerEntry.created_at <= end_date)
     if transaction_type:
         query = query.filter(Transaction.transaction_type == transaction_type)
     if min_amount is not None:
@@ -373,15 +708,107 @@ def get_statement(
     if max_amount is not None:
         query = query.filter(Transaction.amount <= max_amount)
     
-    # Total de registros
-    total_count = query.count()
+    return query
+
+
+def get_statement(
+    db: Session,
+    account_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    transaction_type: Optional[TransactionType] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+) -> tuple[List[tuple[Transaction, float]], Optional[int], Optional[str]]:
+    # Retorna ([(transação, valor com sinal), ...], total ou None,
+    # próximo cursor)
+    query = _filter_statement(
+        db.query(LedgerEntry, Transaction), account_id, start_date,
+        end_date, transaction_type, min_amount, max_amount
+    )
+    
+    # Total de registros (contagem completa só quando pedida)
+    total_count = query.count() if include_total else None
+    
+    # Sem cursor, `offset` mantém a paginação legada (clientes antigos)
+    rows, next_cursor = paginate_by_cursor(
+        query, limit, cursor,
+        created_column=LedgerEntry.created_at,
+        id_column=LedgerEntry.id,
+        position=lambda row: (row.LedgerEntry.created_at, row.LedgerEntry.id),
+        offset=offset
+    )
+    
+    return (
+        [(row.Transaction, row.LedgerEntry.amount) for row in rows],
+        total_count,
+        next_cursor
+    )
+
+
+def iter_statement(
+    db: Session,
+    account_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    transaction_type: Optional[TransactionType] = None,
+    batch_size: Optional[int] = None
+) -> Iterator:
+    # Percorre o extrato em ordem cronológica sem carregar tudo na memória:
+    # os lançamentos da conta são lidos na ordem do índice do razão, em
+    # lotes (cursor no servidor no PostgreSQL). Emite (linha, valor com sinal)
+    batch_size = batch_size or settings.STATEMENT_EXPORT_BATCH_SIZE
+    query = _filter_statement(
+        db.query(
+            Transaction.id,
+            Transaction.from_account_id,
+            Transaction.to_account_id,
+            Transaction.transaction_type,
+            Transaction.amount,
+            Transaction.description,
+            Transaction.status,
+            LedgerEntry.created_at,
+            LedgerEntry.amount.label("signed_amount")
+        ),
+        account_id, start_date, end_date, transaction_type
+    ).order_by(
+        LedgerEntry.created_at.asc(),
+        LedgerEntry.id.asc()
+    ).yield_per(batch_size)
     
-    # Paginação e ordenação
-    transactions = query.order_by(
-        Transaction.created_at.desc()
-    ).limit(limit).offset(offset).all()
+    for row in query:
+        yield row, row.signed_amount
+
+
+def get_bill_payment_history(
+    db: Session,
+    account_ids: List[int],
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> tuple[List[Transaction], Optional[str]]:
+    # Histórico de pagamentos de contas, paginado por cursor
+    query = db.query(Transaction).filter(
+        Transaction.from_account_id.in_(account_ids),
+        Transaction.transaction_type == TransactionType.BILL_PAYMENT
+    )
     
-    return transactions, total_count
+    return paginate_by_cursor(query, limit, cursor)
+
+
+# Tipos que podem ser agendados e o campo de destino que cada um exige
+SCHEDULABLE_TYPES = {
+    TransactionType.DEPOSIT: None,
+    TransactionType.WITHDRAWAL: None,
+    TransactionType.TRANSFER: "to_account_id",
+    TransactionType.PIX_SEND: "pix_key",
+    TransactionType.BILL_PAYMENT: "bar_code",
+}
+
+RECURRENCE_PERIODS = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
 
 
 def schedule_transaction(
@@ -391,7 +818,11 @@ def schedule_transaction(
     amount: float,
     scheduled_date: datetime,
     description: str = "",
-    to_account_id: Optional[int] = None
+    to_account_id: Optional[int] = None,
+    pix_key: Optional[str] = None,
+    bar_code: Optional[str] = None,
+    is_recurring: bool = False,
+    recurrence_period: Optional[str] = None
 ) -> ScheduledTransaction:
     # Agendar transação futura
     if amount <= 0:
@@ -400,11 +831,34 @@ def schedule_transaction(
     if scheduled_date <= datetime.utcnow():
         raise ValueError("Data de agendamento deve ser futura")
     
+    if transaction_type not in SCHEDULABLE_TYPES:
+        raise ValueError(
+            f"Tipo {transaction_type.value} não pode ser agendado"
+        )
+    
+    required = SCHEDULABLE_TYPES[transaction_type]
+    if required and not {
+        "to_account_id": to_account_id,
+        "pix_key": pix_key,
+        "bar_code": bar_code
+    }[required]:
+        raise ValueError(f"Campo {required} é obrigatório para {transaction_type.value}")
+    
+    if is_recurring and recurrence_period not in RECURRENCE_PERIODS:
+        raise ValueError(
+            f"Periodicidade inválida. Use: {', '.join(RECURRENCE_PERIODS)}"
+        )
+    
     # Busca conta
     account = db.query(Account).filter(Account.id == account_id).first()
     if not account:
         raise ValueError("Conta não encontrada")
     
+    if to_account_id:
+        to_account = db.query(Account).filter(Account.id == to_account_id).first()
+        if not to_account:
+            raise ValueError("Conta destino não encontrada")
+    
     scheduled = ScheduledTransaction(
         from_account_id=account_id,
         to_account_id=to_account_id,
@@ -412,7 +866,12 @@ def schedule_transaction(
         amount=amount,
         schedule_date=scheduled_date,
         description=description,
-        status="PENDING"
+        pix_key=pix_key,
+        bar_code=bar_code,
+        is_recurring=is_recurring,
+        recurrence_period=recurrence_period if is_recurring else None,
+        recurrence_day=scheduled_date.day if is_recurring else None,
+        status=TransactionStatus.PENDING.value
     )
     
     db.add(scheduled)
@@ -429,62 +888,195 @@ def get_scheduled_transactions(
     # Listar transações agendadas
     return db.query(ScheduledTransaction).filter(
         and_(
-            ScheduledTransaction.account_id == account_id,
-            ScheduledTransaction.status == TransactionStatus.PENDING
+            ScheduledTransaction.from_account_id == account_id,
+            ScheduledTransaction.status == TransactionStatus.PENDING.value
         )
-    ).order_by(ScheduledTransaction.scheduled_date).all()
+    ).order_by(ScheduledTransaction.schedule_date).all()
 
 
-def execute_scheduled_transactions(db: Session) -> int:
-    now = datetime.utcnow()
+def next_occurrence(
+    moment: datetime,
+    period: str,
+    anchor_day: Optional[int] = None
+) -> datetime:
+    # Próxima data de uma recorrência. Mensal/anual usa o dia âncora do
+    # agendamento ajustado ao fim de cada mês (31/01 -> 28/02 -> 31/03),
+    # sem herdar o dia já ajustado da ocorrência anterior
+    if period == "DAILY":
+        return moment + timedelta(days=1)
+    if period == "WEEKLY":
+        return moment + timedelta(weeks=1)
     
-    pending = db.query(ScheduledTransaction).filter(
-        and_(
-            ScheduledTransaction.scheduled_date <= now,
-            ScheduledTransaction.status == TransactionStatus.PENDING
+    months = 12 if period == "YEARLY" else 1
+    month_index = moment.month - 1 + months
+    year = moment.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(anchor_day or moment.day, calendar.monthrange(year, month)[1])
+    return moment.replace(year=year, month=month, day=day)
+
+
+def _schedule_next_occurrence(
+    db: Session,
+    scheduled: ScheduledTransaction,
+    now: datetime
+) -> Optional[ScheduledTransaction]:
+    # Cria a próxima ocorrência de um agendamento recorrente. Ocorrências
+    # perdidas (scheduler parado) não são reexecutadas: pula para a
+    # primeira data futura
+    if not scheduled.is_recurring or not scheduled.recurrence_period:
+        return None
+    
+    anchor_day = scheduled.recurrence_day or scheduled.schedule_date.day
+    next_date = next_occurrence(
+        scheduled.schedule_date, scheduled.recurrence_period, anchor_day
+    )
+    while next_date <= now:
+        next_date = next_occurrence(
+            next_date, scheduled.recurrence_period, anchor_day
         )
-    ).all()
     
+    occurrence = ScheduledTransaction(
+        from_account_id=scheduled.from_account_id,
+        to_account_id=scheduled.to_account_id,
+        transaction_type=scheduled.transaction_type,
+        amount=scheduled.amount,
+        description=scheduled.description,
+        schedule_date=next_date,
+        pix_key=scheduled.pix_key,
+        bar_code=scheduled.bar_code,
+        is_recurring=True,
+        recurrence_period=scheduled.recurrence_period,
+        recurrence_day=anchor_day,
+        status=TransactionStatus.PENDING.value
+    )
+    db.add(occurrence)
+    return occurrence
+
+
+def _run_scheduled_operation(db: Session, scheduled: ScheduledTransaction):
+    # Executa a operação agendada pelo serviço correspondente (que faz o commit)
+    if scheduled.transaction_type == TransactionType.DEPOSIT:
+        return create_deposit(
+            db, scheduled.from_account_id,
+            scheduled.amount, scheduled.description or "Depósito agendado"
+        )
+    if scheduled.transaction_type == TransactionType.WITHDRAWAL:
+        return create_withdrawal(
+            db, scheduled.from_account_id,
+            scheduled.amount, scheduled.description or "Saque agendado"
+        )
+    if scheduled.transaction_type == TransactionType.TRANSFER:
+        to_account = db.query(Account).filter(
+            Account.id == scheduled.to_account_id
+        ).first()
+        if not to_account:
+            raise ValueError("Conta destino não encontrada")
+        return create_transfer(
+            db, scheduled.from_account_id, to_account.account_number,
+            scheduled.amount, scheduled.description or "Transferência agendada"
+        )
+    if scheduled.transaction_type == TransactionType.PIX_SEND:
+        return create_pix_send(
+            db, scheduled.from_account_id, scheduled.pix_key,
+            scheduled.amount, scheduled.description or "PIX agendado"
+        )
+    if scheduled.transaction_type == TransactionType.BILL_PAYMENT:
+        return pay_bill(
+            db, scheduled.from_account_id, scheduled.bar_code,
+            scheduled.amount, scheduled.description or "Pagamento agendado"
+        )
+    raise ValueError(
+        f"Tipo {scheduled.transaction_type.value} não pode ser agendado"
+    )
+
+
+def get_due_scheduled_transactions(
+    db: Session,
+    now: Optional[datetime] = None,
+    limit: int = 100
+) -> List[tuple[int, datetime]]:
+    # Próximos agendamentos vencidos, mais antigos primeiro, em lote limitado
+    # (busca no índice (status, schedule_date))
+    now = now or datetime.utcnow()
+    return db.query(
+        ScheduledTransaction.id,
+        ScheduledTransaction.schedule_date
+    ).filter(
+        ScheduledTransaction.status == TransactionStatus.PENDING.value,
+        ScheduledTransaction.schedule_date <= now
+    ).order_by(
+        ScheduledTransaction.schedule_date
+    ).limit(limit).all()
+
+
+def execute_scheduled_transaction(
+    db: Session,
+    scheduled_id: int,
+    now: Optional[datetime] = None
+) -> Optional[str]:
+    # Executa um agendamento. A marcação como COMPLETED é um UPDATE
+    # condicional (status = PENDING) na mesma transação da operação, então
+    # dois workers nunca executam o mesmo item e uma falha não deixa o
+    # agendamento marcado. Retorna o status final ou None se outro worker
+    # já pegou o item
+    now = now or datetime.utcnow()
+    scheduled = db.query(ScheduledTransaction).filter(
+        ScheduledTransaction.id == scheduled_id
+    ).first()
+    if not scheduled:
+        return None
+    
+    claim = update(ScheduledTransaction).where(
+        ScheduledTransaction.id == scheduled_id,
+        ScheduledTransaction.status == TransactionStatus.PENDING.value
+    ).execution_options(synchronize_session=False)
+    
+    try:
+        claimed = db.execute(
+            claim.values(
+                status=TransactionStatus.COMPLETED.value,
+                executed_at=now
+            )
+        ).rowcount
+        if not claimed:
+            db.rollback()
+            return None
+        
+        _schedule_next_occurrence(db, scheduled, now)
+        _run_scheduled_operation(db, scheduled)
+        db.commit()
+        return TransactionStatus.COMPLETED.value
+    
+    except Exception as e:
+        # Qualquer falha (não só as de negócio) marca o item como FAILED;
+        # senão ele continuaria PENDING e voltaria em todo lote
+        db.rollback()
+        
+        failed = db.execute(
+            claim.values(
+                status=TransactionStatus.FAILED.value,
+                executed_at=now
+            )
+        ).rowcount
+        if failed:
+            _schedule_next_occurrence(db, scheduled, now)
+        db.commit()
+        print(f"⚠️  Agendamento {scheduled_id} falhou: {e}")
+        return TransactionStatus.FAILED.value if failed else None
+
+
+def execute_scheduled_transactions(
+    db: Session,
+    batch_size: int = 100
+) -> int:
+    # Executa um lote de agendamentos vencidos na sessão informada.
+    # O processamento contínuo fica no scheduler (scheduler_service)
+    now = datetime.utcnow()
     executed_count = 0
     
-    for scheduled in pending:
-        try:
-            # Executa conforme o tipo
-            if scheduled.type == TransactionType.DEPOSIT:
-                create_deposit(
-                    db, scheduled.account_id,
-                    scheduled.amount, scheduled.description
-                )
-            elif scheduled.type == TransactionType.WITHDRAWAL:
-                create_withdrawal(
-                    db, scheduled.account_id,
-                    scheduled.amount, scheduled.description
-                )
-            elif scheduled.type == TransactionType.TRANSFER_OUT:
-                if scheduled.destination_account:
-                    create_transfer(
-                        db, scheduled.account_id,
-                        scheduled.destination_account,
-                        scheduled.amount, scheduled.description
-                    )
-            elif scheduled.type == TransactionType.BILL_PAYMENT:
-                if scheduled.destination_account:  # usar como bar_code
-                    pay_bill(
-                        db, scheduled.account_id,
-                        scheduled.destination_account,
-                        scheduled.amount, scheduled.description
-                    )
-            
-            # Marca como completado
-            scheduled.status = TransactionStatus.COMPLETED
-            scheduled.executed_at = now
+    for scheduled_id, _ in get_due_scheduled_transactions(db, now, batch_size):
+        status = execute_scheduled_transaction(db, scheduled_id, now)
+        if status == TransactionStatus.COMPLETED.value:
             executed_count += 1
-            
-        except Exception as e:
-            # Marca como falha
-            scheduled.status = TransactionStatus.FAILED
-            scheduled.executed_at = now
-            print(f"Erro ao executar agendamento {scheduled.id}: {e}")
     
-    db.commit()
     return executed_count
@@ -0,0 +1,8 @@
+from typing import Sequence
+
+
+def percentile_ms(values: Sequence[float], p: float) -> float:
+    # Percentil p (0..1) de amostras em segundos já ordenadas, em ms
+    if not values:
+        return 0.0
+    return round(values[min(len(values) - 1, int(p * len(values)))] * 1000, 2)
@@ -0,0 +1,23 @@
+import base64
+from datetime import datetime
+from typing import Optional
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    # Gera cursor opaco a partir da chave (created_at, id) do último item
+    raw = f"{created_at.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple[datetime, int]]:
+    # Converte o cursor opaco de volta em (created_at, id)
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, item_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor de paginação inválido")
@@ -0,0 +1,172 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from src.configs.settings import settings
+
+
+# Tamanho aproximado de cada pedaço enviado ao cliente
+CHUNK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "ofx": ("application/x-ofx", "ofx"),
+}
+
+
+def _chunked(lines: Iterable[str]) -> Iterator[bytes]:
+    # Junta linhas em blocos de ~64KB para reduzir o número de writes.
+    # A primeira linha (cabeçalho) sai sozinha para o primeiro byte chegar logo
+    lines = iter(lines)
+    for first in lines:
+        yield first.encode("utf-8")
+        break
+
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def _csv_lines(rows) -> Iterator[str]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+
+    def line(values: list) -> str:
+        out.seek(0)
+        out.truncate()
+        writer.writerow(values)
+        return out.getvalue()
+
+    yield line(["data", "id", "tipo", "descricao", "valor", "status"])
+    for row, amount in rows:
+        yield line([
+            row.created_at.isoformat(),
+            row.id,
+            row.transaction_type.value,
+            row.description or "",
+            f"{amount:.2f}",
+            row.status.value if row.status else ""
+        ])
+
+
+def _ndjson_lines(rows) -> Iterator[str]:
+    for row, amount in rows:
+        yield json.dumps({
+            "id": row.id,
+            "created_at": row.created_at.isoformat(),
+            "transaction_type": row.transaction_type.value,
+            "description": row.description or "",
+            "amount": round(amount, 2),
+            "status": row.status.value if row.status else None
+        }, ensure_ascii=False) + "\n"
+
+
+def _ofx_date(value: datetime) -> str:
+    return value.strftime("%Y%m%d%H%M%S")
+
+
+def _ofx_text(value: Optional[str]) -> str:
+    # OFX 1.x é SGML: escapa os caracteres especiais
+    return (
+        (value or "")
+        .replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+    )
+
+
+def _ofx_lines(
+    rows,
+    account_number: str,
+    balance: float,
+    start_date: datetime,
+    end_date: datetime
+) -> Iterator[str]:
+    now = _ofx_date(datetime.utcnow())
+    yield (
+        "OFXHEADER:100\n"
+        "DATA:OFXSGML\n"
+        "VERSION:102\n"
+        "SECURITY:NONE\n"
+        "ENCODING:UTF-8\n"
+        "CHARSET:NONE\n"
+        "COMPRESSION:NONE\n"
+        "OLDFILEUID:NONE\n"
+        "NEWFILEUID:NONE\n"
+        "\n"
+        "<OFX>\n"
+        "<SIGNONMSGSRSV1><SONRS>\n"
+        "<STATUS><CODE>0<SEVERITY>INFO</STATUS>\n"
+        f"<DTSERVER>{now}\n"
+        "<LANGUAGE>POR\n"
+        "</SONRS></SIGNONMSGSRSV1>\n"
+        "<BANKMSGSRSV1><STMTTRNRS>\n"
+        "<TRNUID>1\n"
+        "<STATUS><CODE>0<SEVERITY>INFO</STATUS>\n"
+        "<STMTRS>\n"
+        "<CURDEF>BRL\n"
+        "<BANKACCTFROM>\n"
+        f"<BANKID>{settings.BANK_CODE}\n"
+        f"<BRANCHID>{settings.DEFAULT_AGENCY}\n"
+        f"<ACCTID>{account_number}\n"
+        "<ACCTTYPE>CHECKING\n"
+        "</BANKACCTFROM>\n"
+        "<BANKTRANLIST>\n"
+        f"<DTSTART>{_ofx_date(start_date)}\n"
+        f"<DTEND>{_ofx_date(end_date)}\n"
+    )
+
+    for row, amount in rows:
+        yield (
+            "<STMTTRN>\n"
+            f"<TRNTYPE>{'CREDIT' if amount >= 0 else 'DEBIT'}\n"
+            f"<DTPOSTED>{_ofx_date(row.created_at)}\n"
+            f"<TRNAMT>{amount:.2f}\n"
+            f"<FITID>{row.id}\n"
+            f"<MEMO>{_ofx_text(row.description)}\n"
+            "</STMTTRN>\n"
+        )
+
+    yield (
+        "</BANKTRANLIST>\n"
+        "<LEDGERBAL>\n"
+        f"<BALAMT>{balance:.2f}\n"
+        f"<DTASOF>{now}\n"
+        "</LEDGERBAL>\n"
+        "</STMTRS>\n"
+        "</STMTTRNRS></BANKMSGSRSV1>\n"
+        "</OFX>\n"
+    )
+
+
+def export_statement(
+    rows,
+    export_format: str,
+    account_number: str,
+    balance: float,
+    start_date: datetime,
+    end_date: datetime
+) -> Iterator[bytes]:
+    # Converte as linhas (transação, valor com sinal) no formato pedido,
+    # emitindo blocos de bytes à medida que as linhas chegam
+    if export_format == "csv":
+        lines = _csv_lines(rows)
+    elif export_format == "ndjson":
+        lines = _ndjson_lines(rows)
+    elif export_format == "ofx":
+        lines = _ofx_lines(rows, account_number, balance, start_date, end_date)
+    else:
+        raise ValueError(f"Formato de exportação inválido: {export_format}")
+
+    return _chunked(lines)
@@ -0,0 +1,118 @@
+"""
+Indicadores técnicos em cache (candle_indicators)
+
+Confere as séries em cache e avançadas pelo feed contra o cálculo
+vetorizado sobre as mesmas velas, com dois ativos assinados com a mesma
+lista de indicadores (como faz o WebSocket ao assinar vários símbolos).
+
+Executar:
+    cd Backend
+    python -m pytest tests/test_candle_indicators.py -q
+"""
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.models  # noqa: F401 - registra todas as tabelas
+from src.database.connection import Base
+from src.models.investment import (
+    Asset, AssetType, AssetCategory, Candle, CandleInterval
+)
+from src.services.candle_indicators import CandleIndicators, parse_indicator
+
+
+SPECS = ["sma:5", "ema:5", "rsi:5", "macd:3,6,2", "bollinger:5,2"]
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _add_stock(db, symbol: str, closes: np.ndarray) -> Asset:
+    asset = Asset(
+        symbol=symbol, name=symbol, asset_type=AssetType.STOCK,
+        category=AssetCategory.TECHNOLOGY, current_price=float(closes[-1])
+    )
+    db.add(asset)
+    db.flush()
+    db.add_all([
+        Candle(
+            asset_id=asset.id, interval=CandleInterval.ONE_MINUTE,
+            open_price=close, high_price=close, low_price=close,
+            close_price=close, volume=1, trades_count=1,
+            open_time=START + timedelta(minutes=i),
+            close_time=START + timedelta(minutes=i + 1)
+        )
+        for i, close in enumerate(closes.tolist())
+    ])
+    db.commit()
+    return asset
+
+
+def _record(asset: Asset, minute: int, close: float) -> dict:
+    return {
+        "asset_id": asset.id, "symbol": asset.symbol, "name": asset.name,
+        "interval": CandleInterval.ONE_MINUTE, "close_price": close,
+        "open_time": START + timedelta(minutes=minute)
+    }
+
+
+def _assert_matches(series, closes: np.ndarray):
+    expected = parse_indicator(series.indicator.key).compute(closes)[-5:]
+    values = series.to_dict(5)["values"]
+    got = np.array([
+        [np.nan if value is None else value for value in values[output]]
+        for output in series.indicator.outputs
+    ]).T
+    assert np.allclose(got, expected, equal_nan=True), series.indicator.key
+
+
+def test_subscribed_symbols_keep_separate_state(db):
+    rng = np.random.default_rng(7)
+    closes = {
+        "AAA3": 10 * np.exp(np.cumsum(rng.normal(0, 0.01, 60))),
+        "BBB3": 90 * np.exp(np.cumsum(rng.normal(0, 0.01, 60))),
+    }
+    assets = {symbol: _add_stock(db, symbol, values) for symbol, values in closes.items()}
+
+    # Mesma lista de indicadores para os dois símbolos
+    cache = CandleIndicators(history=50)
+    indicators = [parse_indicator(spec) for spec in SPECS]
+    series = {
+        symbol: cache.get(db, asset.id, CandleInterval.ONE_MINUTE, indicators)
+        for symbol, asset in assets.items()
+    }
+    for symbol, entries in series.items():
+        for entry in entries:
+            _assert_matches(entry, closes[symbol])
+
+    # Uma vela nova de cada símbolo pelo feed
+    updates = cache.apply([
+        _record(asset, 60, float(closes[symbol][-1]) * 1.01)
+        for symbol, asset in assets.items()
+    ])
+    assert len(updates) == len(SPECS) * len(assets)
+    for symbol, entries in series.items():
+        extended = np.append(closes[symbol], closes[symbol][-1] * 1.01)
+        for entry in entries:
+            _assert_matches(entry, extended)
@@ -0,0 +1,532 @@
+"""
+Regressão de planos de consulta
+
+Executa as funções de transaction_service, candle_service e
+investment_service contra um SQLite em memória, captura cada SELECT/
+UPDATE/DELETE emitido e roda EXPLAIN QUERY PLAN sobre ele. O teste falha
+se alguma consulta fizer varredura completa de tabela (SCAN sem índice).
+
+Executar:
+    cd Backend
+    python -m pytest tests/test_query_plans.py -q
+"""
+import re
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Adiciona o diretório raiz ao path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import src.models  # noqa: F401 - registra todas as tabelas
+from src.database.connection import Base
+from src.models.user import User
+from src.models.account import Account, AccountType, BalanceSnapshot
+from src.models.investment import (
+    Asset, AssetType, AssetCategory, Candle, CandleInterval
+)
+from src.models.transaction import Transaction, TransactionType, TransactionStatus
+from src.services import (
+    transaction_service, candle_service, candle_partitions,
+    candle_retention_service, investment_service, balance_history_service,
+    latest_candles, ledger_service, credit_card_service, balance_service,
+    account_service
+)
+
+
+# "SCAN transactions" = varredura da tabela inteira. Varreduras de índice
+# aparecem como "SCAN ... USING [COVERING] INDEX" e não são reprovadas
+FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)\S+( AS \S+)?$")
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def seeded(db):
+    user = User(
+        full_name="Plano de Consulta",
+        cpf="00000000000",
+        birth_date=date(1990, 1, 1),
+        email="plans@test.local",
+        password_hash="-"
+    )
+    db.add(user)
+    db.flush()
+
+    checking = Account(
+        user_id=user.id, account_number="100001",
+        account_type=AccountType.CORRENTE, balance=100_000.0
+    )
+    savings = Account(
+        user_id=user.id, account_number="100002",
+        account_type=AccountType.POUPANCA, balance=100_000.0
+    )
+    investing = Account(
+        user_id=user.id, account_number="100003",
+        account_type=AccountType.INVESTIMENTO, balance=100_000.0
+    )
+    stock = Asset(
+        symbol="PLAN3", name="Plano SA", asset_type=AssetType.STOCK,
+        category=AssetCategory.TECHNOLOGY, current_price=10.0
+    )
+    db.add_all([checking, savings, investing, stock])
+    db.flush()
+
+    start = datetime.utcnow() - timedelta(hours=1)
+    db.add_all([
+        Candle(
+            asset_id=stock.id, interval=CandleInterval.ONE_MINUTE,
+            open_price=10, high_price=11, low_price=9, close_price=10,
+            open_time=start + timedelta(minutes=i),
+            close_time=start + timedelta(minutes=i + 1)
+        )
+        for i in range(30)
+    ])
+    db.commit()
+
+    return {
+        "checking": checking.id,
+        "savings": savings.id,
+        "investing": investing.id,
+        "savings_number": savings.account_number,
+        "asset": stock.id,
+    }
+
+
+def _full_scans(engine, db, action):
+    """Executa `action` e retorna as consultas que fizeram full scan"""
+    captured = []
+
+    def collect(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if not executemany and verb in ("SELECT", "UPDATE", "DELETE"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", collect)
+    try:
+        action()
+    finally:
+        event.remove(engine, "before_cursor_execute", collect)
+
+    assert captured, "nenhuma consulta capturada"
+
+    offenders = []
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for statement, parameters in captured:
+            try:
+                cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            except sqlite3.OperationalError as e:
+                # Tabela descartada pela própria ação (partição de velas)
+                if "no such table" not in str(e):
+                    raise
+                continue
+            for row in cursor.fetchall():
+                detail = row[-1]
+                if FULL_SCAN.match(detail):
+                    offenders.append(f"{detail}\n    {statement.strip()}")
+    finally:
+        raw.close()
+    return offenders
+
+
+def _assert_indexed(engine, db, action):
+    offenders = _full_scans(engine, db, action)
+    assert not offenders, "Consultas com full scan:\n" + "\n".join(offenders)
+
+
+# ============================================
+# transaction_service
+# ============================================
+
+def test_money_movements_use_indexes(engine, db, seeded):
+    def action():
+        transaction_service.create_deposit(db, seeded["checking"], 100)
+        transaction_service.create_withdrawal(db, seeded["checking"], 50)
+        transaction_service.create_transfer(
+            db, seeded["checking"], seeded["savings_number"], 10
+        )
+        transaction_service.create_pix_send(db, seeded["checking"], "a@b.com", 10)
+        transaction_service.create_pix_receive(
+            db, seeded["savings_number"], 10, "a@b.com"
+        )
+        transaction_service.pay_bill(db, seeded["checking"], "1" * 44, 10)
+
+    _assert_indexed(engine, db, action)
+
+
+def test_batch_uses_indexes(engine, db, seeded):
+    def action():
+        transaction_service.execute_batch(db, [
+            {
+                "operation_type": "TRANSFER",
+                "from_account_id": seeded["checking"],
+                "to_account_number": seeded["savings_number"],
+                "amount": 5
+            },
+            {
+                "operation_type": "BILL_PAYMENT",
+                "from_account_id": seeded["checking"],
+                "bar_code": "2" * 44,
+                "amount": 5
+            },
+        ])
+
+    _assert_indexed(engine, db, action)
+
+
+def test_statement_queries_use_indexes(engine, db, seeded):
+    for _ in range(5):
+        transaction_service.create_transfer(
+            db, seeded["checking"], seeded["savings_number"], 1
+        )
+        transaction_service.pay_bill(db, seeded["checking"], "1" * 44, 1)
+
+    def action():
+        transactions, _, cursor = transaction_service.get_statement(
+            db, seeded["checking"], limit=3, include_total=True
+        )
+        transaction_service.get_statement(
+            db, seeded["checking"],
+            start_date=datetime.utcnow() - timedelta(days=1),
+            transaction_type=TransactionType.TRANSFER,
+            limit=3, cursor=cursor
+        )
+        _, cursor = transaction_service.get_bill_payment_history(
+            db, [seeded["checking"], seeded["savings"]], limit=2
+        )
+        transaction_service.get_bill_payment_history(
+            db, [seeded["checking"]], limit=2, cursor=cursor
+        )
+
+    _assert_indexed(engine, db, action)
+
+
+def test_statement_legacy_offset(engine, db, seeded):
+    for _ in range(5):
+        transaction_service.create_transfer(
+            db, seeded["checking"], seeded["savings_number"], 1
+        )
+
+    first, _, _ = transaction_service.get_statement(db, seeded["checking"], limit=4)
+
+    def action():
+        page, _, cursor = transaction_service.get_statement(
+            db, seeded["checking"], limit=2, offset=2
+        )
+        assert page == first[2:4]
+        assert cursor is not None
+
+    _assert_indexed(engine, db, action)
+
+
+def test_statement_lists_transactions_without_postings(engine, db, seeded):
+    # Compra no cartão não mexe no saldo, mas continua no extrato
+    transaction_service.create_deposit(db, seeded["checking"], 10)
+    card, _ = credit_card_service.create_credit_card(db, seeded["checking"])
+    credit_card_service.make_purchase(db, card.id, 25)
+
+    # Transações antigas (sem lançamentos) migradas para o razão
+    db.add_all([
+        Transaction(
+            from_account_id=seeded["checking"],
+            transaction_type=TransactionType.CARD_CREDIT,
+            amount=7, status=TransactionStatus.COMPLETED
+        ),
+        Transaction(
+            from_account_id=seeded["checking"],
+            to_account_id=seeded["savings"],
+            transaction_type=TransactionType.TRANSFER,
+            amount=3, status=TransactionStatus.FAILED
+        ),
+    ])
+    db.commit()
+    ledger_service.migrate_transactions(db)
+    ledger_service.migrate_opening_balances(db)
+
+    def action():
+        transactions, total, _ = transaction_service.get_statement(
+            db, seeded["checking"], include_total=True
+        )
+        listed = sorted(
+            (t.transaction_type.value, t.amount, signed)
+            for t, signed in transactions
+        )
+        assert listed == [
+            ("CARD_CREDIT", 7.0, 0.0),
+            ("CARD_CREDIT", 25.0, 0.0),
+            ("DEPOSIT", 10.0, 10.0),
+            ("TRANSFER", 3.0, 0.0),
+        ]
+        assert total == 4
+        exported = list(transaction_service.iter_statement(db, seeded["savings"]))
+        assert [(row.transaction_type, signed) for row, signed in exported] == [
+            (TransactionType.TRANSFER, 0.0)
+        ]
+        assert ledger_service.reconcile(db)["balanced"]
+
+    _assert_indexed(engine, db, action)
+
+
+def test_statement_export_uses_indexes(engine, db, seeded):
+    for _ in range(5):
+        transaction_service.create_transfer(
+            db, seeded["checking"], seeded["savings_number"], 1
+        )
+        transaction_service.create_pix_receive(
+            db, "100001", 1, "a@b.com"
+        )
+
+    def action():
+        list(transaction_service.iter_statement(db, seeded["checking"]))
+        list(transaction_service.iter_statement(
+            db, seeded["savings"],
+            start_date=datetime.utcnow() - timedelta(days=1),
+            transaction_type=TransactionType.TRANSFER
+        ))
+
+    _assert_indexed(engine, db, action)
+
+
+def test_balance_history_uses_indexes(engine, db, seeded):
+    transaction_service.create_deposit(db, seeded["checking"], 10)
+    transaction_service.create_transfer(
+        db, seeded["checking"], seeded["savings_number"], 5
+    )
+
+    def action():
+        now = datetime.utcnow()
+        balance_history_service.get_balance_history(
+            db, seeded["checking"],
+            now - timedelta(days=3, hours=2), now - timedelta(minutes=1)
+        )
+        balance_history_service.backfill_balance_snapshots(db, seeded["savings"])
+
+    _assert_indexed(engine, db, action)
+
+
+def test_balance_history_clips_partial_days(db, seeded):
+    # Período começando e terminando no meio do dia: os fluxos do período
+    # fecham com os saldos de abertura e fechamento
+    account_id = seeded["checking"]
+    transaction_service.create_deposit(db, account_id, 10)
+    start = datetime.utcnow()
+    opening = balance_service.get_balance(db, account_id)
+    transaction_service.create_transfer(db, account_id, seeded["savings_number"], 5)
+    transaction_service.create_deposit(db, account_id, 7)
+    end = datetime.utcnow()
+    closing = balance_service.get_balance(db, account_id)
+    transaction_service.create_withdrawal(db, account_id, 3)
+
+    history = balance_history_service.get_balance_history(db, account_id, start, end)
+
+    for point in history:
+        assert round(
+            point["opening_balance"] + point["total_credits"] - point["total_debits"], 2
+        ) == point["closing_balance"], point
+    assert history[0]["opening_balance"] == opening
+    assert history[-1]["closing_balance"] == closing
+    assert sum(point["total_credits"] for point in history) == 7
+    assert sum(point["total_debits"] for point in history) == 5
+
+
+def test_backfilled_snapshots_match_balance(db, seeded):
+    # Conta com saldo inicial (OPENING), ajuste (ADJUSTMENT) e transações:
+    # o backfill pelo razão refaz os snapshots gravados a cada movimento
+    user = db.query(User).first()
+    account = account_service.create_account(db, user.id, "BLACK", 500)
+    account_service.update_balance(db, account, 40)
+    transaction_service.create_deposit(db, account.id, 10)
+    transaction_service.create_transfer(db, account.id, seeded["savings_number"], 25)
+    account_service.update_balance(db, account, -5)
+
+    def snapshots():
+        return [
+            (row.day, round(row.opening_balance, 2), round(row.closing_balance, 2),
+             round(row.total_credits, 2), round(row.total_debits, 2))
+            for row in db.query(BalanceSnapshot).filter(
+                BalanceSnapshot.account_id == account.id
+            ).order_by(BalanceSnapshot.day)
+        ]
+
+    live = snapshots()
+    balance_history_service.backfill_balance_snapshots(db, account.id)
+    backfilled = snapshots()
+
+    assert backfilled == live
+    assert backfilled[-1][2] == balance_service.get_balance(db, account.id) == 520
+
+
+def test_scheduled_transactions_use_indexes(engine, db, seeded):
+    transaction_service.schedule_transaction(
+        db, seeded["checking"], TransactionType.PIX_SEND, 10,
+        datetime.utcnow() + timedelta(seconds=1), pix_key="a@b.com",
+        is_recurring=True, recurrence_period="MONTHLY"
+    )
+
+    def action():
+        transaction_service.get_scheduled_transactions(db, seeded["checking"])
+        now = datetime.utcnow() + timedelta(minutes=1)
+        for scheduled_id, _ in transaction_service.get_due_scheduled_transactions(
+            db, now, limit=10
+        ):
+            transaction_service.execute_scheduled_transaction(
+                db, scheduled_id, now
+            )
+
+    _assert_indexed(engine, db, action)
+
+
+def test_withdrawal_counter_maintenance_uses_indexes(engine, db, seeded):
+    transaction_service.create_withdrawal(db, seeded["checking"], 10)
+
+    def action():
+        transaction_service.rebuild_daily_withdrawal_counters(db)
+        transaction_service.prune_daily_withdrawal_counters(db, keep_days=7)
+
+    _assert_indexed(engine, db, action)
+
+
+def test_ledger_queries_use_indexes(engine, db, seeded):
+    transaction_service.create_transfer(
+        db, seeded["checking"], seeded["savings_number"], 5
+    )
+    transaction_service.create_deposit(db, seeded["checking"], 10)
+
+    def action():
+        ledger_service.get_ledger_balance(db, seeded["checking"])
+        ledger_service.migrate_transactions(db, batch_size=2)
+        ledger_service.migrate_opening_balances(db, batch_size=2)
+        result = ledger_service.reconcile(db, batch_size=2)
+        assert result["balanced"], result
+
+    _assert_indexed(engine, db, action)
+
+
+# ============================================
+# candle_service
+# ============================================
+
+def test_candle_queries_use_indexes(engine, db, seeded):
+    def action():
+        asset = investment_service.get_asset_by_id(db, seeded["asset"])
+        candle_service.candle_simulator.create_candle(
+            db, asset, CandleInterval.ONE_MINUTE
+        )
+        candle_service.generate_candles_for_all_stocks(
+            db, CandleInterval.FIVE_SECONDS, 5
+        )
+        candle_service.get_recent_candles(
+            db, seeded["asset"], CandleInterval.ONE_MINUTE, limit=10
+        )
+        candle_service.get_candles_summary(db, seeded["asset"])
+        latest_candles.LatestCandles().load(db, CandleInterval.ONE_MINUTE)
+
+    _assert_indexed(engine, db, action)
+
+
+def test_candle_retention_uses_indexes(engine, db, seeded):
+    retention = candle_retention_service.CandleRetentionService(
+        windows={"1m": 600},
+        rollup_targets={"1m": "5m"},
+        chunk=5,
+        session_factory=sessionmaker(bind=engine)
+    )
+
+    def action():
+        retention.run_once()
+
+    _assert_indexed(engine, db, action)
+    assert retention.deleted > 0 and retention.rolled_up > 0
+
+
+def test_partitioned_candles_use_indexes(engine, db, seeded, monkeypatch):
+    partitions = candle_partitions.CandlePartitions(enabled=True, bind=engine)
+    monkeypatch.setattr(candle_service, "candle_partitions", partitions)
+    monkeypatch.setattr(latest_candles, "candle_partitions", partitions)
+
+    # Velas de 1m a cada 30 minutos nos últimos 3 dias (4 partições diárias)
+    start = datetime.utcnow() - timedelta(days=3)
+    partitions.insert(db, [
+        {
+            "asset_id": seeded["asset"], "interval": CandleInterval.ONE_MINUTE,
+            "open_price": 10, "high_price": 11, "low_price": 9, "close_price": 10,
+            "open_time": start + timedelta(minutes=30 * i),
+            "close_time": start + timedelta(minutes=30 * i + 1)
+        }
+        for i in range(144)
+    ])
+    db.commit()
+    retention = candle_retention_service.CandleRetentionService(
+        windows={"1m": 86400},
+        rollup_targets={"1m": "1h"},
+        session_factory=sessionmaker(bind=engine),
+        partitions=partitions
+    )
+
+    def action():
+        asset = investment_service.get_asset_by_id(db, seeded["asset"])
+        candle_service.candle_simulator.create_candle(
+            db, asset, CandleInterval.ONE_MINUTE
+        )
+        candle_service.generate_candles_for_all_stocks(
+            db, CandleInterval.FIVE_SECONDS, 5
+        )
+        candle_service.get_recent_candles(
+            db, seeded["asset"], CandleInterval.ONE_MINUTE, limit=100
+        )
+        candle_service.CandleStateCache().warm(db)
+        latest_candles.LatestCandles().load(db, CandleInterval.ONE_MINUTE)
+        retention.run_once()
+
+    _assert_indexed(engine, db, action)
+    assert retention.dropped > 0 and retention.rolled_up > 0
+    assert len(partitions.partitions(CandleInterval.ONE_MINUTE)) < 4
+
+
+# ============================================
+# investment_service
+# ============================================
+
+def test_investment_queries_use_indexes(engine, db, seeded):
+    def action():
+        investment_service.get_all_assets(db)
+        investment_service.get_all_assets(
+            db, asset_type=AssetType.STOCK, category=AssetCategory.TECHNOLOGY
+        )
+        investment_service.buy_asset(db, seeded["investing"], seeded["asset"], 10)
+        investment_service.buy_asset(db, seeded["investing"], seeded["asset"], 5)
+        investment_service.sell_asset(db, seeded["investing"], seeded["asset"], 3)
+        investment_service.get_portfolio_summary(db, seeded["investing"])
+        investment_service.create_asset(
+            db, "NEW11", "Novo Fundo", AssetType.FUND,
+            AssetCategory.FIXED_INCOME, 100.0
+        )
+        investment_service.update_asset_prices(db)
+        investment_service.simulate_market_realtime(db)
+
+    _assert_indexed(engine, db, action)
@@ -23,6 +23,15 @@ async def test_websocket():
             print("✅ Conectado ao WebSocket!")
             print()
             
+            # Assina os preços de todos os ativos, as velas de 1 minuto e o
+            # RSI calculado sobre elas
+            await websocket.send(json.dumps({
+                "action": "subscribe",
+                "symbols": ["*"],
+                "intervals": ["1m"],
+                "indicators": ["rsi:14"]
+            }))
+            
             message_count = 0
             
             while True:
@@ -39,20 +48,33 @@ async def test_websocket():
                         print(f"   Ativos disponíveis: {data['assets_count']}")
                         print()
                     
-                    elif data.get("type") == "price_update":
-                        # Exibe update de preço
-                        symbol = data.get("symbol", "???")
-                        name = data.get("name", "")
-                        price = data.get("price", 0.0)
+                    elif data.get("type") == "subscriptions":
+                        print(f"📝 Assinaturas: {data['subscriptions']}")
+                        print()
+                    
+                    elif data.get("type") == "price_batch":
+                        # Exibe os preços (um frame com todos os ativos)
                         timestamp = data.get("timestamp", "")
                         
-                        print(f"📊 [{timestamp[:19]}] {symbol:6s} - {name:30s} | R$ {price:8.2f}")
+                        for item in data.get("prices", []):
+                            symbol = item.get("symbol", "???")
+                            name = item.get("name", "")
+                            price = item.get("price", 0.0)
+                            print(f"📊 [{timestamp[:19]}] {symbol:6s} - {name:30s} | R$ {price:8.2f}")
                         
                         # A cada 20 mensagens, mostra resumo
                         if message_count % 20 == 0:
                             print()
                             print(f"   📈 {message_count} atualizações recebidas...")
                             print()
+                    
+                    elif data.get("type") == "candle_batch":
+                        # Velas de um tick do simulador (um frame por tick)
+                        print(f"🕯️  {len(data.get('candles', []))} velas recebidas")
+                    
+                    elif data.get("type") == "indicator_batch":
+                        # Próximo ponto dos indicadores assinados
+                        print(f"📐 {len(data.get('indicators', []))} indicadores recebidos")
                 
                 except asyncio.TimeoutError:
                     print("⏳ Aguardando atualizações...")
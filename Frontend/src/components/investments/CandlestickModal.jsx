@@ -8,6 +8,7 @@ import {
   IoStatsChart
 } from 'react-icons/io5';
 import api from '../../services/api';
+import { candleUpdatesFrom, subscribeMarketFeed } from '../../services/investment.service';
 import toast from 'react-hot-toast';
 
 /**
@@ -155,27 +156,31 @@ const CandlestickModal = ({ isOpen, onClose, asset: initialAsset, allAssets = []
     const wsUrl = import.meta.env.VITE_API_BASE_URL.replace('http', 'ws');
     const ws = new WebSocket(`${wsUrl}/ws/market-feed`);
 
+    ws.onopen = () => {
+      subscribeMarketFeed(ws, [asset.symbol], [candleInterval]);
+    };
+
     ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data);
         
         // Atualiza apenas se for o ativo correto E o intervalo correto
-        if (data.type === 'candle_update' && 
-            data.symbol === asset.symbol &&
-            data.candle.interval === candleInterval) {
+        const update = candleUpdatesFrom(data).find(item =>
+          item.symbol === asset.symbol &&
+          item.candle.interval === candleInterval
+        );
+        if (update) {
           setCandles(prev => {
-            const updated = [...prev, data.candle];
+            const updated = [...prev, update.candle];
             // Mantém apenas o limite correto de velas
             return updated.slice(-getCandleLimit(candleInterval));
           });
 
           // Atualiza resumo
-          if (data.candle) {
-            setSummary(prev => ({
-              ...prev,
-              current_price: data.candle.close
-            }));
-          }
+          setSummary(prev => ({
+            ...prev,
+            current_price: update.candle.close
+          }));
         }
       } catch (error) {
         console.error('Erro ao processar WebSocket:', error);
@@ -69,12 +69,15 @@ export const useInvestments = () => {
       (data) => {
         setMarketFeed(data);
         
-        // Atualiza preços dos ativos em tempo real
-        if (data.type === 'price_update') {
+        // Atualiza preços dos ativos em tempo real (um frame com todos)
+        if (data.type === 'price_batch') {
+          const prices = Object.fromEntries(
+            data.prices.map(item => [item.symbol, item.price])
+          );
           setAssets(prevAssets =>
             prevAssets.map(asset =>
-              asset.symbol === data.symbol
-                ? { ...asset, current_price: data.price }
+              asset.symbol in prices
+                ? { ...asset, current_price: prices[asset.symbol] }
                 : asset
             )
           );
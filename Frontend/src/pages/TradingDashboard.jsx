@@ -7,6 +7,7 @@ import {
   IoTime, IoClose, IoCheckmark, IoWallet
 } from 'react-icons/io5';
 import api from '../services/api';
+import { candleUpdatesFrom, subscribeMarketFeed } from '../services/investment.service';
 import toast from 'react-hot-toast';
 import CandlestickChart from '../components/investments/CandlestickChart';
 
@@ -215,6 +216,7 @@ const TradingDashboard = () => {
     ws.onopen = () => {
       console.log('📡 WebSocket conectado');
       setConnected(true);
+      subscribeMarketFeed(ws, [selectedAsset.symbol], [candleInterval]);
     };
 
     ws.onmessage = (event) => {
@@ -222,19 +224,21 @@ const TradingDashboard = () => {
         const data = JSON.parse(event.data);
         
         // Atualiza apenas se for o ativo correto E o intervalo correto
-        if (data.type === 'candle_update' && 
-            data.symbol === selectedAsset.symbol &&
-            data.candle.interval === candleInterval) {
+        const update = candleUpdatesFrom(data).find(item =>
+          item.symbol === selectedAsset.symbol &&
+          item.candle.interval === candleInterval
+        );
+        if (update) {
           // Adiciona nova vela
           setCandles(prev => {
-            const updated = [...prev, data.candle];
+            const updated = [...prev, update.candle];
             return updated.slice(-getCandleLimit(candleInterval));
           });
 
           // Atualiza resumo
           setSummary(prev => ({
             ...prev,
-            current_price: data.candle.close
+            current_price: update.candle.close
           }));
 
           setLastUpdate(new Date());
@@ -7,6 +7,7 @@ import {
   IoRefresh, IoExpand, IoContract
 } from 'react-icons/io5';
 import api from '../services/api';
+import { candleUpdatesFrom, subscribeMarketFeed } from '../services/investment.service';
 import toast from 'react-hot-toast';
 import CandlestickChart from '../components/investments/CandlestickChart';
 
@@ -42,15 +43,16 @@ const TradingView = () => {
     loadInvestmentAccount();
   }, [assetId]);
 
-  // Conecta WebSocket
+  // Conecta WebSocket (assina o ativo carregado)
   useEffect(() => {
+    if (!asset) return;
     connectWebSocket();
     return () => {
       if (wsRef.current) {
         wsRef.current.close();
       }
     };
-  }, [assetId]);
+  }, [asset?.symbol]);
 
   const loadAssetData = async () => {
     try {
@@ -107,23 +109,27 @@ const TradingView = () => {
     ws.onopen = () => {
       console.log('📡 WebSocket conectado');
       setConnected(true);
+      subscribeMarketFeed(ws, [asset.symbol], ['1m']);
     };
 
     ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data);
         
-        if (data.type === 'candle_update' && asset && data.symbol === asset.symbol) {
+        const update = candleUpdatesFrom(data).find(item =>
+          item.symbol === asset.symbol && item.candle.interval === '1m'
+        );
+        if (update) {
           // Adiciona nova vela
           setCandles(prev => {
-            const updated = [...prev, data.candle];
+            const updated = [...prev, update.candle];
             return updated.slice(-100); // Mantém últimas 100
           });
 
           // Atualiza resumo
           setSummary(prev => ({
             ...prev,
-            current_price: data.candle.close
+            current_price: update.candle.close
           }));
 
           setLastUpdate(new Date());
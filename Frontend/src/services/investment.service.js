@@ -66,15 +66,39 @@ export const getAssetHistory = async (symbol, days = 30) => {
   return response.data;
 };
 
+/**
+ * Velas contidas em uma mensagem do feed de mercado. O servidor envia todas
+ * as velas de um tick em um único frame (candle_batch)
+ */
+export const candleUpdatesFrom = (data) => {
+  if (data.type === 'candle_batch') return data.candles || [];
+  if (data.type === 'candle_update') return [data];
+  return [];
+};
+
+/**
+ * Assina símbolos e intervalos de vela no feed de mercado. O servidor só
+ * envia o que foi assinado ('*' = todos). Sem intervalos, assina apenas os
+ * preços dos símbolos
+ */
+export const subscribeMarketFeed = (ws, symbols, intervals = []) => {
+  ws.send(JSON.stringify({ action: 'subscribe', symbols, intervals }));
+};
+
 /**
  * Conecta ao WebSocket de preços em tempo real
  */
-export const connectToMarketFeed = (onMessage, onError) => {
+export const connectToMarketFeed = (
+  onMessage,
+  onError,
+  subscription = { symbols: ['*'], intervals: [] }
+) => {
   const wsUrl = import.meta.env.VITE_API_BASE_URL.replace('http', 'ws');
   const ws = new WebSocket(`${wsUrl}/ws/market-feed`);
   
   ws.onopen = () => {
     console.log('📡 Conectado ao feed de mercado');
+    subscribeMarketFeed(ws, subscription.symbols, subscription.intervals);
   };
   
   ws.onmessage = (event) => {
@@ -107,4 +131,6 @@ export default {
   getPortfolioSummary,
   getAssetHistory,
   connectToMarketFeed,
+  subscribeMarketFeed,
+  candleUpdatesFrom,
 };